@@ -0,0 +1,85 @@
+import time
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable
+
+
+class QueryCache:
+    def __init__(self, max_size: int = 1024, time_to_live: float = 600):
+        self.__max_size = max_size
+        self.__time_to_live = time_to_live
+        self.__entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.__lock = Lock()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__index_version: Hashable = None
+
+    @staticmethod
+    def build_key(
+        terms: set[str],
+        page: int | Hashable,
+        limit: int,
+        max_summary_len: int,
+        phrases: list[tuple] | None = None,
+    ) -> tuple:
+        # Stemmed terms are order independent, so equivalent spellings share an entry
+        return (
+            tuple(sorted(terms)),
+            page,
+            limit,
+            max_summary_len,
+            tuple(sorted(phrases)) if phrases else (),
+        )
+
+    def get(self, key: Hashable) -> Any | None:
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.__misses += 1
+                return None
+
+            expiration_time, value = entry
+            if expiration_time < time.monotonic():
+                del self.__entries[key]
+                self.__misses += 1
+                return None
+
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, index_version: Hashable = None):
+        with self.__lock:
+            # Results computed against a replaced index must not be stored
+            if index_version != self.__index_version:
+                return
+
+            self.__entries[key] = (time.monotonic() + self.__time_to_live, value)
+            self.__entries.move_to_end(key)
+
+            while len(self.__entries) > self.__max_size:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+
+    def set_index_version(self, index_version: Hashable):
+        with self.__lock:
+            if index_version == self.__index_version:
+                return
+
+            self.__index_version = index_version
+            self.__entries.clear()
+
+    def get_index_version(self) -> Hashable:
+        return self.__index_version
+
+    def get_statistics(self) -> dict:
+        with self.__lock:
+            return {
+                "HITS": self.__hits,
+                "MISSES": self.__misses,
+                "EVICTIONS": self.__evictions,
+                "SIZE": len(self.__entries),
+                "MAX_SIZE": self.__max_size,
+            }
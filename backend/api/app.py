@@ -3,80 +3,255 @@ import sys
 sys.path.append("/root/cancer_patient_search_engine")
 
 import math
+import os
+import time
+from dotenv import load_dotenv
 from flask import Flask, jsonify, request
-from flask_cors import CORS 
+from flask_cors import CORS
 from threading import Thread
-from backend.api.utils import fix_value_between
+from backend.api.QueryCache import QueryCache
+from backend.api.utils import decode_cursor, encode_cursor, fix_value_between
 from backend.index.database.DatabaseModel import DatabaseModel
 from backend.engine.TermProcessor import TermProcessor
+from backend.engine.MemoryQueryEngine import MemoryQueryEngine
+from backend.engine.MappedQueryEngine import MappedQueryEngine
+from backend.engine.SegmentedQueryEngine import SegmentedQueryEngine
+from backend.index.segments.SegmentMerger import SegmentMerger
+from backend.index.segments.SegmentedIndex import SegmentedIndex
 
 
 class Server:
-    def __init__(self):
+    query_engines = ["database", "memory", "mapped", "segmented"]
+
+    def __init__(
+        self,
+        query_engine: str = "database",
+        proximity_weight: float = 0,
+        use_regex_tokenizer: bool = False,
+        stem_cache_path: str | None = None,
+        cache_size: int = 1024,
+        cache_time_to_live: float = 600,
+        statistics_refresh_interval: float = 60,
+        posting_file_path: str | None = None,
+        segment_directory: str | None = None,
+        segment_merge_interval: float = 60,
+    ):
         self.app = Flask(__name__)
 
         CORS(self.app)
 
+        if query_engine not in Server.query_engines:
+            raise ValueError(
+                f"Unknown query engine '{query_engine}'. Expected one of {Server.query_engines}"
+            )
+
+        if proximity_weight > 0 and query_engine != "memory":
+            raise ValueError(
+                f"Term proximity needs token positions, which the '{query_engine}' query engine "
+                "does not load. Use the memory engine or a proximity weight of 0"
+            )
+
         self.__model = DatabaseModel()
-        self.__termProcessor = TermProcessor()
+        self.__termProcessor = TermProcessor(
+            use_regex_tokenizer=use_regex_tokenizer, stem_cache_path=stem_cache_path
+        )
+        self.__query_engine_name = query_engine
+        self.__proximity_weight = proximity_weight
+        self.__posting_file_path = posting_file_path
+        self.__segmented_index = (
+            SegmentedIndex(segment_directory) if query_engine == "segmented" else None
+        )
+        self.__segment_merge_interval = segment_merge_interval
+        self.__query_engine = self.__build_query_engine()
+        self.__query_cache = QueryCache(max_size=cache_size, time_to_live=cache_time_to_live)
+        self.__statistics_refresh_interval = statistics_refresh_interval
         self.__setup_routes()
 
+        index_version = self.__get_index_version()
         self.__average_document_length = self.__model.get_document_statistics()
 
         if not self.__average_document_length:
-            raise ValueError(
-                "Document statistics were not retrieved. Cannot start service"
+            raise ValueError("Document statistics were not retrieved. Cannot start service")
+
+        self.__query_cache.set_index_version(index_version)
+
+    def __build_query_engine(self):
+        if self.__query_engine_name == "memory":
+            return MemoryQueryEngine(
+                self.__model,
+                proximity_weight=self.__proximity_weight,
             )
 
+        if self.__query_engine_name == "mapped":
+            return MappedQueryEngine(self.__model, self.__posting_file_path)
+
+        if self.__query_engine_name == "segmented":
+            return SegmentedQueryEngine(self.__model, self.__segmented_index)
+
+        return self.__model
+
+    # Quoted phrases need token positions, which only the memory engine loads.
+    # Other engines match the words of a phrase as plain terms, so phrases stay
+    # out of their cache keys
+    def __get_query_options(self, phrases: list) -> dict:
+        if self.__query_engine_name != "memory":
+            return {}
+
+        return {"phrases": phrases}
+
+    # Tells clients their phrases were not enforced instead of silently dropping them
+    def __flag_ignored_phrases(self, response, phrases: list):
+        if phrases and self.__query_engine_name != "memory":
+            response.headers["X-Ignored-Phrases"] = str(len(phrases))
+
+        return response
+
+    # Every indexing commit bumps INDEX_VERSION, also when a replacement keeps the
+    # document count and average length unchanged
+    def __get_index_version(self) -> tuple:
+        index_version = (self.__model.get_index_version(),)
+
+        # Segments are added and merged without touching DOCUMENT_STATISTICS
+        if self.__segmented_index:
+            self.__segmented_index.refresh()
+            index_version += (self.__segmented_index.get_generation(),)
+
+        return index_version
+
+    # A new index version means cached results and memory-resident postings are stale
+    def __watch_index_changes(self):
+        while True:
+            time.sleep(self.__statistics_refresh_interval)
+            # Read before the statistics, so a commit in between is seen on the next poll
+            index_version = self.__get_index_version()
+            if index_version == self.__query_cache.get_index_version():
+                continue
+
+            statistics = self.__model.get_document_statistics()
+            if not statistics:
+                continue
+
+            print("Index version changed. Invalidating query cache")
+            if self.__query_engine_name in ["memory", "mapped"]:
+                self.__query_engine = self.__build_query_engine()
+
+            self.__average_document_length = statistics
+            self.__query_cache.set_index_version(index_version)
+
     def __setup_routes(self):
         @self.app.route("/api/statistics", methods=["GET"])
         def get_statistics():
             statistics = self.__model.get_document_statistics()
             return jsonify(
-               { 
-                    "DOCUMENT_COUNT": statistics.get_document_count(), 
-                    "AVERAGE_DOCUMENT_LENGTH": statistics.get_average_document_length() 
+                {
+                    "DOCUMENT_COUNT": statistics.get_document_count(),
+                    "AVERAGE_DOCUMENT_LENGTH": statistics.get_average_document_length(),
                 }
             )
 
+        @self.app.route("/api/cache/statistics", methods=["GET"])
+        def get_cache_statistics():
+            return jsonify(self.__query_cache.get_statistics())
+
+        @self.app.route("/api/stem-cache/statistics", methods=["GET"])
+        def get_stem_cache_statistics():
+            return jsonify(self.__termProcessor.get_stem_cache().get_statistics())
+
         @self.app.route("/api/sources", methods=["GET"])
         def get_sources():
-            return jsonify(
-                self.__model.get_sources()
-            )
+            return jsonify(self.__model.get_sources())
 
         @self.app.route("/api/query", methods=["GET"])
         def query():
             # Get params and validate them
             limit = fix_value_between(int(request.args.get("limit", 100)), 1, 1000)
-            max_pages = math.ceil(
-                self.__average_document_length.get_document_count() / limit
-            )
+            max_pages = math.ceil(self.__average_document_length.get_document_count() / limit)
             page = fix_value_between(int(request.args.get("page", 1)), 1, max_pages)
             max_summary_len = fix_value_between(
                 int(request.args.get("max_summary_len", 1)), 1, 4000
             )
             query = request.args.get("query", "")
+            cursor = request.args.get("cursor")
 
-            return jsonify(
-                self.__model.get_ranked_documents_dictionaries(
-                    self.__average_document_length,
-                    self.__termProcessor,
-                    query,
-                    page=page,
-                    limit=limit,
-                    max_summary_len=max_summary_len,
+            terms = self.__termProcessor.get_terms(query)
+            phrases = self.__termProcessor.get_phrases(query)
+            query_options = self.__get_query_options(phrases)
+            index_version = self.__query_cache.get_index_version()
+
+            # Keyset pagination: any cursor parameter, even empty, selects this mode
+            if cursor is not None:
+                try:
+                    after = decode_cursor(cursor)
+                except ValueError as e:
+                    return jsonify({"ERROR": str(e)}), 400
+
+                cache_key = QueryCache.build_key(
+                    terms, after, limit, max_summary_len, **query_options
                 )
-            )
+                cursor_page = self.__query_cache.get(cache_key)
+
+                if cursor_page is None:
+                    documents_dictionaries, last_key = (
+                        self.__query_engine.get_ranked_documents_dictionaries_after(
+                            self.__average_document_length,
+                            terms,
+                            after=after,
+                            limit=limit,
+                            max_summary_len=max_summary_len,
+                            **query_options,
+                        )
+                    )
+                    cursor_page = {
+                        "DOCUMENTS": documents_dictionaries,
+                        "NEXT_CURSOR": encode_cursor(last_key),
+                    }
+                    self.__query_cache.put(cache_key, cursor_page, index_version)
+
+                return self.__flag_ignored_phrases(jsonify(cursor_page), phrases)
+
+            cache_key = QueryCache.build_key(terms, page, limit, max_summary_len, **query_options)
+            documents_dictionaries = self.__query_cache.get(cache_key)
+
+            if documents_dictionaries is None:
+                documents_dictionaries = (
+                    self.__query_engine.get_ranked_documents_dictionaries_by_terms(
+                        self.__average_document_length,
+                        terms,
+                        page=page,
+                        limit=limit,
+                        max_summary_len=max_summary_len,
+                        **query_options,
+                    )
+                )
+                self.__query_cache.put(cache_key, documents_dictionaries, index_version)
+
+            return self.__flag_ignored_phrases(jsonify(documents_dictionaries), phrases)
 
     def run(self):
         thread = Thread(target=self.__model.keep_connection_alive)
         thread.daemon = True
         thread.start()
 
-        self.app.run(debug=True, host='127.0.0.1', port=5000)
+        watcher_thread = Thread(target=self.__watch_index_changes)
+        watcher_thread.daemon = True
+        watcher_thread.start()
+
+        if self.__segmented_index:
+            SegmentMerger(self.__segmented_index, self.__segment_merge_interval).start()
+
+        self.app.run(debug=True, host="127.0.0.1", port=5000)
 
 
 # Launch server
-app = Server()
-app.run()
\ No newline at end of file
+load_dotenv()
+app = Server(
+    query_engine=os.getenv("QUERY_ENGINE", "database"),
+    proximity_weight=float(os.getenv("QUERY_PROXIMITY_WEIGHT", 0)),
+    use_regex_tokenizer=os.getenv("REGEX_TOKENIZER", "false").lower() == "true",
+    stem_cache_path=os.getenv("STEM_CACHE_PATH"),
+    cache_size=int(os.getenv("QUERY_CACHE_SIZE", 1024)),
+    cache_time_to_live=float(os.getenv("QUERY_CACHE_TTL", 600)),
+    posting_file_path=os.getenv("POSTING_FILE_PATH"),
+    segment_directory=os.getenv("SEGMENT_DIRECTORY"),
+)
+app.run()
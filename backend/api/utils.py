@@ -1,2 +1,26 @@
+import base64
+import json
+
+
 def fix_value_between(value: int, min_value: int, max_value: int):
     return max(min(value, max_value), min_value)
+
+
+def encode_cursor(last_key: tuple[float, int] | None) -> str | None:
+    if last_key is None:
+        return None
+
+    score, document_id = last_key
+    payload = json.dumps([score, document_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[float, int] | None:
+    if not cursor:
+        return None
+
+    try:
+        score, document_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return (float(score), int(document_id))
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid cursor '{cursor}'")
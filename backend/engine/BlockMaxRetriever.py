@@ -0,0 +1,121 @@
+import numpy as np
+
+from backend.engine.TermPostings import TermPostings
+
+
+class BlockMaxRetriever:
+    # Upper bounds are added in a different order than actual scores, so a relative
+    # slack keeps floating point rounding from pruning a document that would qualify
+    bound_slack = 1e-9
+
+    def __init__(self, initial_batch_size: int = 16):
+        self.__initial_batch_size = initial_batch_size
+
+    def __select_top(
+        self, documents: np.ndarray, scores: np.ndarray, k: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        if len(scores) > k:
+            threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+            candidates = scores >= threshold
+            documents, scores = documents[candidates], scores[candidates]
+
+        order = np.lexsort((documents, -scores))[:k]
+        return documents[order], scores[order]
+
+    def __score_intervals(
+        self,
+        term_postings: list[TermPostings],
+        term_blocks: list[np.ndarray],
+        breakpoints: np.ndarray,
+        intervals: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        is_selected = np.zeros(len(breakpoints), dtype=bool)
+        is_selected[intervals] = True
+
+        matches = []
+        for postings, blocks in zip(term_postings, term_blocks):
+            # Each interval lies inside a single block of every term
+            selected_blocks = np.unique(blocks[intervals])
+            selected_blocks = selected_blocks[selected_blocks >= 0]
+            documents, scores = postings.get_block_postings(selected_blocks)
+
+            # Blocks may also cover intervals that were not selected
+            document_intervals = np.searchsorted(breakpoints, documents, side="right") - 1
+            in_selection = is_selected[document_intervals]
+            matches.append((documents[in_selection], scores[in_selection]))
+
+        candidates = np.unique(np.concatenate([documents for documents, _ in matches]))
+        candidate_scores = np.zeros(len(candidates), dtype=np.float64)
+
+        # Scores are added in query order so they match exhaustive evaluation exactly
+        for documents, scores in matches:
+            candidate_scores[np.searchsorted(candidates, documents)] += scores
+
+        return candidates, candidate_scores
+
+    def get_top_documents(
+        self, term_postings: list[TermPostings], k: int, after: tuple[float, int] | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        top_documents = np.empty(0, dtype=np.int64)
+        top_scores = np.empty(0, dtype=np.float64)
+
+        term_postings = sorted(term_postings, key=lambda postings: postings.get_query_position())
+        term_postings = [
+            postings for postings in term_postings if len(postings.get_block_first_documents())
+        ]
+        if not term_postings or k <= 0:
+            return top_documents, top_scores
+
+        # Block boundaries of all terms split the document space into intervals whose
+        # upper bound is the sum of the maxima of the blocks that cover them
+        breakpoints = np.unique(
+            np.concatenate([postings.get_block_first_documents() for postings in term_postings])
+        )
+        interval_bounds = np.zeros(len(breakpoints), dtype=np.float64)
+        term_blocks = []
+        for postings in term_postings:
+            blocks = (
+                np.searchsorted(postings.get_block_first_documents(), breakpoints, side="right") - 1
+            )
+            covered = blocks >= 0
+            interval_bounds[covered] += postings.get_block_maxima()[blocks[covered]]
+            term_blocks.append(blocks)
+
+        # Visit the most promising intervals first and stop once none can beat the
+        # threshold. Ties rank by ascending document, so an equal bound is not pruned
+        interval_order = np.argsort(-interval_bounds, kind="stable")
+        batch_start = 0
+        batch_size = self.__initial_batch_size
+        while batch_start < len(interval_order):
+            intervals = interval_order[batch_start : batch_start + batch_size]
+            batch_start += batch_size
+            batch_size *= 2
+
+            if len(top_scores) >= k:
+                threshold = top_scores[-1]
+                bounds = interval_bounds[intervals]
+                intervals = intervals[
+                    bounds + abs(threshold) * BlockMaxRetriever.bound_slack >= threshold
+                ]
+                if len(intervals) == 0:
+                    break
+
+            candidates, candidate_scores = self.__score_intervals(
+                term_postings, term_blocks, breakpoints, intervals
+            )
+
+            # Keyset pagination only keeps documents ranked after the last returned one
+            if after is not None:
+                after_score, after_document = after
+                is_after = (candidate_scores < after_score) | (
+                    (candidate_scores == after_score) & (candidates > after_document)
+                )
+                candidates, candidate_scores = candidates[is_after], candidate_scores[is_after]
+
+            top_documents, top_scores = self.__select_top(
+                np.concatenate((top_documents, candidates)),
+                np.concatenate((top_scores, candidate_scores)),
+                k,
+            )
+
+        return top_documents, top_scores
@@ -0,0 +1,164 @@
+import hashlib
+import re
+
+from collections import OrderedDict
+from threading import Lock
+from langdetect import DetectorFactory, detect
+from langdetect.lang_detect_exception import LangDetectException
+from backend.documentTypes import DocumentLanguage
+from backend.engine.utils import build_stopword_set_collection
+
+
+class LanguageDetector:
+    word_pattern = re.compile(r"[^\W\d_]+")
+    spanish_characters = set("ñáéíóúü¿¡")
+    spanish_suffixes = (
+        "ción",
+        "ciones",
+        "sión",
+        "dad",
+        "dades",
+        "miento",
+        "mientos",
+        "mente",
+        "ología",
+    )
+    english_suffixes = ("tion", "tions", "ness", "ing", "ship", "ology", "ment", "ments")
+    # Spelling cues for texts without stopwords or suffixes, like one word queries.
+    # Spanish words mostly end in -a, -o, -as or -os, but not the -oma of tumour
+    # names both languages share. English words often end in two consonants, and k,
+    # w, th, sh, ph or a y after a consonant are rare in Spanish
+    spanish_spelling_pattern = re.compile(r"(?<!om)[ao]s?$")
+    english_spelling_pattern = re.compile(r"[kw]|th|sh|ph|ee|oo|[^aeiouy]y|[^aeiouy]{2}$")
+
+    def __init__(
+        self,
+        short_text_words: int = 20,
+        min_confident_hits: int = 8,
+        max_detection_length: int = 2000,
+        deterministic: bool = True,
+        seed: int = 0,
+        cache_size: int = 100000,
+        default_language: DocumentLanguage = DocumentLanguage.ENGLISH.value,
+    ):
+        self.__short_text_words = short_text_words
+        self.__min_confident_hits = min_confident_hits
+        self.__max_detection_length = max_detection_length
+        self.__default_language = default_language
+        self.__cache_size = cache_size
+        self.__cache: OrderedDict[bytes, DocumentLanguage] = OrderedDict()
+        self.__lock = Lock()
+        self.__hits = 0
+        self.__misses = 0
+        self.__classified = 0
+        self.__detected = 0
+
+        # langdetect samples n-grams randomly, a fixed seed makes it repeatable
+        if deterministic:
+            DetectorFactory.seed = seed
+
+        # Words shared by both lists say nothing about the language
+        stopword_sets = build_stopword_set_collection()
+        english_stopwords = stopword_sets[DocumentLanguage.ENGLISH.value]
+        spanish_stopwords = stopword_sets[DocumentLanguage.SPANISH.value]
+        self.__english_stopwords = english_stopwords - spanish_stopwords
+        self.__spanish_stopwords = spanish_stopwords - english_stopwords
+
+    def __get_key(self, text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def __get_scores(self, words: list[str]) -> tuple[int, int]:
+        english_score = 0
+        spanish_score = 0
+        for word in words:
+            if word in self.__english_stopwords or word.endswith(LanguageDetector.english_suffixes):
+                english_score += 1
+            if (
+                word in self.__spanish_stopwords
+                or word.endswith(LanguageDetector.spanish_suffixes)
+                or not LanguageDetector.spanish_characters.isdisjoint(word)
+            ):
+                spanish_score += 1
+
+        return english_score, spanish_score
+
+    def __get_spelling_scores(self, words: list[str]) -> tuple[int, int]:
+        english_score = 0
+        spanish_score = 0
+        for word in words:
+            if LanguageDetector.english_spelling_pattern.search(word):
+                english_score += 1
+            elif LanguageDetector.spanish_spelling_pattern.search(word):
+                spanish_score += 1
+
+        return english_score, spanish_score
+
+    def __classify(self, text: str) -> DocumentLanguage:
+        text = text[: self.__max_detection_length].lower()
+        words = LanguageDetector.word_pattern.findall(text)
+        english_score, spanish_score = self.__get_scores(words)
+
+        # Short texts like queries are too small for langdetect, and long texts with
+        # a clear stopword majority do not need it
+        is_short = len(words) <= self.__short_text_words
+        is_confident = max(english_score, spanish_score) >= self.__min_confident_hits and (
+            min(english_score, spanish_score) * 3 <= max(english_score, spanish_score)
+        )
+        if is_short or is_confident:
+            self.__classified += 1
+            if is_short and english_score == spanish_score:
+                english_score, spanish_score = self.__get_spelling_scores(words)
+            if spanish_score > english_score:
+                return DocumentLanguage.SPANISH.value
+            if english_score > spanish_score:
+                return DocumentLanguage.ENGLISH.value
+            return self.__default_language
+
+        self.__detected += 1
+        try:
+            if detect(text) == "es":
+                return DocumentLanguage.SPANISH.value
+        except LangDetectException:
+            return self.__default_language
+
+        return DocumentLanguage.ENGLISH.value
+
+    def detect(self, text: str) -> DocumentLanguage:
+        key = self.__get_key(text)
+        with self.__lock:
+            language = self.__cache.get(key)
+            if language is not None:
+                self.__cache.move_to_end(key)
+                self.__hits += 1
+                return language
+
+            self.__misses += 1
+
+        language = self.__classify(text)
+        with self.__lock:
+            self.__cache[key] = language
+            while len(self.__cache) > self.__cache_size:
+                self.__cache.popitem(last=False)
+
+        return language
+
+    def detect_batch(self, texts: list[str]) -> list[DocumentLanguage]:
+        # Repeated texts in a batch, like summaries standing in for missing full
+        # texts, are classified once
+        languages = {}
+        for text in texts:
+            if text not in languages:
+                languages[text] = self.detect(text)
+
+        return [languages[text] for text in texts]
+
+    def get_statistics(self) -> dict:
+        with self.__lock:
+            return {
+                "HITS": self.__hits,
+                "MISSES": self.__misses,
+                "CLASSIFIED": self.__classified,
+                "DETECTED": self.__detected,
+                "SIZE": len(self.__cache),
+                "MAX_SIZE": self.__cache_size,
+            }
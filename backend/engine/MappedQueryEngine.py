@@ -0,0 +1,146 @@
+import numpy as np
+
+from backend.engine.BlockMaxRetriever import BlockMaxRetriever
+from backend.engine.TermProcessor import TermProcessor
+from backend.index.database.DatabaseModel import DatabaseModel
+from backend.index.database.entities.DocumentStatistics import DocumentStatistics
+from backend.index.postings.MappedTermPostings import MappedTermPostings
+from backend.index.postings.PostingFileReader import PostingFileReader
+
+
+class MappedQueryEngine:
+    def __init__(self, model: DatabaseModel, posting_file_path: str):
+        self.__model = model
+        self.__posting_file_path = posting_file_path
+        self.__block_max_retriever = BlockMaxRetriever()
+        self.load()
+
+    def load(self):
+        # Only the header, block table and dictionary are parsed, blocks are decoded on demand
+        self.__reader = PostingFileReader(self.__posting_file_path)
+
+        print(
+            "Mapped posting file",
+            self.__posting_file_path,
+            "with",
+            self.__reader.get_document_count(),
+            "documents,",
+            self.__reader.get_term_count(),
+            "terms,",
+            self.__reader.get_posting_count(),
+            "postings",
+        )
+
+    def __get_term_postings(
+        self, terms: set[str], k1: float, b: float, average_document_length: float
+    ) -> list[MappedTermPostings]:
+        # No terms matches every posting, same as the "1=1" filter of the SQL query
+        query_terms = terms if terms else self.__reader.get_terms()
+        return [
+            MappedTermPostings(query_position, self.__reader, term, k1, b, average_document_length)
+            for query_position, term in enumerate(query_terms)
+            if self.__reader.get_term_entry(term) is not None
+        ]
+
+    def __rank_documents(
+        self,
+        statistics: DocumentStatistics,
+        terms: set[str],
+        k1: float,
+        b: float,
+        k: int,
+        after: tuple[float, int] | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        term_postings = self.__get_term_postings(
+            terms, k1, b, statistics.get_average_document_length()
+        )
+        top_documents, top_scores = self.__block_max_retriever.get_top_documents(
+            term_postings, k, after=after
+        )
+
+        # Documents without any query term score zero and follow in ID order
+        if len(top_documents) < k:
+            document_ids = self.__reader.get_document_ids()
+            is_matched = np.zeros(len(document_ids), dtype=bool)
+            for postings in term_postings:
+                is_matched[np.searchsorted(document_ids, postings.get_documents())] = True
+
+            unranked_documents = document_ids[~is_matched]
+            if after is not None:
+                after_score, after_document = after
+                if after_score == 0:
+                    unranked_documents = unranked_documents[unranked_documents > after_document]
+                elif after_score < 0:
+                    unranked_documents = unranked_documents[:0]
+
+            unranked_documents = unranked_documents[: k - len(top_documents)]
+            top_documents = np.concatenate((top_documents, unranked_documents))
+            top_scores = np.concatenate((top_scores, np.zeros(len(unranked_documents))))
+
+        return top_documents.astype(np.int64), top_scores
+
+    def get_ranked_documents_dictionaries(
+        self,
+        statistics: DocumentStatistics,
+        termProcessor: TermProcessor,
+        query: str,
+        k1: float = 1.5,
+        b: float = 0.75,
+        page: int = 1,
+        limit: int = 10,
+        max_summary_len: str = 1000,
+    ) -> list[dict]:
+        terms = termProcessor.get_terms(query)
+        return self.get_ranked_documents_dictionaries_by_terms(
+            statistics,
+            terms,
+            k1=k1,
+            b=b,
+            page=page,
+            limit=limit,
+            max_summary_len=max_summary_len,
+        )
+
+    def get_ranked_documents_dictionaries_by_terms(
+        self,
+        statistics: DocumentStatistics,
+        terms: set[str],
+        k1: float = 1.5,
+        b: float = 0.75,
+        page: int = 1,
+        limit: int = 10,
+        max_summary_len: str = 1000,
+    ) -> list[dict]:
+        offset = (page - 1) * limit
+
+        if offset >= self.__reader.get_document_count():
+            return []
+
+        top_documents, _ = self.__rank_documents(statistics, terms, k1, b, offset + limit)
+        return self.__model.get_documents_dictionaries_by_ids(
+            top_documents[offset:].tolist(), max_summary_len
+        )
+
+    def get_ranked_documents_dictionaries_after(
+        self,
+        statistics: DocumentStatistics,
+        terms: set[str],
+        after: tuple[float, int] | None = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+        limit: int = 10,
+        max_summary_len: str = 1000,
+    ) -> tuple[list[dict], tuple[float, int] | None]:
+        # The posting file stores document IDs, so cursors apply without translation
+        top_documents, top_scores = self.__rank_documents(
+            statistics, terms, k1, b, limit, after=after
+        )
+
+        last_key = None
+        if len(top_documents) == limit:
+            last_key = (float(top_scores[-1]), int(top_documents[-1]))
+
+        documents_dictionaries = self.__model.get_documents_dictionaries_by_ids(
+            top_documents.tolist(), max_summary_len
+        )
+        return documents_dictionaries, last_key
@@ -0,0 +1,491 @@
+import numpy as np
+
+from backend.engine.BlockMaxRetriever import BlockMaxRetriever
+from backend.engine.TermPostings import TermPostings
+from backend.engine.TermProcessor import TermProcessor
+from backend.index.database.DatabaseModel import DatabaseModel
+from backend.index.database.entities.DocumentStatistics import DocumentStatistics
+from backend.index.postings.utils import decode_varints
+
+
+class MemoryQueryEngine:
+    document_keys = [
+        "TITLE",
+        "SUMMARY",
+        "DOCUMENT_TYPE",
+        "PUBLISH_DATE",
+        "DOCUMENT_URL",
+        "DOCUMENT_LANGUAGE",
+        "SOURCE_ID",
+    ]
+
+    # Block-max pruning is faster for a single term, whose block maxima bound scores
+    # tightly, and for queries whose postings are few next to the documents, where it
+    # skips the arrays over every document. Several frequent terms are scored exhaustively
+    pruning_posting_ratio = 0.125
+
+    def __init__(
+        self,
+        model: DatabaseModel,
+        use_dynamic_pruning: bool | None = None,
+        block_size: int = 64,
+        proximity_weight: float = 0,
+    ):
+        self.__model = model
+        self.__use_dynamic_pruning = use_dynamic_pruning
+        self.__block_size = block_size
+        self.__proximity_weight = proximity_weight
+        self.__block_max_retriever = BlockMaxRetriever()
+        self.load()
+
+    def load(self):
+        documents = self.__model.get_indexed_documents()
+        postings = self.__model.get_term_postings()
+
+        # Documents are kept sorted by ID so that dense indexes preserve ID order
+        self.__documents = [
+            {key: document[key] for key in MemoryQueryEngine.document_keys}
+            for document in documents
+        ]
+        self.__document_ids = np.array([document["ID"] for document in documents], dtype=np.int64)
+        self.__document_lengths = np.array(
+            [document["DOCUMENT_LENGTH"] for document in documents], dtype=np.float64
+        )
+
+        # Postings come ordered by term, so each term owns a contiguous slice
+        self.__vocabulary: dict[str, int] = {}
+        term_ids = np.empty(len(postings), dtype=np.int32)
+        posting_document_ids = np.empty(len(postings), dtype=np.int64)
+        posting_frequencies = np.empty(len(postings), dtype=np.int32)
+        posting_impacts = np.empty(len(postings), dtype=np.int64)
+        term_idfs = []
+        encoded_positions = []
+
+        for i, (term, document_id, term_frequency, impact, idf, positions) in enumerate(postings):
+            if term not in self.__vocabulary:
+                self.__vocabulary[term] = len(self.__vocabulary)
+                term_idfs.append(idf)
+
+            term_ids[i] = self.__vocabulary[term]
+            posting_document_ids[i] = document_id
+            posting_frequencies[i] = term_frequency
+            posting_impacts[i] = impact
+            encoded_positions.append(positions if positions else b"")
+
+        self.__term_idfs = np.array(term_idfs, dtype=np.float64)
+
+        # Postings referencing unknown documents cannot be ranked
+        posting_documents = np.searchsorted(self.__document_ids, posting_document_ids)
+        posting_documents = np.minimum(posting_documents, len(self.__document_ids) - 1)
+        known_postings = (
+            self.__document_ids[posting_documents] == posting_document_ids
+            if len(self.__document_ids)
+            else np.zeros(len(postings), dtype=bool)
+        )
+
+        self.__term_ids = term_ids[known_postings]
+        self.__posting_documents = posting_documents[known_postings].astype(np.int32)
+        self.__posting_frequencies = posting_frequencies[known_postings]
+        self.__posting_impacts = posting_impacts[known_postings]
+        self.__load_positions(encoded_positions, known_postings)
+        self.__term_offsets = np.searchsorted(
+            self.__term_ids, np.arange(len(self.__vocabulary) + 1)
+        )
+
+        # Fixed-size blocks never span two terms, so every term owns a range of blocks
+        term_lengths = np.diff(self.__term_offsets)
+        term_block_counts = -(-term_lengths // self.__block_size)
+        self.__term_block_offsets = np.concatenate(([0], np.cumsum(term_block_counts)))
+        self.__block_starts = np.concatenate(
+            [
+                np.arange(start, end, self.__block_size)
+                for start, end in zip(self.__term_offsets[:-1], self.__term_offsets[1:])
+            ]
+            + [np.empty(0, dtype=np.int64)]
+        ).astype(np.int64)
+
+        # Posting scores depend on k1, b and avdl, so they are built on first use
+        self.__scoring_parameters = None
+
+        print(
+            "Loaded in-memory index with",
+            len(self.__documents),
+            "documents,",
+            len(self.__vocabulary),
+            "terms,",
+            len(self.__term_ids),
+            "postings",
+        )
+
+    def __load_positions(self, encoded_positions: list[bytes], known_postings: np.ndarray):
+        # Every posting holds delta-encoded varints. They are decoded at once and the
+        # deltas are summed up within each posting
+        encoded_lengths = np.array(
+            [len(positions) for positions in encoded_positions], dtype=np.int64
+        )
+        encoded = np.frombuffer(b"".join(encoded_positions), dtype=np.uint8)
+        encoded_ends = np.cumsum(encoded_lengths)
+        value_ends = np.concatenate(([0], np.cumsum(encoded < 0x80)))
+        position_counts = value_ends[encoded_ends] - value_ends[encoded_ends - encoded_lengths]
+
+        sums = np.concatenate(([0], np.cumsum(decode_varints(encoded))))
+        position_offsets = np.concatenate(([0], np.cumsum(position_counts)))
+        positions = sums[1:] - np.repeat(sums[position_offsets[:-1]], position_counts)
+
+        is_known = np.repeat(known_postings, position_counts)
+        self.__positions = positions[is_known].astype(np.int32)
+        self.__position_offsets = np.concatenate(([0], np.cumsum(position_counts[known_postings])))
+
+    def __get_term_positions(self, term: str) -> tuple[np.ndarray, np.ndarray] | None:
+        posting_slice = self.__get_term_slice(term)
+        if posting_slice is None:
+            return None
+
+        start = self.__position_offsets[posting_slice.start]
+        end = self.__position_offsets[posting_slice.stop]
+        documents = np.repeat(
+            self.__posting_documents[posting_slice],
+            np.diff(self.__position_offsets[posting_slice.start : posting_slice.stop + 1]),
+        )
+        return documents, self.__positions[start:end]
+
+    def __get_phrase_documents(self, phrase: tuple[tuple[str, int], ...]) -> np.ndarray:
+        # A phrase occurs where every term appears at its offset from a common start,
+        # so occurrences are keyed by document and start position and intersected
+        stride = (int(self.__positions.max()) if len(self.__positions) else 0) + 1
+        stride += max(offset for _, offset in phrase)
+
+        phrase_keys = None
+        for term, offset in phrase:
+            term_positions = self.__get_term_positions(term)
+            if term_positions is None:
+                return np.empty(0, dtype=np.int64)
+
+            documents, positions = term_positions
+            keys = np.unique(documents.astype(np.int64) * stride + positions - offset)
+            phrase_keys = keys if phrase_keys is None else np.intersect1d(phrase_keys, keys)
+
+        return np.unique(phrase_keys // stride)
+
+    def __get_minimum_distances(
+        self, first_term: str, second_term: str
+    ) -> tuple[np.ndarray, np.ndarray]:
+        first_positions = self.__get_term_positions(first_term)
+        second_positions = self.__get_term_positions(second_term)
+        if first_positions is None or second_positions is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        # In the merged order of both position lists, the closest pair of a document
+        # is always found between two neighbours that belong to different terms
+        documents = np.concatenate((first_positions[0], second_positions[0]))
+        positions = np.concatenate((first_positions[1], second_positions[1]))
+        is_second = np.concatenate(
+            (
+                np.zeros(len(first_positions[0]), dtype=bool),
+                np.ones(len(second_positions[0]), dtype=bool),
+            )
+        )
+        order = np.lexsort((positions, documents))
+        documents, positions, is_second = documents[order], positions[order], is_second[order]
+
+        is_pair = (documents[1:] == documents[:-1]) & (is_second[1:] != is_second[:-1])
+        pair_documents = documents[1:][is_pair]
+        pair_distances = (positions[1:] - positions[:-1])[is_pair]
+
+        order = np.lexsort((pair_distances, pair_documents))
+        pair_documents, pair_distances = pair_documents[order], pair_distances[order]
+        is_first = np.concatenate(([True], pair_documents[1:] != pair_documents[:-1]))
+        return pair_documents[is_first], pair_distances[is_first]
+
+    def __get_proximity_scores(
+        self, terms: set[str], k1: float, b: float, avdl: float
+    ) -> np.ndarray:
+        # Term pair proximity of Rasolofo and Savoy: each pair of query terms adds a
+        # BM25-like contribution of 1 / distance^2, weighted by the rarer term
+        scores = np.zeros(len(self.__documents), dtype=np.float64)
+        length_norms = k1 * (1 - b + b * self.__document_lengths / avdl)
+        sorted_terms = sorted(term for term in terms if term in self.__vocabulary)
+
+        for i, first_term in enumerate(sorted_terms):
+            for second_term in sorted_terms[i + 1 :]:
+                documents, distances = self.__get_minimum_distances(first_term, second_term)
+                term_proximities = 1 / distances.astype(np.float64) ** 2
+                idf = min(
+                    self.__term_idfs[self.__vocabulary[first_term]],
+                    self.__term_idfs[self.__vocabulary[second_term]],
+                )
+                scores[documents] += (
+                    idf * (k1 + 1) * term_proximities / (length_norms[documents] + term_proximities)
+                )
+
+        # Impact scores are scaled integers, the boost follows the same scale
+        if k1 == DatabaseModel.impact_k1 and b == DatabaseModel.impact_b:
+            scores *= DatabaseModel.impact_scale
+
+        return scores * self.__proximity_weight
+
+    def __get_term_slice(self, term: str) -> slice | None:
+        term_id = self.__vocabulary.get(term)
+        if term_id is None:
+            return None
+
+        return slice(self.__term_offsets[term_id], self.__term_offsets[term_id + 1])
+
+    def __prepare_posting_scores(self, k1: float, b: float, avdl: float):
+        if self.__scoring_parameters == (k1, b, avdl):
+            return
+
+        # Impacts precomputed at index time make scores exact integer sums
+        if k1 == DatabaseModel.impact_k1 and b == DatabaseModel.impact_b:
+            self.__posting_scores = self.__posting_impacts.astype(np.float64)
+        else:
+            length_norms = k1 * (1 - b + b * self.__document_lengths / avdl)
+            frequencies = self.__posting_frequencies
+            self.__posting_scores = (
+                self.__term_idfs[self.__term_ids]
+                * (frequencies * (k1 + 1))
+                / (frequencies + length_norms[self.__posting_documents])
+            )
+
+        # Block maxima are the upper bounds used for pruning
+        self.__block_maxima = (
+            np.maximum.reduceat(self.__posting_scores, self.__block_starts)
+            if len(self.__block_starts)
+            else np.empty(0, dtype=np.float64)
+        )
+        self.__scoring_parameters = (k1, b, avdl)
+
+    def __get_term_postings(self, query_position: int, term: str) -> TermPostings | None:
+        term_id = self.__vocabulary.get(term)
+        if term_id is None:
+            return None
+
+        posting_slice = self.__get_term_slice(term)
+        block_slice = slice(
+            self.__term_block_offsets[term_id], self.__term_block_offsets[term_id + 1]
+        )
+        return TermPostings(
+            query_position,
+            self.__posting_documents[posting_slice],
+            self.__posting_scores[posting_slice],
+            self.__block_size,
+            self.__block_maxima[block_slice],
+        )
+
+    def __is_pruning_faster(self, terms: set[str]) -> bool:
+        if len(terms) == 1:
+            return True
+
+        posting_count = 0
+        for term in terms:
+            term_id = self.__vocabulary.get(term)
+            if term_id is not None:
+                posting_count += self.__term_offsets[term_id + 1] - self.__term_offsets[term_id]
+        return posting_count <= MemoryQueryEngine.pruning_posting_ratio * len(self.__documents)
+
+    def __is_after(
+        self, scores: np.ndarray, documents: np.ndarray, after: tuple[float, int]
+    ) -> np.ndarray:
+        after_score, after_document = after
+        return (scores < after_score) | ((scores == after_score) & (documents > after_document))
+
+    def __get_pruned_top_documents(
+        self, terms: set[str], k: int, after: tuple[float, int] | None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        term_postings = [
+            postings
+            for postings in (
+                self.__get_term_postings(query_position, term)
+                for query_position, term in enumerate(terms)
+            )
+            if postings is not None
+        ]
+        top_documents, top_scores = self.__block_max_retriever.get_top_documents(
+            term_postings, k, after=after
+        )
+
+        # Documents without any query term score zero and follow in ID order
+        if len(top_documents) < k:
+            is_matched = np.zeros(len(self.__documents), dtype=bool)
+            for postings in term_postings:
+                is_matched[postings.get_documents()] = True
+            unranked_documents = np.flatnonzero(~is_matched)
+            if after is not None:
+                unranked_documents = unranked_documents[
+                    self.__is_after(np.zeros(len(unranked_documents)), unranked_documents, after)
+                ]
+            unranked_documents = unranked_documents[: k - len(top_documents)]
+            top_documents = np.concatenate((top_documents, unranked_documents))
+            top_scores = np.concatenate((top_scores, np.zeros(len(unranked_documents))))
+
+        return top_documents.astype(np.int64), top_scores
+
+    def __score_documents(self, terms: set[str]) -> np.ndarray:
+        scores = np.zeros(len(self.__documents), dtype=np.float64)
+
+        # No terms matches every posting, same as the "1=1" filter of the SQL query
+        slices = (
+            [self.__get_term_slice(term) for term in terms]
+            if terms
+            else [slice(0, len(self.__term_ids))]
+        )
+
+        for posting_slice in slices:
+            if posting_slice is None:
+                continue
+
+            scores += np.bincount(
+                self.__posting_documents[posting_slice],
+                weights=self.__posting_scores[posting_slice],
+                minlength=len(scores),
+            )
+
+        return scores
+
+    def __get_top_documents(
+        self,
+        scores: np.ndarray,
+        k: int,
+        after: tuple[float, int] | None,
+        candidates: np.ndarray | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        if candidates is None:
+            candidates = np.arange(len(scores))
+        if after is not None:
+            candidates = candidates[self.__is_after(scores, candidates, after)]
+
+        # Partial selection followed by an ordering of the candidates only. Ties are
+        # broken by ascending document ID, which dense indexes already follow
+        if k < len(candidates):
+            candidate_scores = scores[candidates]
+            threshold = np.partition(candidate_scores, len(candidates) - k)[len(candidates) - k]
+            candidates = candidates[candidate_scores >= threshold]
+
+        order = np.lexsort((candidates, -scores[candidates]))
+        top_documents = candidates[order][:k]
+        return top_documents, scores[top_documents]
+
+    def __rank_documents(
+        self,
+        statistics: DocumentStatistics,
+        terms: set[str],
+        k1: float,
+        b: float,
+        k: int,
+        after: tuple[float, int] | None = None,
+        phrases: list[tuple[tuple[str, int], ...]] | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        average_document_length = statistics.get_average_document_length()
+        self.__prepare_posting_scores(k1, b, average_document_length)
+        use_proximity = self.__proximity_weight > 0 and len(terms) > 1
+
+        # Dynamic pruning needs at least one term, an empty query matches every posting.
+        # Phrases and proximity change scores beyond the block maxima
+        use_dynamic_pruning = (
+            self.__is_pruning_faster(terms)
+            if self.__use_dynamic_pruning is None
+            else self.__use_dynamic_pruning
+        )
+        if use_dynamic_pruning and terms and not phrases and not use_proximity:
+            return self.__get_pruned_top_documents(terms, k, after)
+
+        scores = self.__score_documents(terms)
+        if use_proximity:
+            scores += self.__get_proximity_scores(terms, k1, b, average_document_length)
+
+        # Only documents containing every quoted phrase are ranked
+        candidates = None
+        for phrase in phrases or []:
+            phrase_documents = self.__get_phrase_documents(phrase)
+            candidates = (
+                phrase_documents
+                if candidates is None
+                else np.intersect1d(candidates, phrase_documents)
+            )
+
+        return self.__get_top_documents(scores, k, after, candidates)
+
+    def __to_dictionaries(self, documents: np.ndarray, max_summary_len: int) -> list[dict]:
+        documents_dictionaries = []
+        for document_index in documents:
+            dictionary = dict(self.__documents[document_index])
+            dictionary["SUMMARY"] = (
+                dictionary["SUMMARY"][:max_summary_len] if dictionary["SUMMARY"] else ""
+            )
+            documents_dictionaries.append(dictionary)
+
+        return documents_dictionaries
+
+    def get_ranked_documents_dictionaries(
+        self,
+        statistics: DocumentStatistics,
+        termProcessor: TermProcessor,
+        query: str,
+        k1: float = 1.5,
+        b: float = 0.75,
+        page: int = 1,
+        limit: int = 10,
+        max_summary_len: str = 1000,
+    ) -> list[dict]:
+        terms = termProcessor.get_terms(query)
+        return self.get_ranked_documents_dictionaries_by_terms(
+            statistics,
+            terms,
+            k1=k1,
+            b=b,
+            page=page,
+            limit=limit,
+            max_summary_len=max_summary_len,
+            phrases=termProcessor.get_phrases(query),
+        )
+
+    def get_ranked_documents_dictionaries_by_terms(
+        self,
+        statistics: DocumentStatistics,
+        terms: set[str],
+        k1: float = 1.5,
+        b: float = 0.75,
+        page: int = 1,
+        limit: int = 10,
+        max_summary_len: str = 1000,
+        phrases: list[tuple[tuple[str, int], ...]] | None = None,
+    ) -> list[dict]:
+        offset = (page - 1) * limit
+
+        if offset >= len(self.__documents):
+            return []
+
+        top_documents, _ = self.__rank_documents(
+            statistics, terms, k1, b, offset + limit, phrases=phrases
+        )
+        return self.__to_dictionaries(top_documents[offset:], max_summary_len)
+
+    def get_ranked_documents_dictionaries_after(
+        self,
+        statistics: DocumentStatistics,
+        terms: set[str],
+        after: tuple[float, int] | None = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+        limit: int = 10,
+        max_summary_len: str = 1000,
+        phrases: list[tuple[tuple[str, int], ...]] | None = None,
+    ) -> tuple[list[dict], tuple[float, int] | None]:
+        # Cursors carry document IDs, dense indexes follow the same order
+        after_document = None
+        if after is not None:
+            after_score, after_id = after
+            after_document = (
+                after_score,
+                int(np.searchsorted(self.__document_ids, after_id, side="right")) - 1,
+            )
+
+        top_documents, top_scores = self.__rank_documents(
+            statistics, terms, k1, b, limit, after=after_document, phrases=phrases
+        )
+
+        last_key = None
+        if len(top_documents) == limit:
+            last_key = (float(top_scores[-1]), int(self.__document_ids[top_documents[-1]]))
+
+        return self.__to_dictionaries(top_documents, max_summary_len), last_key
@@ -0,0 +1,198 @@
+import numpy as np
+
+from backend.engine.BlockMaxRetriever import BlockMaxRetriever
+from backend.engine.TermProcessor import TermProcessor
+from backend.engine.utils import get_bm25_idf
+from backend.index.database.DatabaseModel import DatabaseModel
+from backend.index.database.entities.DocumentStatistics import DocumentStatistics
+from backend.index.postings.MappedTermPostings import MappedTermPostings
+from backend.index.segments.Segment import Segment
+from backend.index.segments.SegmentedIndex import SegmentedIndex
+
+
+class SegmentedQueryEngine:
+    def __init__(self, model: DatabaseModel, index: SegmentedIndex):
+        self.__model = model
+        self.__index = index
+        self.__block_max_retriever = BlockMaxRetriever()
+
+    def get_index(self) -> SegmentedIndex:
+        return self.__index
+
+    def get_statistics(self) -> DocumentStatistics:
+        document_count = self.__index.get_live_document_count()
+        return DocumentStatistics(
+            document_count,
+            self.__index.get_live_document_length() / document_count if document_count else 0,
+        )
+
+    def __get_term_idfs(self, segments: list[Segment], terms: list[str]) -> dict[str, float]:
+        # Like the document count, document frequencies keep counting deleted
+        # documents until a merge removes them
+        document_count = sum(segment.get_document_count() for segment in segments)
+        term_idfs = {}
+        for term in terms:
+            entries = [segment.get_reader().get_term_entry(term) for segment in segments]
+            document_frequency = sum(entry[0] for entry in entries if entry is not None)
+            if document_frequency > 0:
+                term_idfs[term] = get_bm25_idf(document_count, document_frequency)
+
+        return term_idfs
+
+    def __rank_segment(
+        self,
+        segment: Segment,
+        term_idfs: dict[str, float],
+        k1: float,
+        b: float,
+        average_document_length: float,
+        k: int,
+        after: tuple[float, int] | None,
+    ) -> tuple[np.ndarray, np.ndarray, list[MappedTermPostings]]:
+        reader = segment.get_reader()
+        term_postings = [
+            MappedTermPostings(
+                query_position,
+                reader,
+                term,
+                k1,
+                b,
+                average_document_length,
+                idf=idf,
+                deleted_documents=segment.get_deleted_documents(),
+            )
+            for query_position, (term, idf) in enumerate(term_idfs.items())
+            if reader.get_term_entry(term) is not None
+        ]
+        top_documents, top_scores = self.__block_max_retriever.get_top_documents(
+            term_postings, k, after=after
+        )
+        return top_documents, top_scores, term_postings
+
+    def __get_unranked_documents(
+        self, segment: Segment, term_postings: list[MappedTermPostings]
+    ) -> np.ndarray:
+        # Decodes every block of the query terms, only needed for short result lists
+        matched_documents = [postings.get_documents() for postings in term_postings]
+        matched_documents = (
+            np.concatenate(matched_documents) if matched_documents else np.empty(0, dtype=np.int64)
+        )
+        live_documents = segment.get_live_document_ids()
+        return live_documents[~np.isin(live_documents, matched_documents)]
+
+    def __rank_documents(
+        self,
+        terms: set[str],
+        k1: float,
+        b: float,
+        k: int,
+        after: tuple[float, int] | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        segments = self.__index.get_segments()
+        average_document_length = self.get_statistics().get_average_document_length()
+
+        # No terms matches every posting, same as the "1=1" filter of the SQL query
+        query_terms = (
+            list(terms)
+            if terms
+            else sorted({term for segment in segments for term in segment.get_reader().get_terms()})
+        )
+        term_idfs = self.__get_term_idfs(segments, query_terms)
+
+        # Every segment returns its own top k, live documents are unique across segments
+        top_documents = [np.empty(0, dtype=np.int64)]
+        top_scores = [np.empty(0, dtype=np.float64)]
+        segment_postings = []
+        for segment in segments:
+            documents, scores, term_postings = self.__rank_segment(
+                segment, term_idfs, k1, b, average_document_length, k, after
+            )
+            top_documents.append(documents)
+            top_scores.append(scores)
+            segment_postings.append((segment, term_postings))
+
+        top_documents = np.concatenate(top_documents).astype(np.int64)
+        top_scores = np.concatenate(top_scores)
+        order = np.lexsort((top_documents, -top_scores))[:k]
+        top_documents, top_scores = top_documents[order], top_scores[order]
+
+        # Documents without any query term score zero and follow in ID order
+        if len(top_documents) < k:
+            unranked_documents = [np.empty(0, dtype=np.int64)] + [
+                self.__get_unranked_documents(segment, term_postings)
+                for segment, term_postings in segment_postings
+            ]
+            unranked_documents = np.sort(np.concatenate(unranked_documents))
+            if after is not None:
+                after_score, after_document = after
+                if after_score == 0:
+                    unranked_documents = unranked_documents[unranked_documents > after_document]
+                elif after_score < 0:
+                    unranked_documents = unranked_documents[:0]
+
+            unranked_documents = unranked_documents[: k - len(top_documents)]
+            top_documents = np.concatenate((top_documents, unranked_documents))
+            top_scores = np.concatenate((top_scores, np.zeros(len(unranked_documents))))
+
+        return top_documents, top_scores
+
+    def get_ranked_documents_dictionaries(
+        self,
+        statistics: DocumentStatistics,
+        termProcessor: TermProcessor,
+        query: str,
+        k1: float = 1.5,
+        b: float = 0.75,
+        page: int = 1,
+        limit: int = 10,
+        max_summary_len: str = 1000,
+    ) -> list[dict]:
+        terms = termProcessor.get_terms(query)
+        return self.get_ranked_documents_dictionaries_by_terms(
+            statistics,
+            terms,
+            k1=k1,
+            b=b,
+            page=page,
+            limit=limit,
+            max_summary_len=max_summary_len,
+        )
+
+    # Statistics are computed across segments, the ones passed by the server only
+    # describe the last database indexing run
+    def get_ranked_documents_dictionaries_by_terms(
+        self,
+        statistics: DocumentStatistics,
+        terms: set[str],
+        k1: float = 1.5,
+        b: float = 0.75,
+        page: int = 1,
+        limit: int = 10,
+        max_summary_len: str = 1000,
+    ) -> list[dict]:
+        offset = (page - 1) * limit
+        top_documents, _ = self.__rank_documents(terms, k1, b, offset + limit)
+        return self.__model.get_documents_dictionaries_by_ids(
+            top_documents[offset:].tolist(), max_summary_len
+        )
+
+    def get_ranked_documents_dictionaries_after(
+        self,
+        statistics: DocumentStatistics,
+        terms: set[str],
+        after: tuple[float, int] | None = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+        limit: int = 10,
+        max_summary_len: str = 1000,
+    ) -> tuple[list[dict], tuple[float, int] | None]:
+        top_documents, top_scores = self.__rank_documents(terms, k1, b, limit, after=after)
+
+        last_key = None
+        if len(top_documents) == limit:
+            last_key = (float(top_scores[-1]), int(top_documents[-1]))
+
+        documents_dictionaries = self.__model.get_documents_dictionaries_by_ids(
+            top_documents.tolist(), max_summary_len
+        )
+        return documents_dictionaries, last_key
@@ -0,0 +1,116 @@
+import json
+import os
+
+from collections import OrderedDict
+from threading import Lock
+from backend.documentTypes import DocumentLanguage
+from backend.engine.utils import StemmerCollection
+
+
+class StemCache:
+    def __init__(
+        self,
+        stemmer_collection: StemmerCollection,
+        max_size: int = 500000,
+        record_new_stems: bool = False,
+    ):
+        self.__stemmer_collection = stemmer_collection
+        self.__max_size = max_size
+        self.__stems: OrderedDict[tuple[DocumentLanguage, str], str] = OrderedDict()
+        # Stems computed since the last pop_new_stems, for caches that another process saves
+        self.__new_stems: dict[tuple[DocumentLanguage, str], str] | None = (
+            {} if record_new_stems else None
+        )
+        self.__lock = Lock()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    def stem(self, language: DocumentLanguage, word: str) -> str:
+        key = (language, word)
+        with self.__lock:
+            stem = self.__stems.get(key)
+            if stem is not None:
+                self.__stems.move_to_end(key)
+                self.__hits += 1
+                return stem
+
+            self.__misses += 1
+
+        # Stemming runs outside the lock, two threads may compute the same stem
+        stem = self.__stemmer_collection[language].stem(word)
+        with self.__lock:
+            self.__stems[key] = stem
+            if self.__new_stems is not None:
+                self.__new_stems[key] = stem
+            while len(self.__stems) > self.__max_size:
+                self.__stems.popitem(last=False)
+                self.__evictions += 1
+
+        return stem
+
+    def pop_new_stems(self) -> dict[tuple[DocumentLanguage, str], str]:
+        with self.__lock:
+            if self.__new_stems is None:
+                return {}
+
+            new_stems, self.__new_stems = self.__new_stems, {}
+            return new_stems
+
+    def add_stems(self, stems: dict[tuple[DocumentLanguage, str], str]):
+        with self.__lock:
+            for key, stem in stems.items():
+                self.__stems[key] = stem
+                self.__stems.move_to_end(key)
+
+            while len(self.__stems) > self.__max_size:
+                self.__stems.popitem(last=False)
+                self.__evictions += 1
+
+    def save(self, path: str):
+        with self.__lock:
+            data = {}
+            for (language, word), stem in self.__stems.items():
+                data.setdefault(language, {})[word] = stem
+
+        # Written to a temporary file first so a concurrent load never reads a partial cache
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(data, file)
+        os.replace(temporary_path, path)
+
+    def load(self, path: str) -> int:
+        if not os.path.exists(path):
+            return 0
+
+        try:
+            with open(path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Could not load stem cache from {path}:", e)
+            return 0
+
+        with self.__lock:
+            for language, stems in data.items():
+                if language not in self.__stemmer_collection:
+                    continue
+
+                for word, stem in stems.items():
+                    self.__stems[(language, word)] = stem
+
+            while len(self.__stems) > self.__max_size:
+                self.__stems.popitem(last=False)
+
+            return len(self.__stems)
+
+    def get_statistics(self) -> dict:
+        with self.__lock:
+            lookups = self.__hits + self.__misses
+            return {
+                "HITS": self.__hits,
+                "MISSES": self.__misses,
+                "HIT_RATE": self.__hits / lookups if lookups > 0 else 0,
+                "EVICTIONS": self.__evictions,
+                "SIZE": len(self.__stems),
+                "MAX_SIZE": self.__max_size,
+            }
@@ -0,0 +1,36 @@
+import numpy as np
+
+
+class TermPostings:
+    def __init__(
+        self,
+        query_position: int,
+        documents: np.ndarray,
+        scores: np.ndarray,
+        block_size: int,
+        block_maxima: np.ndarray,
+    ):
+        self.__query_position = query_position
+        self.__documents = documents
+        self.__scores = scores
+        self.__block_size = block_size
+        self.__block_maxima = block_maxima
+
+    def get_query_position(self) -> int:
+        return self.__query_position
+
+    def get_documents(self) -> np.ndarray:
+        return self.__documents
+
+    def get_block_first_documents(self) -> np.ndarray:
+        return self.__documents[:: self.__block_size]
+
+    def get_block_maxima(self) -> np.ndarray:
+        return self.__block_maxima
+
+    def get_block_postings(self, blocks: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        positions = (
+            blocks[:, np.newaxis] * self.__block_size + np.arange(self.__block_size)
+        ).ravel()
+        positions = positions[positions < len(self.__documents)]
+        return self.__documents[positions], self.__scores[positions]
@@ -0,0 +1,152 @@
+import sys
+
+sys.path.append("/root/cancer_patient_search_engine")
+
+import argparse
+import math
+import time
+import numpy as np
+from backend.engine.MemoryQueryEngine import MemoryQueryEngine
+from backend.index.database.entities.DocumentStatistics import DocumentStatistics
+
+
+class SyntheticModel:
+    # Zipf-distributed terms, with the rows DatabaseModel would return to the engine
+    def __init__(self, document_count: int, term_count: int):
+        random_generator = np.random.default_rng(0)
+        term_weights = 1 / np.arange(1, term_count + 1)
+        term_weights /= term_weights.sum()
+        document_lengths = random_generator.integers(20, 200, document_count)
+
+        rows = []
+        for document_id, document_length in enumerate(document_lengths, start=1):
+            tokens = random_generator.choice(term_count, size=document_length // 4, p=term_weights)
+            term_ids, frequencies = np.unique(tokens, return_counts=True)
+            rows.extend(zip(term_ids.tolist(), [document_id] * len(term_ids), frequencies.tolist()))
+        rows.sort()
+
+        document_frequencies = np.bincount(
+            [term_id for term_id, _, _ in rows], minlength=term_count
+        )
+        self.average_document_length = float(document_lengths.mean())
+        self.__documents = [
+            {
+                "ID": document_id,
+                "DOCUMENT_LENGTH": int(document_length),
+                "TITLE": "",
+                "SUMMARY": "",
+                "DOCUMENT_TYPE": "",
+                "PUBLISH_DATE": None,
+                "DOCUMENT_URL": str(document_id),
+                "DOCUMENT_LANGUAGE": "english",
+                "SOURCE_ID": 1,
+            }
+            for document_id, document_length in enumerate(document_lengths, start=1)
+        ]
+        self.__postings = []
+        for term_id, document_id, frequency in rows:
+            idf = math.log((document_count + 1) / document_frequencies[term_id])
+            length_norm = (
+                1 - 0.75 + 0.75 * document_lengths[document_id - 1] / self.average_document_length
+            )
+            score = idf * frequency * 2.5 / (frequency + 1.5 * length_norm)
+            self.__postings.append(
+                (self.get_term(term_id), document_id, frequency, round(score * 1000), idf, b"")
+            )
+
+    def get_term(self, term_id: int) -> str:
+        return f"term{term_id:06d}"
+
+    def get_indexed_documents(self, max_summary_len: int = 4000) -> list[dict]:
+        return self.__documents
+
+    def get_term_postings(self) -> list[tuple]:
+        return self.__postings
+
+
+class SplitTermProcessor:
+    def get_terms(self, query: str, language=None) -> set[str]:
+        return set(query.split())
+
+    def get_phrases(self, query: str, language=None) -> list:
+        return []
+
+
+def measure(engine: MemoryQueryEngine, statistics, query: str, limit: int, repeats: int):
+    termProcessor = SplitTermProcessor()
+    engine.get_ranked_documents_dictionaries(statistics, termProcessor, query, limit=limit)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        documents = engine.get_ranked_documents_dictionaries(
+            statistics, termProcessor, query, limit=limit
+        )
+    elapsed_time = (time.perf_counter() - start) / repeats
+    return elapsed_time, [document["DOCUMENT_URL"] for document in documents]
+
+
+def print_times(name: str, elapsed_times: dict[str, float], query_count: int):
+    print(
+        f"  {name:<18}"
+        + "".join(
+            f" {engine_name} {elapsed_time / query_count * 1000:>7.2f} ms"
+            for engine_name, elapsed_time in elapsed_times.items()
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Exhaustive, block-max pruned and automatic in-memory retrieval"
+    )
+    parser.add_argument("--documents", type=int, default=100000, help="Documents to index")
+    parser.add_argument("--terms", type=int, default=20000, help="Vocabulary size")
+    parser.add_argument("--queries", type=int, default=20, help="Queries per query class")
+    parser.add_argument("--limit", type=int, default=10, help="Results per page")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per query")
+    args = parser.parse_args()
+
+    model = SyntheticModel(args.documents, args.terms)
+    statistics = DocumentStatistics(args.documents, model.average_document_length)
+    engines = {
+        "exhaustive": MemoryQueryEngine(model, use_dynamic_pruning=False),
+        "pruned": MemoryQueryEngine(model, use_dynamic_pruning=True),
+        "automatic": MemoryQueryEngine(model),
+    }
+
+    # Query classes by term count and by the rank of their most frequent term
+    random_generator = np.random.default_rng(1)
+    query_classes = {
+        "1 frequent term": (1, 0, 10),
+        "1 rare term": (1, 500, args.terms),
+        "2 frequent terms": (2, 0, 50),
+        "2 rare terms": (2, 500, args.terms),
+        "3 mixed terms": (3, 0, args.terms),
+        "4 frequent terms": (4, 0, 500),
+    }
+    totals = dict.fromkeys(engines, 0.0)
+    for name, (term_count, lowest_rank, highest_rank) in query_classes.items():
+        elapsed_times = dict.fromkeys(engines, 0.0)
+        for _ in range(args.queries):
+            term_ids = random_generator.integers(lowest_rank, highest_rank, term_count)
+            query = " ".join(model.get_term(int(term_id)) for term_id in term_ids)
+
+            results = []
+            for engine_name, engine in engines.items():
+                elapsed_time, documents = measure(
+                    engine, statistics, query, args.limit, args.repeats
+                )
+                elapsed_times[engine_name] += elapsed_time
+                results.append(documents)
+
+            # Every strategy must return the same page
+            assert all(documents == results[0] for documents in results), query
+
+        print_times(name, elapsed_times, args.queries)
+        for engine_name in engines:
+            totals[engine_name] += elapsed_times[engine_name]
+
+    print_times("all queries", totals, args.queries * len(query_classes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import sys
+
+sys.path.append("/root/cancer_patient_search_engine")
+
+import argparse
+import time
+from langdetect import DetectorFactory, detect
+from backend.engine.LanguageDetector import LanguageDetector
+
+sample_queries = [
+    ("small cell lung cancer", "english"),
+    ("leukemia treatment", "english"),
+    ("breast cancer survival rates", "english"),
+    ("side effects of chemotherapy", "english"),
+    ("multiple myeloma relapse", "english"),
+    ("leukemia", "english"),
+    ("breast", "english"),
+    ("cáncer de pulmón", "spanish"),
+    ("tratamiento de la leucemia", "spanish"),
+    ("supervivencia del cáncer de mama", "spanish"),
+    ("efectos secundarios de la quimioterapia", "spanish"),
+    ("radioterapia en niños", "spanish"),
+    ("leucemia", "spanish"),
+    ("mama", "spanish"),
+]
+
+
+def get_langdetect_language(text: str) -> str:
+    try:
+        return "spanish" if detect(text) == "es" else "english"
+    except Exception:
+        return "english"
+
+
+def measure(name: str, detect_language, texts: list, repeat: int) -> list:
+    elapsed_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        languages = [detect_language(text) for text in texts]
+        elapsed_times.append(time.perf_counter() - start)
+
+    call_count = sum(len(text) if isinstance(text, list) else 1 for text in texts)
+    latency = min(elapsed_times) / call_count * 1e6
+    print(f"  {name:<28} {latency:>10.1f} us/call")
+    return languages
+
+
+def report(label: str, texts: list[str], expected: list[str] | None, repeat: int):
+    print(f"{label} ({len(texts)} texts)")
+    # langdetect loads its language profiles on the first call
+    DetectorFactory.seed = 0
+    get_langdetect_language(texts[0])
+    baseline = measure("langdetect", get_langdetect_language, texts, repeat)
+
+    uncached_detector = LanguageDetector(cache_size=0)
+    cold = measure("LanguageDetector, uncached", uncached_detector.detect, texts, repeat)
+
+    detector = LanguageDetector()
+    detector.detect_batch(texts)
+    measure("LanguageDetector, cached", detector.detect, texts, repeat)
+    measure("LanguageDetector, batch", detector.detect_batch, [texts], repeat)
+
+    reference = expected if expected else baseline
+    reference_name = "labels" if expected else "langdetect"
+    for name, languages in [("langdetect", baseline), ("LanguageDetector", cold)]:
+        agreement = sum(a == b for a, b in zip(languages, reference)) / len(texts)
+        print(f"  {name} agreement with {reference_name}: {agreement:.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Per-call language identification latency for queries and abstracts"
+    )
+    parser.add_argument("--abstracts", help="Text file with one abstract per line")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of this many runs")
+    args = parser.parse_args()
+
+    report(
+        "Queries",
+        [query for query, _ in sample_queries],
+        [language for _, language in sample_queries],
+        args.repeat,
+    )
+
+    if args.abstracts:
+        with open(args.abstracts, "r", encoding="utf-8") as file:
+            abstracts = [line.strip() for line in file if line.strip()]
+        report("Abstracts", abstracts, None, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import sys
+
+sys.path.append("/root/cancer_patient_search_engine")
+
+import argparse
+import os
+import time
+from collections import Counter
+from nltk.tokenize import word_tokenize
+from pdfminer.high_level import extract_text
+from backend.engine.TermProcessor import TermProcessor
+from backend.engine.utils import (
+    build_punctuation_set,
+    build_stemmer_collection,
+    build_stopword_set_collection,
+    is_stopword,
+)
+from backend.utils import get_text_language
+
+
+# TermProcessor.get_term_frequencies before the single-pass tokenizer
+def get_legacy_term_frequencies(
+    text: str, language, stopword_set_collection, punctuation_set, stemmer_collection
+) -> dict[str, int]:
+    text = text.lower()
+    tokens = word_tokenize(text)
+    terms = set(
+        [
+            stemmer_collection[language].stem(term)
+            for term in tokens
+            if (
+                term.isalpha()
+                and len(term) > 3
+                and not is_stopword(term, language, stopword_set_collection)
+                and not term in punctuation_set
+            )
+        ]
+    )
+    term_frequencies = {}
+    for term in terms:
+        if term in term_frequencies:
+            term_frequencies[term] += 1
+        else:
+            term_frequencies[term] = 1
+
+    return term_frequencies
+
+
+def get_pdf_paths(paths: list[str]) -> list[str]:
+    pdf_paths = []
+    for path in paths:
+        if os.path.isdir(path):
+            pdf_paths.extend(
+                os.path.join(path, name)
+                for name in sorted(os.listdir(path))
+                if name.lower().endswith(".pdf")
+            )
+        else:
+            pdf_paths.append(path)
+
+    return pdf_paths
+
+
+def measure(name: str, get_term_frequencies, texts, token_count: int, repeat: int) -> list:
+    elapsed_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [get_term_frequencies(text, language) for text, language in texts]
+        elapsed_times.append(time.perf_counter() - start)
+
+    elapsed = min(elapsed_times)
+    print(f"{name:<32} {elapsed:>8.3f}s {token_count / elapsed:>14,.0f} tokens/s")
+    return results
+
+
+def get_agreement(expected: list[dict], actual: list[dict]) -> float:
+    # Share of occurrences counted identically by both tokenizers
+    matching = 0
+    total = 0
+    for expected_frequencies, actual_frequencies in zip(expected, actual):
+        for term in expected_frequencies.keys() | actual_frequencies.keys():
+            expected_count = expected_frequencies.get(term, 0)
+            actual_count = actual_frequencies.get(term, 0)
+            matching += min(expected_count, actual_count)
+            total += max(expected_count, actual_count)
+
+    return matching / total if total > 0 else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Tokenizer throughput on full-text PDFs, in word_tokenize tokens per second"
+    )
+    parser.add_argument("paths", nargs="+", help="PDF files or directories containing PDFs")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of this many runs")
+    args = parser.parse_args()
+
+    texts = []
+    for pdf_path in get_pdf_paths(args.paths):
+        text = extract_text(pdf_path)
+        if text.strip():
+            # Language detection is left out of the measurements
+            texts.append((text, get_text_language(text.lower())))
+
+    token_count = sum(len(word_tokenize(text.lower())) for text, _ in texts)
+    print("Documents:", len(texts))
+    print("Tokens:", token_count)
+
+    stopword_set_collection = build_stopword_set_collection()
+    punctuation_set = build_punctuation_set()
+    stemmer_collection = build_stemmer_collection()
+
+    measure(
+        "legacy (word_tokenize, set)",
+        lambda text, language: get_legacy_term_frequencies(
+            text, language, stopword_set_collection, punctuation_set, stemmer_collection
+        ),
+        texts,
+        token_count,
+        args.repeat,
+    )
+    expected = measure(
+        "single pass (word_tokenize)",
+        TermProcessor().get_term_frequencies,
+        texts,
+        token_count,
+        args.repeat,
+    )
+    actual = measure(
+        "single pass (regex)",
+        TermProcessor(use_regex_tokenizer=True).get_term_frequencies,
+        texts,
+        token_count,
+        args.repeat,
+    )
+
+    print(f"Regex term agreement with word_tokenize: {get_agreement(expected, actual):.4%}")
+
+    # Tokens include the punctuation and short words the terms leave out
+    expected_tokens = [Counter(word_tokenize(text.lower())) for text, _ in texts]
+    actual_tokens = [
+        Counter(match.group() for match in TermProcessor.token_pattern.finditer(text.lower()))
+        for text, _ in texts
+    ]
+    print(
+        "Regex token agreement with word_tokenize:",
+        f"{get_agreement(expected_tokens, actual_tokens):.4%}",
+    )
+    differences = Counter()
+    for expected_counts, actual_counts in zip(expected_tokens, actual_tokens):
+        differences.update(expected_counts - actual_counts)
+        differences.update(actual_counts - expected_counts)
+    print("Most frequent differing tokens:", differences.most_common(10))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import math
 from typing import TypeAlias
 from string import punctuation
 from nltk.corpus import stopwords
@@ -12,8 +13,7 @@ StemmerCollection: TypeAlias = dict[DocumentLanguage, SnowballStemmer]
 def build_stopword_set_collection() -> StopwordSetCollection:
     download("stopwords")
     stopwords_sets = {
-        language: set(stopwords.words(language))
-        for language in DocumentLanguage.get_values()
+        language: set(stopwords.words(language)) for language in DocumentLanguage.get_values()
     }
 
     return stopwords_sets
@@ -29,8 +29,7 @@ def build_punctuation_set() -> set[str]:
 def build_stemmer_collection() -> StemmerCollection:
     download("stopwords")
     stemmer_collection = {
-        language: SnowballStemmer(language)
-        for language in DocumentLanguage.get_values()
+        language: SnowballStemmer(language) for language in DocumentLanguage.get_values()
     }
 
     return stemmer_collection
@@ -40,3 +39,22 @@ def is_stopword(
     word: str, language: DocumentLanguage, stopwords_sets: StopwordSetCollection
 ) -> bool:
     return word.lower() in stopwords_sets[language]
+
+
+def get_bm25_idf(document_count: int, document_frequency: int) -> float:
+    return math.log((document_count + 1) / document_frequency)
+
+
+def get_bm25_impact(
+    term_frequency: int,
+    document_length: int,
+    average_document_length: float,
+    idf: float,
+    k1: float,
+    b: float,
+    scale: int,
+) -> int:
+    # Quantized to an integer so query time scoring is a plain sum
+    length_norm = k1 * (1 - b + b * document_length / average_document_length)
+    score = idf * (term_frequency * (k1 + 1)) / (term_frequency + length_norm)
+    return round(score * scale)
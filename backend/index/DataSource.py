@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
+from typing import AsyncIterator
 
+from backend.index.HttpClient import HttpClient
 from backend.index.database.entities.Document import Document
 from backend.index.database.entities.Source import Source
 
@@ -7,6 +9,13 @@ from backend.index.database.entities.Source import Source
 class DataSource(ABC):
     agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 
+    def __init__(self, http_client: HttpClient | None = None):
+        # Sources of an indexing run share one client, so connections are reused
+        self._http_client = http_client if http_client else HttpClient()
+
+    def get_http_client(self) -> HttpClient:
+        return self._http_client
+
     @abstractmethod
     async def get_source_data(self) -> Source:
         pass
@@ -15,6 +24,13 @@ class DataSource(ABC):
     def get_source_name(self) -> str:
         pass
 
+    def get_extraction_failures(self) -> dict[str, int]:
+        return {}
+
+    def get_removed_document_urls(self) -> list[str]:
+        # URLs the last collection found to be gone, deleted by incremental runs
+        return []
+
     @abstractmethod
     async def get_document_text(self, document_data: Document) -> str:
         pass
@@ -22,3 +38,9 @@ class DataSource(ABC):
     @abstractmethod
     async def get_document_collection_data(self, source_id: int) -> list[Document]:
         pass
+
+    async def iterate_document_collection_data(
+        self, source_id: int
+    ) -> AsyncIterator[list[Document]]:
+        # Sources without pagination deliver their whole collection as one page
+        yield list(await self.get_document_collection_data(source_id))
@@ -0,0 +1,97 @@
+import aiohttp
+
+from types import SimpleNamespace
+
+
+class HttpClient:
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 8,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 30,
+        total_timeout: float = 120,
+        connect_timeout: float = 10,
+        read_timeout: float = 60,
+    ):
+        self.__limit = limit
+        self.__limit_per_host = limit_per_host
+        self.__dns_cache_ttl = dns_cache_ttl
+        self.__keepalive_timeout = keepalive_timeout
+        self.__timeout = aiohttp.ClientTimeout(
+            total=total_timeout, connect=connect_timeout, sock_read=read_timeout
+        )
+        self.__session: aiohttp.ClientSession | None = None
+        self.__requests = 0
+        self.__failed_requests = 0
+        self.__new_connections = 0
+        self.__reused_connections = 0
+        self.__dns_cache_hits = 0
+        self.__dns_cache_misses = 0
+
+    def __build_trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_end(session, context: SimpleNamespace, params):
+            self.__requests += 1
+
+        async def on_request_exception(session, context: SimpleNamespace, params):
+            self.__failed_requests += 1
+
+        async def on_connection_create_end(session, context: SimpleNamespace, params):
+            self.__new_connections += 1
+
+        async def on_connection_reuseconn(session, context: SimpleNamespace, params):
+            self.__reused_connections += 1
+
+        async def on_dns_cache_hit(session, context: SimpleNamespace, params):
+            self.__dns_cache_hits += 1
+
+        async def on_dns_cache_miss(session, context: SimpleNamespace, params):
+            self.__dns_cache_misses += 1
+
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace_config
+
+    def get_session(self) -> aiohttp.ClientSession:
+        # The session is created on first use, inside the event loop that runs the index
+        if self.__session is None or self.__session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.__limit,
+                limit_per_host=self.__limit_per_host,
+                ttl_dns_cache=self.__dns_cache_ttl,
+                keepalive_timeout=self.__keepalive_timeout,
+            )
+            self.__session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.__timeout,
+                trace_configs=[self.__build_trace_config()],
+            )
+
+        return self.__session
+
+    def get(self, url: str, **kwargs):
+        return self.get_session().get(url, **kwargs)
+
+    async def close(self):
+        if self.__session is not None and not self.__session.closed:
+            await self.__session.close()
+
+        self.__session = None
+
+    def get_statistics(self) -> dict:
+        connections = self.__new_connections + self.__reused_connections
+        return {
+            "REQUESTS": self.__requests,
+            "FAILED_REQUESTS": self.__failed_requests,
+            "NEW_CONNECTIONS": self.__new_connections,
+            "REUSED_CONNECTIONS": self.__reused_connections,
+            "REUSE_RATE": self.__reused_connections / connections if connections else 0.0,
+            "DNS_CACHE_HITS": self.__dns_cache_hits,
+            "DNS_CACHE_MISSES": self.__dns_cache_misses,
+        }
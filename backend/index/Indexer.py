@@ -1,8 +1,17 @@
 import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from backend.documentTypes import DocumentLanguage
 from backend.engine.TermProcessor import TermProcessor
 from backend.index.DataSource import DataSource
 from backend.index.database.DatabaseModel import DatabaseModel
-from backend.index.database.entities.Document import Document
+from backend.index.partialIndexing import (
+    PartialIndex,
+    build_partial_index,
+    build_worker_partial_index,
+    initialize_worker,
+)
+from backend.index.segments.SegmentedIndex import SegmentedIndex
+from backend.utils import get_language_detector
 
 
 class Indexer:
@@ -11,52 +20,394 @@ class Indexer:
         model: DatabaseModel,
         termProcessor: TermProcessor,
         sources: list[DataSource],
+        posting_file_path: str | None = None,
+        segmented_index: SegmentedIndex | None = None,
+        worker_count: int = 0,
+        batch_size: int = 64,
+        text_worker_count: int = 16,
+        queue_size: int = 256,
+        report_interval: float = 10,
+        incremental: bool = False,
     ):
         self.__model = model
         self.__termProcessor = termProcessor
         self.__sources = sources
+        self.__posting_file_path = posting_file_path
+        self.__segmented_index = segmented_index
+        self.__worker_count = worker_count
+        self.__batch_size = batch_size
+        self.__text_worker_count = text_worker_count
+        self.__queue_size = queue_size
+        self.__report_interval = report_interval
+        self.__incremental = incremental
+        self.__pool: ProcessPoolExecutor | None = None
         self.__progress_indicators = {source.get_source_name(): 0 for source in sources}
+        self.__unchanged_documents = {source.get_source_name(): 0 for source in sources}
+        self.__recorded_documents = {source.get_source_name(): 0 for source in sources}
+        self.__queues: dict[str, asyncio.Queue] = {}
+        self.__maximum_queue_depths: dict[str, int] = {}
+        # Documents are keyed by their source and position in its listing. Tokenized
+        # documents wait in the reorder buffer until IDs can be given in source order
+        self.__source_windows: list[asyncio.Semaphore] = []
+        self.__document_counts: dict[int, int] = {}
+        self.__pending_documents: dict[tuple[int, int], tuple | None] = {}
+        self.__next_document: tuple[int, int, int] = (0, 0, 0)
 
-    async def __index_document(self, source: DataSource, document_data: Document):
-        text = await source.get_document_text(document_data)
-        terms = self.__termProcessor.get_term_frequencies(text)
+    async def __put(self, queue_name: str, item):
+        queue = self.__queues[queue_name]
+        await queue.put(item)
+        self.__maximum_queue_depths[queue_name] = max(
+            self.__maximum_queue_depths[queue_name], queue.qsize()
+        )
+
+    async def __fetch_metadata(self, source: DataSource, source_id: int, source_index: int):
+        position = 0
+        async for documents_data in source.iterate_document_collection_data(source_id):
+            for document_data in documents_data:
+                if self.__model.is_document_recorded(document_data.get_document_url()):
+                    self.__recorded_documents[source.get_source_name()] += 1
+                    continue
+                # A source gets at most a window of documents ahead of the reorder buffer
+                await self.__source_windows[source_index].acquire()
+                await self.__put("texts", ((source_index, position), source, document_data))
+                position += 1
+
+        for document_url in source.get_removed_document_urls():
+            self.__model.remove_document(document_url)
+
+        # The empty message lets the accumulator move past the source's last document
+        self.__document_counts[source_index] = position
+        await self.__put("postings", ([], None))
+
+    async def __drop_document(self, document_key: tuple[int, int]):
+        # Documents that get no postings still take their turn in the reorder buffer
+        await self.__put("postings", ([(document_key, None, None, None)], None))
 
-        # Add document
-        document_id = self.__model.insert_document(document_data)
+    async def __fetch_texts(self):
+        queue = self.__queues["texts"]
+        while True:
+            document_key, source, document_data = await queue.get()
+            try:
+                text = await source.get_document_text(document_data)
 
-        # Add terms with their frequency
-        for term in terms:
-            self.__model.record_term_frequency(document_id, term, terms[term])
+                # Incremental runs skip documents stored with the same content
+                content_hash = document_data.get_content_hash(text)
+                if self.__model.is_document_indexed(document_data.get_document_url(), content_hash):
+                    self.__unchanged_documents[source.get_source_name()] += 1
+                    await self.__drop_document(document_key)
+                    continue
 
-        self.__progress_indicators[source.get_source_name()] += 1
+                await self.__put(
+                    "tokens", (document_key, source, document_data, text, content_hash)
+                )
+            except Exception as e:
+                print("Error getting text of document:", document_data.get_document_url(), e)
+                await self.__drop_document(document_key)
+            finally:
+                queue.task_done()
 
-        print(
-            "Successfully indexed document for source:",
-            source.get_source_name(),
-            document_data.get_document_url(),
+    async def __build_partial_index(
+        self, documents: list[tuple[str, DocumentLanguage]]
+    ) -> PartialIndex:
+        if self.__pool is None:
+            return build_partial_index(documents, self.__termProcessor)
+
+        # Tokenizing in worker processes keeps the event loop free for downloads
+        loop = asyncio.get_running_loop()
+        partial_index, new_stems = await loop.run_in_executor(
+            self.__pool, build_worker_partial_index, documents
         )
+        # Merged so save_stem_cache keeps what the workers stemmed
+        self.__termProcessor.get_stem_cache().add_stems(new_stems)
+        return partial_index
+
+    async def __tokenize_batch(self, batch: list[tuple]):
+        # Languages of the whole batch are identified at once
+        texts = [text for _, _, _, text, _ in batch]
+        languages = get_language_detector().detect_batch(texts)
+        partial_index = await self.__build_partial_index(list(zip(texts, languages)))
+        documents = [
+            (document_key, source, data, content_hash)
+            for document_key, source, data, _, content_hash in batch
+        ]
+        await self.__put("postings", (documents, partial_index))
+
+    async def __tokenize(self):
+        queue = self.__queues["tokens"]
+        while True:
+            # A batch takes whatever is waiting, up to the batch size
+            batch = [await queue.get()]
+            while len(batch) < self.__batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            try:
+                await self.__tokenize_batch(batch)
+            except Exception as e:
+                # A bad document fails its whole batch, the others are tokenized again
+                # one at a time so that only the bad one is dropped
+                print("Error tokenizing documents, retrying one at a time:", e)
+                for document in batch:
+                    try:
+                        await self.__tokenize_batch([document])
+                    except Exception as e:
+                        print("Error tokenizing document:", document[2].get_document_url(), e)
+                        await self.__drop_document(document[0])
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    def __buffer_documents(self, documents: list[tuple], partial_index: PartialIndex | None):
+        # A missing partial index marks documents that were dropped
+        if partial_index is None:
+            for document_key, _, _, _ in documents:
+                self.__pending_documents[document_key] = None
+            return
+
+        # Split by document, as they may be given IDs together with other batches
+        document_lengths, inverted_index = partial_index
+        term_positions = [{} for _ in documents]
+        for term, postings in inverted_index.items():
+            for document_number, positions in postings.items():
+                term_positions[document_number][term] = positions
+
+        for document_number, (document_key, source, document_data, content_hash) in enumerate(
+            documents
+        ):
+            self.__pending_documents[document_key] = (
+                source,
+                document_data,
+                content_hash,
+                document_lengths[document_number],
+                term_positions[document_number],
+            )
+
+    def __pop_ready_documents(self) -> list[tuple]:
+        # Sources take turns giving their next window of documents, so IDs follow the
+        # listings whatever order the stages finish in
+        window = self.__queue_size
+        ready_documents = []
+        while True:
+            block, source_index, position = self.__next_document
+            if len(self.__document_counts) == len(self.__sources) and block * window >= max(
+                self.__document_counts.values(), default=0
+            ):
+                return ready_documents
+
+            document_count = self.__document_counts.get(source_index)
+            if position >= (block + 1) * window or (
+                document_count is not None and position >= document_count
+            ):
+                if source_index + 1 < len(self.__sources):
+                    self.__next_document = (block, source_index + 1, block * window)
+                else:
+                    self.__next_document = (block + 1, 0, (block + 1) * window)
+                continue
+
+            if (source_index, position) not in self.__pending_documents:
+                return ready_documents
+
+            document = self.__pending_documents.pop((source_index, position))
+            self.__source_windows[source_index].release()
+            if document is not None:
+                ready_documents.append(document)
+            self.__next_document = (block, source_index, position + 1)
+
+    async def __record_ready_documents(self):
+        documents = self.__pop_ready_documents()
+        if not documents:
+            return
+
+        # IDs are only reserved for documents with postings, so a document that
+        # failed an earlier stage never becomes an empty DOCUMENT row
+        document_ids = [
+            self.__model.insert_document(document_data, content_hash)
+            for _, document_data, content_hash, _, _ in documents
+        ]
+        inverted_index = {}
+        for document_number, (_, _, _, _, term_positions) in enumerate(documents):
+            for term, positions in term_positions.items():
+                if term in inverted_index:
+                    inverted_index[term][document_number] = positions
+                else:
+                    inverted_index[term] = {document_number: positions}
+        document_lengths = [document_length for _, _, _, document_length, _ in documents]
+        self.__model.record_partial_index(document_ids, (document_lengths, inverted_index))
+        # No postings are recorded while the flush runs, the other stages go on
+        if self.__model.is_document_flush_due():
+            await asyncio.to_thread(self.__model.flush_documents)
 
-    async def __index_documents(self, source: DataSource, source_id: int):
-        documents_data = await source.get_document_collection_data(source_id)
-        tasks = []
-        for document_data in documents_data:
-            task = self.__index_document(source, document_data)
-            tasks.append(task)
-        await asyncio.gather(*tasks)
+        for source, document_data, _, _, _ in documents:
+            self.__progress_indicators[source.get_source_name()] += 1
+            print(
+                "Successfully indexed document for source:",
+                source.get_source_name(),
+                document_data.get_document_url(),
+            )
+
+    async def __accumulate_postings(self):
+        queue = self.__queues["postings"]
+        while True:
+            documents, partial_index = await queue.get()
+            try:
+                self.__buffer_documents(documents, partial_index)
+                await self.__record_ready_documents()
+            except Exception as e:
+                print("Error recording postings:", e)
+            finally:
+                queue.task_done()
+
+    def __get_queue_depths(self) -> dict[str, str]:
+        return {
+            name: f"{queue.qsize()}/{queue.maxsize} (max {self.__maximum_queue_depths[name]})"
+            for name, queue in self.__queues.items()
+        }
+
+    async def __report_queue_depths(self):
+        while True:
+            await asyncio.sleep(self.__report_interval)
+            print("Queue depths:", self.__get_queue_depths())
+            print("Indexed documents:", self.__progress_indicators)
+            if self.__model.is_incremental():
+                print("Unchanged documents:", self.__unchanged_documents)
+
+    async def __run_stage(self, workers: list[asyncio.Task], queue_name: str):
+        # Upstream is done once its queue drains, the idle workers are stopped
+        try:
+            await self.__queues[queue_name].join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def __index_documents(self, source_ids: list[int]):
+        # Bounded queues apply backpressure, a slow stage pauses the ones before it
+        # so only a fixed number of documents and texts are held at any time
+        self.__queues = {
+            "texts": asyncio.Queue(self.__queue_size),
+            "tokens": asyncio.Queue(self.__queue_size),
+            "postings": asyncio.Queue(max(self.__worker_count, 1) * 2),
+        }
+        self.__maximum_queue_depths = {name: 0 for name in self.__queues}
+        self.__source_windows = [asyncio.Semaphore(self.__queue_size) for _ in self.__sources]
+        self.__document_counts = {}
+        self.__pending_documents = {}
+        self.__next_document = (0, 0, 0)
+
+        tokenizer_count = max(self.__worker_count, 1)
+        text_workers = [
+            asyncio.create_task(self.__fetch_texts()) for _ in range(self.__text_worker_count)
+        ]
+        tokenizers = [asyncio.create_task(self.__tokenize()) for _ in range(tokenizer_count)]
+        accumulators = [asyncio.create_task(self.__accumulate_postings())]
+        reporter = asyncio.create_task(self.__report_queue_depths())
+
+        try:
+            await asyncio.gather(
+                *[
+                    self.__fetch_metadata(source, source_id, source_index)
+                    for source_index, (source, source_id) in enumerate(
+                        zip(self.__sources, source_ids)
+                    )
+                ]
+            )
+            await self.__run_stage(text_workers, "texts")
+            await self.__run_stage(tokenizers, "tokens")
+            await self.__run_stage(accumulators, "postings")
+        finally:
+            for task in text_workers + tokenizers + accumulators + [reporter]:
+                task.cancel()
+            await asyncio.gather(
+                *text_workers, *tokenizers, *accumulators, reporter, return_exceptions=True
+            )
+
+        print("Queue depths:", self.__get_queue_depths())
+        if self.__model.is_incremental():
+            print("Unchanged documents:", self.__unchanged_documents)
+        if any(self.__recorded_documents.values()):
+            print("Documents recorded before resuming:", self.__recorded_documents)
+        for source in self.__sources:
+            extraction_failures = source.get_extraction_failures()
+            if any(extraction_failures.values()):
+                print(
+                    "Text extraction failures for source:",
+                    source.get_source_name(),
+                    extraction_failures,
+                )
+
+    async def __close_http_clients(self):
+        # Sources usually share a single client, each one is closed once
+        http_clients = []
+        for source in self.__sources:
+            if not any(source.get_http_client() is client for client in http_clients):
+                http_clients.append(source.get_http_client())
+
+        for http_client in http_clients:
+            print("HTTP client statistics:", http_client.get_statistics())
+            await http_client.close()
 
     async def index(self, use_dump_data: bool):
         print("Started indexing process")
 
         if not use_dump_data:
-            tasks = []
-            for source in self.__sources:
-                source_data = await source.get_source_data()
-                source_id = self.__model.insert_source(source_data)
-                task = self.__index_documents(source, source_id)
+            # A resumed run keeps the mode of the run it continues
+            if self.__incremental or self.__model.is_incremental():
+                self.__model.start_incremental_indexing()
+
+            if self.__worker_count > 0:
+                self.__pool = ProcessPoolExecutor(
+                    max_workers=self.__worker_count,
+                    initializer=initialize_worker,
+                    initargs=(
+                        self.__termProcessor.is_using_regex_tokenizer(),
+                        self.__termProcessor.get_stem_cache_path(),
+                    ),
+                )
+
+            # Source metadata, favicons included, is fetched for all sources at once
+            sources_data = await asyncio.gather(
+                *[source.get_source_data() for source in self.__sources]
+            )
+
+            source_ids = [self.__model.insert_source(source_data) for source_data in sources_data]
 
-                tasks.append(task)
+            try:
+                await self.__index_documents(source_ids)
+            finally:
+                if self.__pool is not None:
+                    self.__pool.shutdown()
+                    self.__pool = None
 
-            await asyncio.gather(*tasks)
+                await self.__close_http_clients()
 
         self.__model.commit_insertions()
+
+        self.__termProcessor.save_stem_cache()
+        print("Stem cache statistics:", self.__termProcessor.get_stem_cache().get_statistics())
+        print("Language detection statistics:", get_language_detector().get_statistics())
+
+        # A posting file holds the whole corpus, incremental runs only know the changes
+        if self.__posting_file_path and self.__model.is_incremental():
+            print("Posting file is not written by incremental runs, use a segmented index")
+        elif self.__posting_file_path:
+            file_size = self.__model.write_posting_file(self.__posting_file_path)
+            print(f"Wrote {file_size} bytes posting file to {self.__posting_file_path}")
+
+        # Each run becomes a new immutable segment, merged later in the background.
+        # Changed documents replace their older copies, removed ones are deleted. A full
+        # run refills empty tables, its IDs say nothing about older segments, which it
+        # replaces
+        if self.__segmented_index:
+            if self.__model.get_committed_document_ids():
+                segment_path = self.__segmented_index.new_segment_path()
+                self.__model.write_posting_file(segment_path)
+                self.__segmented_index.add_segment(
+                    segment_path, replace=not self.__model.is_incremental()
+                )
+                print(f"Added segment {segment_path}")
+            if self.__model.get_removed_document_ids():
+                self.__segmented_index.delete_documents(self.__model.get_removed_document_ids())
+            print(len(self.__segmented_index.get_segments()), "segments in index")
+
+        self.__model.delete_insertions_record()
+        print("Insertions record automatically deleted")
         print("\nFinished indexing process")
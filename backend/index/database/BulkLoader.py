@@ -0,0 +1,243 @@
+import queue
+import threading
+import time
+
+from typing import Callable, Iterable, Iterator
+
+
+class BulkLoader:
+    def __init__(
+        self,
+        connect: Callable[[], object],
+        name: str,
+        statement: str,
+        batch_size: int = 10000,
+        session_count: int = 1,
+        returning_ids: bool = False,
+        report_interval: float = 10,
+        max_reported_errors: int = 10,
+    ):
+        self.__connect = connect
+        self.__name = name
+        self.__statement = statement
+        self.__batch_size = batch_size
+        self.__session_count = max(session_count, 1)
+        self.__returning_ids = returning_ids
+        self.__report_interval = report_interval
+        self.__max_reported_errors = max_reported_errors
+        self.__lock = threading.Lock()
+        self.__statistics = {}
+        self.__reported_error_count = 0
+        self.__start_time = 0.0
+        self.__last_report_time = 0.0
+
+    def __get_batches(self, rows: Iterable[tuple]) -> Iterator[list[tuple]]:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == self.__batch_size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+    def __execute_rows_separately(self, connection, cursor, batch: list[tuple]) -> dict:
+        # Drivers without array DML errors retry a failed batch row by row to find the
+        # bad rows, errors like a locked database still abort the load
+        row_errors = tuple(
+            getattr(connection, error)
+            for error in ["IntegrityError", "DataError", "ProgrammingError"]
+            if hasattr(connection, error)
+        )
+        try:
+            cursor.executemany(self.__statement, batch)
+            return {}
+        except row_errors:
+            connection.rollback()
+
+        failed_rows = {}
+        for i, row in enumerate(batch):
+            try:
+                cursor.execute(self.__statement, row)
+            except row_errors as e:
+                failed_rows[i] = str(e)
+        return failed_rows
+
+    def __load_batch(self, connection, batch: list[tuple]) -> tuple[list | None, dict]:
+        cursor = connection.cursor()
+        try:
+            if self.__returning_ids:
+                ids = cursor.var(int, arraysize=len(batch))
+                cursor.setinputsizes(*([None] * len(batch[0])), ids)
+
+            if hasattr(cursor, "getbatcherrors"):
+                # Array DML keeps loading past bad rows and reports them afterwards
+                cursor.executemany(self.__statement, batch, batcherrors=True)
+                failed_rows = {error.offset: error.message for error in cursor.getbatcherrors()}
+            else:
+                failed_rows = self.__execute_rows_separately(connection, cursor, batch)
+            connection.commit()
+
+            if not self.__returning_ids:
+                return None, failed_rows
+
+            return [
+                None if i in failed_rows or not ids.getvalue(i) else ids.getvalue(i)[0]
+                for i in range(len(batch))
+            ], failed_rows
+        finally:
+            cursor.close()
+
+    def __report_progress(self, is_final: bool = False):
+        now = time.perf_counter()
+        if not is_final and now - self.__last_report_time < self.__report_interval:
+            return
+
+        self.__last_report_time = now
+        elapsed_time = max(now - self.__start_time, 1e-9)
+        self.__statistics["ROWS_PER_SECOND"] = round(self.__statistics["ROWS"] / elapsed_time)
+        print(f"Bulk loading {self.__name}:", self.__statistics)
+
+    def __record_batch(
+        self,
+        batch_number: int,
+        batch: list[tuple],
+        ids: list | None,
+        failed_rows: dict,
+        results: dict,
+        on_batch_committed: Callable[[int, list | None], None] | None,
+    ):
+        with self.__lock:
+            results[batch_number] = ids
+            if on_batch_committed:
+                on_batch_committed(batch_number, ids)
+
+            self.__statistics["ROWS"] += len(batch) - len(failed_rows)
+            self.__statistics["FAILED_ROWS"] += len(failed_rows)
+            self.__statistics["BATCHES"] += 1
+            for i, message in failed_rows.items():
+                if self.__reported_error_count < self.__max_reported_errors:
+                    print(f"Skipped row of {self.__name} batch {batch_number}:", batch[i], message)
+                    self.__reported_error_count += 1
+            self.__report_progress()
+
+    def __run_session(
+        self,
+        batches: queue.Queue,
+        results: dict,
+        errors: list[Exception],
+        on_batch_committed: Callable[[int, list | None], None] | None,
+        on_batch_started: Callable[[int], None] | None,
+    ):
+        connection = None
+        while True:
+            item = batches.get()
+            if item is None:
+                break
+
+            # After a failure the remaining batches are only drained, so the producer
+            # never blocks. They are loaded when the interrupted load resumes
+            if errors:
+                continue
+
+            batch_number, batch = item
+            try:
+                if connection is None:
+                    connection = self.__connect()
+                # A batch may be committed and the load interrupted before it is
+                # recorded, so its start is recorded first and a resumed load checks it
+                if on_batch_started:
+                    with self.__lock:
+                        on_batch_started(batch_number)
+                ids, failed_rows = self.__load_batch(connection, batch)
+                self.__record_batch(
+                    batch_number, batch, ids, failed_rows, results, on_batch_committed
+                )
+            except Exception as e:
+                with self.__lock:
+                    errors.append(e)
+                # The failed batch is not left half loaded for the next commit
+                try:
+                    connection.rollback()
+                except Exception:
+                    pass
+
+        if connection is not None:
+            connection.close()
+
+    def load(
+        self,
+        rows: Iterable[tuple],
+        committed_batches: dict[int, list | None] | None = None,
+        on_batch_committed: Callable[[int, list | None], None] | None = None,
+        started_batches: set[int] | None = None,
+        on_batch_started: Callable[[int], None] | None = None,
+        find_committed_batch: Callable[[list[tuple]], list | None] | None = None,
+    ) -> list | None:
+        committed_batches = committed_batches if committed_batches is not None else {}
+        started_batches = started_batches if started_batches is not None else set()
+        self.__statistics = {
+            "ROWS": 0,
+            "FAILED_ROWS": 0,
+            "BATCHES": 0,
+            "RESUMED_BATCHES": 0,
+            "RECOVERED_BATCHES": 0,
+            "ROWS_PER_SECOND": 0,
+        }
+        self.__reported_error_count = 0
+        self.__start_time = self.__last_report_time = time.perf_counter()
+
+        # Sessions load disjoint batches, the bounded queue keeps only a few in memory
+        results = dict(committed_batches)
+        batch_count = 0
+        errors: list[Exception] = []
+        batches = queue.Queue(self.__session_count * 2)
+        sessions = [
+            threading.Thread(
+                target=self.__run_session,
+                args=(batches, results, errors, on_batch_committed, on_batch_started),
+                daemon=True,
+            )
+            for _ in range(self.__session_count)
+        ]
+        for session in sessions:
+            session.start()
+
+        try:
+            for batch_number, batch in enumerate(self.__get_batches(rows)):
+                batch_count += 1
+                # Batches committed before an interruption are not loaded again
+                if batch_number in committed_batches:
+                    self.__statistics["RESUMED_BATCHES"] += 1
+                    continue
+
+                # A batch started but not recorded may have been committed, the rows
+                # found in the database are taken instead of loading them twice
+                if batch_number in started_batches and find_committed_batch:
+                    ids = find_committed_batch(batch)
+                    if ids is not None:
+                        with self.__lock:
+                            results[batch_number] = ids
+                            if on_batch_committed:
+                                on_batch_committed(batch_number, ids)
+                            self.__statistics["RECOVERED_BATCHES"] += 1
+                        continue
+                batches.put((batch_number, batch))
+        finally:
+            for _ in sessions:
+                batches.put(None)
+            for session in sessions:
+                session.join()
+
+        if errors:
+            raise errors[0]
+        self.__report_progress(is_final=True)
+
+        if not self.__returning_ids:
+            return None
+
+        return [id for batch_number in range(batch_count) for id in results[batch_number]]
+
+    def get_statistics(self) -> dict[str, int]:
+        return self.__statistics
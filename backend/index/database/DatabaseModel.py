@@ -1,27 +1,62 @@
 import base64
+from array import array
+import numpy as np
+from itertools import islice
 from datetime import datetime
-import json
 import time
 import cx_Oracle
 import os
 
+from typing import Iterator
+
 from dotenv import load_dotenv
 from backend.documentTypes import DocumentLanguage
 from backend.engine.TermProcessor import TermProcessor
+from backend.engine.utils import get_bm25_idf, get_bm25_impact
 from backend.index.database.entities.DocumentStatistics import DocumentStatistics
 from backend.index.database.entities.Document import Document
 from backend.index.database.entities.Source import Source
+from backend.index.database.BulkLoader import BulkLoader
+from backend.index.database.InsertionsLog import (
+    BATCH_CHUNK,
+    BATCH_STARTED_CHUNK,
+    DOCUMENT_CHUNK,
+    FLUSHED_DOCUMENTS_CHUNK,
+    FLUSHING_DOCUMENTS_CHUNK,
+    INCREMENTAL_CHUNK,
+    INDEXED_CHUNK,
+    PHASE_CHUNK,
+    POSTINGS_CHUNK,
+    REMOVED_DOCUMENT_CHUNK,
+    SOURCE_CHUNK,
+    TERM_FREQUENCY_CHUNK,
+    InsertionsLog,
+)
+from backend.index.postings.PostingFileWriter import PostingFileWriter
+from backend.index.postings.PostingsBuffer import PostingsBuffer
+from backend.index.postings.Vocabulary import Vocabulary
+from backend.index.postings.utils import encode_deltas, encode_varints
 
 
 class DatabaseModel:
-    def __init__(self):
+    # BM25 parameters APPEARS.IMPACT is precomputed with
+    impact_k1 = 1.5
+    impact_b = 0.75
+    impact_scale = 1000
+
+    def __init__(
+        self,
+        bulk_batch_size: int = 10000,
+        bulk_session_count: int = 1,
+        stream_documents: bool = False,
+    ):
 
         # Retrieve params
         load_dotenv()
-        user = os.getenv("DB_USER")
-        password = os.getenv("DB_PASSWORD")
+        self.__user = os.getenv("DB_USER")
+        self.__password = os.getenv("DB_PASSWORD")
         dir_name = os.getenv("DB_WALLET_DIR_NAME")
-        dsn = os.getenv("DB_DSN")
+        self.__dsn = os.getenv("DB_DSN")
 
         # Set TNS_ADMIN
         current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -29,62 +64,262 @@ class DatabaseModel:
         os.environ["TNS_ADMIN"] = wallet_dir
 
         # Connect
-        self.__connection = cx_Oracle.connect(user, password, dsn=dsn, encoding="UTF-8")
+        self.__connection = self.__connect()
+
+        # Large tables are loaded in committed batches, optionally over parallel sessions
+        self.__bulk_batch_size = bulk_batch_size
+        self.__bulk_session_count = bulk_session_count
 
         # Temp variables for insertions. Avoid single slow insertions
         self.__sources_to_insert: list[tuple] = []
         self.__documents_to_insert: list[tuple] = []
         self.__document_lengths = {}
-        self.__inverted_index = {}
+        # Postings refer to terms by their vocabulary ID, the database has its own TERM.ID.
+        # They are only written to the insertions log and read back from it when they
+        # are committed, while indexing just their count per term is kept
+        self.__vocabulary = Vocabulary()
+        self.__document_frequencies = array("I")
+        self.__posting_count = 0
 
+        # Streaming full runs write finished documents to DOCUMENT in batches while
+        # indexing, afterwards only their database IDs and lengths are kept
+        self.__stream_documents = stream_documents
+        self.__finished_document_ids: list[int] = []
+        self.__flushed_document_ids = array("I")
+
+        # Incremental runs compare documents by URL and content hash with the stored ones
+        self.__incremental = False
+        self.__indexed_content_hashes: dict[str, str | None] = {}
+        self.__document_urls_to_insert: set[str] = set()
+        self.__removed_document_urls: list[str] = []
+
+        # Database IDs of the documents written and deleted by commit_insertions, and
+        # the database ID of each reserved ID
+        self.__document_ids: list[int] = []
+        self.__resolved_document_ids: list[int | None] = []
+        self.__removed_document_ids: list[int] = []
+
+        # Insertions are appended to a log as they are recorded, so a failed run can
+        # resume indexing or retry the database phases it did not complete
         current_directory = os.path.dirname(os.path.abspath(__file__))
-        self.__insertions_file_path = f"{current_directory}/insertions.dbmodel.dumpdata"
+        self.__insertions_log = InsertionsLog(f"{current_directory}/insertions.dbmodel.log")
+        self.__documents_with_postings: set[int] = set()
+        self.__recorded_source_ids: dict[tuple, int] = {}
+        self.__recorded_document_urls: set[str] = set()
+        self.__unfinished_document_ids: dict[str, int] = {}
+        self.__is_insertions_record_complete = False
+        self.__completed_phases: dict[str, object] = {}
+        self.__committed_batches: dict[str, dict[int, list | None]] = {}
+        self.__started_batches: dict[str, set[int]] = {}
+
+    def __connect(self):
+        return cx_Oracle.connect(
+            self.__user, self.__password, dsn=self.__dsn, encoding="UTF-8", threaded=True
+        )
 
     def insert_source(self, source: Source) -> int:
         db_tuple = source.to_dict()
+
+        # A resumed run finds the sources it recorded before
+        source_key = (db_tuple["source_name"], db_tuple["base_url"])
+        if source_key in self.__recorded_source_ids:
+            return self.__recorded_source_ids[source_key]
+
+        self.__insertions_log.append(SOURCE_CHUNK, db_tuple)
         self.__sources_to_insert.append(db_tuple)
         return len(self.__sources_to_insert)
 
-    def insert_document(self, document: Document) -> int:
-        db_tuple = document.to_tuple()
-        self.__documents_to_insert.append(db_tuple)
-        return len(self.__documents_to_insert)
+    def insert_document(self, document: Document, content_hash: str | None = None) -> int:
+        db_tuple = document.to_tuple() + (content_hash,)
+
+        # Documents a resumed run had not finished are indexed again under their ID
+        document_id = self.__unfinished_document_ids.pop(document.get_document_url(), None)
+        if document_id is None:
+            document_id = len(self.__documents_to_insert) + 1
+
+        self.__insertions_log.append(DOCUMENT_CHUNK, (document_id, db_tuple))
+        self.__set_document(document_id, db_tuple)
+        if self.__incremental:
+            self.__document_urls_to_insert.add(document.get_document_url())
+        return document_id
+
+    def __set_document(self, document_id: int, db_tuple: tuple):
+        if document_id > len(self.__documents_to_insert):
+            self.__documents_to_insert.append(db_tuple)
+        else:
+            self.__documents_to_insert[document_id - 1] = db_tuple
+
+    def is_document_recorded(self, document_url: str) -> bool:
+        # Documents finished by the run being resumed are not fetched again
+        return document_url in self.__recorded_document_urls
+
+    def start_incremental_indexing(self):
+        if not self.__incremental:
+            self.__insertions_log.append(INCREMENTAL_CHUNK, None)
+        self.__incremental = True
+        self.__indexed_content_hashes = {
+            document_url: content_hash
+            for _, document_url, content_hash, _ in self.__get_indexed_documents_fingerprints()
+        }
+        print("Incremental indexing against", len(self.__indexed_content_hashes), "documents")
+
+    def is_incremental(self) -> bool:
+        return self.__incremental
+
+    def is_document_indexed(self, document_url: str, content_hash: str) -> bool:
+        if not self.__incremental:
+            return False
+
+        # A URL listed twice in a run, even by two sources, is indexed once. The first
+        # listing claims it before its document is inserted
+        if (
+            self.__indexed_content_hashes.get(document_url) == content_hash
+            or document_url in self.__document_urls_to_insert
+        ):
+            return True
+
+        self.__document_urls_to_insert.add(document_url)
+        return False
+
+    def remove_document(self, document_url: str):
+        # Only incremental runs delete documents, full runs start from empty tables
+        if self.__incremental:
+            self.__insertions_log.append(REMOVED_DOCUMENT_CHUNK, document_url)
+            self.__removed_document_urls.append(document_url)
 
-    def record_term_frequency(self, document_id: int, term: str, term_frequency: int):
+    def record_term_frequency(
+        self,
+        document_id: int,
+        term: str,
+        term_frequency: int,
+        positions: list[int] | None = None,
+    ):
+        self.__insertions_log.append(
+            TERM_FREQUENCY_CHUNK, (document_id, term, term_frequency, positions)
+        )
+        self.__apply_term_frequency(document_id, term, term_frequency, positions)
+
+    def __apply_term_frequency(
+        self,
+        document_id: int,
+        term: str,
+        term_frequency: int,
+        positions: list[int] | None,
+    ):
+        self.__documents_with_postings.add(document_id)
         if document_id in self.__document_lengths:
             self.__document_lengths[document_id] += term_frequency
         else:
             self.__document_lengths[document_id] = term_frequency
 
-        if term not in self.__inverted_index:
-            self.__inverted_index[term] = {}
+        self.__count_postings(self.__vocabulary.get_term_id(term), 1)
+
+    def record_partial_index(self, document_ids: list[int], partial_index: tuple):
+        self.__insertions_log.append(POSTINGS_CHUNK, (document_ids, partial_index))
+        self.__apply_partial_index(document_ids, partial_index)
+
+        # Incremental runs write documents in their single commit transaction
+        if self.__stream_documents and not self.__incremental:
+            self.__finished_document_ids.extend(document_ids)
+
+    def is_document_flush_due(self) -> bool:
+        return len(self.__finished_document_ids) >= self.__bulk_batch_size
+
+    def __apply_partial_index(self, document_ids: list[int], partial_index: tuple):
+        self.__documents_with_postings.update(document_ids)
+
+        # Documents of a partial index are numbered by their position in its batch
+        document_lengths, inverted_index = partial_index
+        # Documents without terms get no length, as with record_term_frequency
+        for document_number, document_length in enumerate(document_lengths):
+            if document_length:
+                self.__document_lengths[document_ids[document_number]] = document_length
+
+        for term, postings in inverted_index.items():
+            self.__count_postings(self.__vocabulary.get_term_id(term), len(postings))
+
+    def __count_postings(self, term_id: int, posting_count: int):
+        missing_count = term_id + 1 - len(self.__document_frequencies)
+        if missing_count > 0:
+            self.__document_frequencies.extend([0] * missing_count)
+        self.__document_frequencies[term_id] += posting_count
+        self.__posting_count += posting_count
+
+    def __iterate_postings(self) -> Iterator[tuple[int, int, int, list[int]]]:
+        # Postings are read back from the insertions log under their database document
+        # ID. Documents the database rejected have no ID and lose their postings
+        self.__insertions_log.sync()
+        for chunk_type, payload in self.__insertions_log.read():
+            if chunk_type == POSTINGS_CHUNK:
+                document_ids, (_, inverted_index) = payload
+                for term, postings in inverted_index.items():
+                    term_id = self.__vocabulary.get_term_id(term)
+                    for document_number, positions in postings.items():
+                        document_id = self.__resolved_document_ids[
+                            document_ids[document_number] - 1
+                        ]
+                        if document_id:
+                            yield term_id, document_id, len(positions), positions
+            elif chunk_type == TERM_FREQUENCY_CHUNK:
+                document_id, term, term_frequency, positions = payload
+                document_id = self.__resolved_document_ids[document_id - 1]
+                if document_id:
+                    yield self.__vocabulary.get_term_id(term), document_id, term_frequency, (
+                        positions or []
+                    )
+            # Every posting is recorded before the run is marked as indexed
+            elif chunk_type == INDEXED_CHUNK:
+                return
 
-        document_dict = self.__inverted_index[term]
-        document_dict[document_id] = term_frequency
+    def __fetch_lob_as_bytes(self, cursor, name, default_type, size, precision, scale):
+        if default_type == cx_Oracle.DB_TYPE_BLOB:
+            return cursor.var(cx_Oracle.DB_TYPE_LONG_RAW, arraysize=cursor.arraysize)
 
     def __execute__query(
         self,
         statement: str,
         params: dict = {},
+        fetch_lobs_as_bytes: bool = False,
+        raise_errors: bool = False,
     ):
         with self.__connection.cursor() as cursor:
             try:
+                # Avoids a round trip per row when reading many small BLOBs
+                if fetch_lobs_as_bytes:
+                    cursor.outputtypehandler = self.__fetch_lob_as_bytes
+
                 cursor.execute(statement, params)
                 result = cursor.fetchall()
                 return result
             except Exception as e:
                 print("Database error with query:", f"'{statement}'", e)
+                if raise_errors:
+                    raise e
                 return []
 
+    def __execute_chunked_query(self, statement: str, values: list, chunk_size: int = 1000):
+        # Oracle accepts at most 1000 expressions in an IN list
+        rows = []
+        for start in range(0, len(values), chunk_size):
+            chunk = values[start : start + chunk_size]
+            binds = ",".join(f":value{i}" for i in range(len(chunk)))
+            params = {f"value{i}": value for i, value in enumerate(chunk)}
+            rows.extend(
+                self.__execute__query(statement.format(binds=binds), params, raise_errors=True)
+            )
+        return rows
+
     def __execute_statement(
         self,
         statement: str,
         params: dict = {},
+        commit: bool = True,
     ):
         with self.__connection.cursor() as cursor:
             try:
                 cursor.execute(statement, params)
-                self.__connection.commit()
+                if commit:
+                    self.__connection.commit()
             except Exception as e:
                 print("database error with statement:", f"'{statement}'", e)
                 raise e
@@ -93,88 +328,555 @@ class DatabaseModel:
         self,
         statement: str,
         params: list = [],
+        commit: bool = True,
     ):
+        if not params:
+            return
+
         with self.__connection.cursor() as cursor:
             try:
                 cursor.executemany(statement, params)
-                self.__connection.commit()
+                if commit:
+                    self.__connection.commit()
             except Exception as e:
                 print("database error with statement:", f"'{statement}'")
                 raise e
 
-    def __bulk_insert_sources(self):
+    def __execute_bulk_insert(
+        self,
+        statement: str,
+        params: list[tuple] = [],
+        commit: bool = True,
+    ) -> list[int]:
+        if not params:
+            return []
+
+        with self.__connection.cursor() as cursor:
+            try:
+                # Identity values come back through RETURNING, as one list per row
+                ids = cursor.var(int, arraysize=len(params))
+                cursor.setinputsizes(*([None] * len(params[0])), ids)
+                cursor.executemany(statement, params)
+                if commit:
+                    self.__connection.commit()
+                return [ids.getvalue(i)[0] for i in range(len(params))]
+            except Exception as e:
+                print("database error with statement:", f"'{statement}'")
+                raise e
+
+    def __bulk_load(
+        self,
+        phase: str,
+        statement: str,
+        rows,
+        returning_ids: bool = False,
+        find_committed_batch=None,
+    ) -> list | None:
+        loader = BulkLoader(
+            self.__connect,
+            phase,
+            statement,
+            batch_size=self.__bulk_batch_size,
+            session_count=self.__bulk_session_count,
+            returning_ids=returning_ids,
+        )
+
+        # Every committed batch is recorded, an interrupted load resumes after it
+        def record_batch(batch_number: int, ids: list | None):
+            self.__insertions_log.append(BATCH_CHUNK, (phase, batch_number, ids), sync=True)
+
+        def record_batch_start(batch_number: int):
+            self.__insertions_log.append(BATCH_STARTED_CHUNK, (phase, batch_number), sync=True)
+
+        return loader.load(
+            rows,
+            self.__committed_batches.get(phase, {}),
+            record_batch,
+            self.__started_batches.get(phase, set()),
+            record_batch_start,
+            find_committed_batch,
+        )
+
+    def __get_indexed_documents_fingerprints(self) -> list[tuple]:
+        query = """
+        SELECT ID, DOCUMENT_URL, CONTENT_HASH, DOCUMENT_LENGTH
+        FROM DOCUMENT
+        """
+        return self.__execute__query(query, raise_errors=True)
+
+    def __get_recorded_database_document_ids(self) -> set[int]:
+        recorded_ids = set(self.__flushed_document_ids)
+        for ids in self.__committed_batches.get("documents", {}).values():
+            recorded_ids.update(ids)
+        return recorded_ids
+
+    def __find_inserted_documents(self, rows: list[tuple]) -> list[int | None] | None:
+        # Full runs start from empty tables, so rows of a batch committed but not
+        # recorded are the stored documents with their URLs and an unrecorded ID
+        query = "SELECT ID, DOCUMENT_URL FROM DOCUMENT WHERE DOCUMENT_URL IN ({binds})"
+        recorded_ids = self.__get_recorded_database_document_ids()
+        found_ids = {}
+        for database_id, document_url in sorted(
+            self.__execute_chunked_query(query, list({row[4] for row in rows}))
+        ):
+            if database_id not in recorded_ids:
+                found_ids.setdefault(document_url, []).append(database_id)
+
+        if not found_ids:
+            return None
+        return [found_ids[row[4]].pop(0) if found_ids.get(row[4]) else None for row in rows]
+
+    def __get_database_term_ids(self, terms: list[str]) -> dict[str, int]:
+        query = "SELECT TERM, ID FROM TERM WHERE TERM IN ({binds})"
+        return dict(self.__execute_chunked_query(query, terms))
+
+    def __find_inserted_terms(self, rows: list[tuple]) -> list[int | None] | None:
+        # Terms are unique, a batch committed but not recorded is found by its terms
+        database_term_ids = self.__get_database_term_ids([row[0] for row in rows])
+        if not database_term_ids:
+            return None
+        return [database_term_ids.get(row[0]) for row in rows]
+
+    def __bulk_insert_sources(self, commit: bool = True) -> list[int]:
+        # Incremental runs keep the rows of known sources and only refresh their icon
+        known_source_ids = {}
+        if self.__incremental:
+            rows = self.__execute__query(
+                "SELECT ID, SOURCE_NAME, BASE_URL FROM SOURCE", raise_errors=True
+            )
+            known_source_ids = {(name, base_url): id for id, name, base_url in rows}
+
+        source_ids = [
+            known_source_ids.get((source["source_name"], source["base_url"]))
+            for source in self.__sources_to_insert
+        ]
+        new_sources = [i for i, source_id in enumerate(source_ids) if source_id is None]
+
         statement = """
         INSERT INTO SOURCE (SOURCE_NAME, BASE_URL, ICON)
         VALUES (:source_name, :base_url, :icon)
+        RETURNING ID INTO :id
+        """
+        inserted_ids = self.__execute_bulk_insert(
+            statement,
+            [
+                tuple(
+                    self.__sources_to_insert[i][key] for key in ["source_name", "base_url", "icon"]
+                )
+                for i in new_sources
+            ],
+            commit=commit,
+        )
+        for i, source_id in zip(new_sources, inserted_ids):
+            source_ids[i] = source_id
+
+        statement = "UPDATE SOURCE SET ICON = :icon WHERE ID = :id"
+        self.__execute_bulk_statement(
+            statement,
+            [
+                (source["icon"], source_id)
+                for source, source_id in zip(self.__sources_to_insert, source_ids)
+                if source_id in known_source_ids.values() and source["icon"]
+            ],
+            commit=commit,
+        )
+        return source_ids
+
+    def __get_document_length(self, document_id: int) -> int:
+        return self.__document_lengths.get(document_id, 0)
+
+    def __get_average_document_length(self) -> float:
+        document_count = len(self.__document_ids)
+        return sum(self.__document_lengths.values()) / document_count if document_count > 0 else 0
+
+    def __resolve_document_ids(self, document_ids: list[int]):
+        # Postings were recorded under the IDs reserved during the run. Documents the
+        # database rejected have no ID and lose their postings
+        self.__document_lengths = {
+            document_ids[i - 1]: document_length
+            for i, document_length in self.__document_lengths.items()
+            if document_ids[i - 1] is not None
+        }
+        self.__resolved_document_ids = document_ids
+        self.__document_ids = [document_id for document_id in document_ids if document_id]
+
+        # Postings of rejected documents no longer count for their terms
+        if any(document_ids[i - 1] is None for i in self.__documents_with_postings):
+            self.__document_frequencies = array("I")
+            self.__posting_count = 0
+            for term_id, _, _, _ in self.__iterate_postings():
+                self.__count_postings(term_id, 1)
+
+    def __get_document_row(self, document_id: int, source_ids: list[int]) -> tuple:
+        # Add length and the database ID of the source to documents
+        row = list(self.__documents_to_insert[document_id - 1]) + [
+            self.__get_document_length(document_id)
+        ]
+        row[6] = source_ids[row[6] - 1]
+        # Without postings the hash is left out, so incremental runs index it again
+        if document_id not in self.__documents_with_postings:
+            row[7] = None
+        return tuple(row)
+
+    def __get_document_insert_statement(self) -> str:
+        return """
+        INSERT INTO DOCUMENT (TITLE, SUMMARY, DOCUMENT_TYPE, PUBLISH_DATE, DOCUMENT_URL, DOCUMENT_LANGUAGE, SOURCE_ID, CONTENT_HASH, DOCUMENT_LENGTH)
+        VALUES (:title, :summary, :document_type, :publish_date, :document_url, :document_language, :source_id, :content_hash, :document_length)
+        RETURNING ID INTO :id
         """
-        self.__execute_bulk_statement(statement, self.__sources_to_insert)
 
-    def __bulk_insert_documents(self):
-        # Add length to documents
+    def flush_documents(self):
+        # Blocks on the database, the indexer runs it in a thread while downloads go on.
+        # Sources are committed on the first flush, documents reference their IDs
+        source_ids = self.__completed_phases.get("sources")
+        if source_ids is None:
+            source_ids = self.__run_phase("sources", self.__bulk_insert_sources)
+        document_ids = self.__finished_document_ids
+        self.__finished_document_ids = []
 
-        documents_tuples_with_length = []
-        for i, document_tuple in enumerate(self.__documents_to_insert):
-            changed_tuple = tuple(
-                list(document_tuple)
-                + [
-                    (
-                        self.__document_lengths[str(i + 1)]
-                        if str(i + 1) in self.__document_lengths
-                        else 0
-                    )
-                ]
+        loader = BulkLoader(
+            self.__connect,
+            "flushed documents",
+            self.__get_document_insert_statement(),
+            batch_size=self.__bulk_batch_size,
+            returning_ids=True,
+        )
+
+        def get_batch_document_ids(batch_number: int) -> list[int]:
+            start = batch_number * self.__bulk_batch_size
+            return document_ids[start : start + self.__bulk_batch_size]
+
+        # Each committed batch is recorded before its rows are dropped from memory. Its
+        # start is recorded too, a resumed run looks for it if it was not committed
+        def record_batch(batch_number: int, ids: list | None):
+            batch_document_ids = get_batch_document_ids(batch_number)
+            self.__insertions_log.append(
+                FLUSHED_DOCUMENTS_CHUNK, (batch_document_ids, ids), sync=True
             )
-            documents_tuples_with_length.append(changed_tuple)
+            self.__apply_flushed_documents(batch_document_ids, ids)
+
+        def record_batch_start(batch_number: int):
+            self.__insertions_log.append(
+                FLUSHING_DOCUMENTS_CHUNK, get_batch_document_ids(batch_number), sync=True
+            )
+
+        loader.load(
+            (self.__get_document_row(document_id, source_ids) for document_id in document_ids),
+            on_batch_committed=record_batch,
+            on_batch_started=record_batch_start,
+        )
+
+    def __recover_flushed_documents(self, document_ids: list[int]):
+        # Batches flushed but not recorded before an interruption are looked up
+        if not document_ids:
+            return
+
+        database_ids = self.__find_inserted_documents(
+            [self.__documents_to_insert[document_id - 1] for document_id in document_ids]
+        )
+        if database_ids is None:
+            return
+
+        document_ids, database_ids = zip(
+            *[
+                (document_id, database_id)
+                for document_id, database_id in zip(document_ids, database_ids)
+                if database_id is not None
+            ]
+        )
+        self.__recorded_document_urls.update(
+            self.__documents_to_insert[document_id - 1][4] for document_id in document_ids
+        )
+        self.__insertions_log.append(
+            FLUSHED_DOCUMENTS_CHUNK, (list(document_ids), list(database_ids)), sync=True
+        )
+        self.__apply_flushed_documents(document_ids, database_ids)
+
+    def __apply_flushed_documents(self, document_ids: list[int], database_ids: list[int | None]):
+        for document_id, database_id in zip(document_ids, database_ids):
+            missing_count = document_id - len(self.__flushed_document_ids)
+            if missing_count > 0:
+                self.__flushed_document_ids.extend([0] * missing_count)
+            # 0 marks a document the database rejected
+            self.__flushed_document_ids[document_id - 1] = database_id or 0
+            self.__documents_to_insert[document_id - 1] = None
+
+    def __is_document_unfinished(self, document_id: int) -> bool:
+        document_url = self.__documents_to_insert[document_id - 1][4]
+        return self.__unfinished_document_ids.get(document_url) == document_id
+
+    def __get_flushed_document_id(self, document_id: int) -> int | None:
+        if document_id > len(self.__flushed_document_ids):
+            return None
+        return self.__flushed_document_ids[document_id - 1] or None
+
+    def __bulk_insert_documents(
+        self,
+        source_ids: list[int],
+        replaced_document_ids: dict[int, int] | None = None,
+        commit: bool = True,
+    ) -> list[int]:
+        replaced_document_ids = replaced_document_ids if replaced_document_ids is not None else {}
+        new_documents = []
+        replaced_documents = []
+        for i, document_tuple in enumerate(self.__documents_to_insert):
+            # Documents flushed while indexing are already stored, those a resumed run
+            # did not index again are left out
+            if document_tuple is None or self.__is_document_unfinished(i + 1):
+                continue
+
+            row = self.__get_document_row(i + 1, source_ids)
+            if i in replaced_document_ids:
+                replaced_documents.append(row + (replaced_document_ids[i],))
+            else:
+                new_documents.append(row)
 
+        # Documents indexed again keep their ID
         statement = """
-        INSERT INTO DOCUMENT (TITLE, SUMMARY, DOCUMENT_TYPE, PUBLISH_DATE, DOCUMENT_URL, DOCUMENT_LANGUAGE, SOURCE_ID, DOCUMENT_LENGTH)
-        VALUES (:title, :summary, :document_type, :publish_date, :document_url, :document_language, :source_id, :document_length)
+        UPDATE DOCUMENT
+        SET TITLE = :title, SUMMARY = :summary, DOCUMENT_TYPE = :document_type, PUBLISH_DATE = :publish_date, DOCUMENT_URL = :document_url, DOCUMENT_LANGUAGE = :document_language, SOURCE_ID = :source_id, CONTENT_HASH = :content_hash, DOCUMENT_LENGTH = :document_length
+        WHERE ID = :id
         """
-        self.__execute_bulk_statement(statement, documents_tuples_with_length)
+        self.__execute_bulk_statement(statement, replaced_documents, commit=commit)
 
-    def __bulk_insert_terms(self):
+        statement = self.__get_document_insert_statement()
+        if commit:
+            inserted_ids = self.__bulk_load(
+                "documents",
+                statement,
+                new_documents,
+                returning_ids=True,
+                find_committed_batch=self.__find_inserted_documents,
+            )
+        else:
+            inserted_ids = self.__execute_bulk_insert(statement, new_documents, commit=False)
+        inserted_ids = iter(inserted_ids)
+
+        return [
+            (
+                replaced_document_ids[i]
+                if i in replaced_document_ids
+                else (
+                    self.__get_flushed_document_id(i + 1)
+                    if document_tuple is None
+                    else None if self.__is_document_unfinished(i + 1) else next(inserted_ids)
+                )
+            )
+            for i, document_tuple in enumerate(self.__documents_to_insert)
+        ]
+
+    def __get_document_frequencies(self) -> np.ndarray:
+        document_frequencies = np.zeros(self.__vocabulary.get_size(), dtype=np.int64)
+        counts = np.frombuffer(self.__document_frequencies, dtype=np.uint32)
+        document_frequencies[: len(counts)] = counts
+        return document_frequencies
+
+    def __bulk_insert_terms(self, document_count: int) -> list[int | None]:
         statement = """
         INSERT INTO TERM (TERM, DOCUMENT_FREQUENCY, IDF)
         VALUES(:term, :document_frequency, :idf)
+        RETURNING ID INTO :id
         """
-        term_set = set(self.__inverted_index.keys())
-        document_count = len(self.__documents_to_insert)
-        self.__execute_bulk_statement(
+        document_frequencies = self.__get_document_frequencies().tolist()
+        indexed_term_ids = [
+            term_id
+            for term_id, document_frequency in enumerate(document_frequencies)
+            if document_frequency > 0
+        ]
+        inserted_ids = self.__bulk_load(
+            "terms",
             statement,
-            [
+            (
                 (
-                    term,
-                    len(self.__inverted_index[term]),
-                    document_count / len(self.__inverted_index[term]),
+                    self.__vocabulary.get_term(term_id),
+                    document_frequencies[term_id],
+                    get_bm25_idf(document_count, document_frequencies[term_id]),
                 )
-                for term in term_set
-            ],
+                for term_id in indexed_term_ids
+            ),
+            returning_ids=True,
+            find_committed_batch=self.__find_inserted_terms,
         )
 
-    def __bulk_register_appearances(self):
+        # TERM.ID of each vocabulary term, None for terms without postings or rejected.
+        # A term rejected as already stored keeps the ID it was stored with
+        database_term_ids = [None] * self.__vocabulary.get_size()
+        for term_id, database_term_id in zip(indexed_term_ids, inserted_ids):
+            database_term_ids[term_id] = database_term_id
+        rejected_terms = [
+            self.__vocabulary.get_term(term_id)
+            for term_id, database_term_id in zip(indexed_term_ids, inserted_ids)
+            if database_term_id is None
+        ]
+        for term, database_term_id in self.__get_database_term_ids(rejected_terms).items():
+            database_term_ids[self.__vocabulary.get_term_id(term)] = database_term_id
+        return database_term_ids
+
+    def __merge_document_frequencies(
+        self, document_frequency_changes: dict[str, int], document_count: int, commit: bool = True
+    ):
+        # Terms left without documents are deleted by the same statement
         statement = """
-        INSERT INTO APPEARS (DOCUMENT_ID, TERM, TERM_FREQUENCY)
-        VALUES (:document_id, :term, :term_frequency)
+        MERGE INTO TERM T
+        USING (SELECT :term AS TERM, :frequency_change AS FREQUENCY_CHANGE FROM DUAL) C
+        ON (T.TERM = C.TERM)
+        WHEN MATCHED THEN UPDATE SET
+            T.DOCUMENT_FREQUENCY = T.DOCUMENT_FREQUENCY + C.FREQUENCY_CHANGE,
+            T.IDF = CASE
+                WHEN T.DOCUMENT_FREQUENCY + C.FREQUENCY_CHANGE > 0
+                THEN LN((:document_count + 1) / (T.DOCUMENT_FREQUENCY + C.FREQUENCY_CHANGE))
+                ELSE 0
+            END
+            DELETE WHERE T.DOCUMENT_FREQUENCY <= 0
+        WHEN NOT MATCHED THEN INSERT (TERM, DOCUMENT_FREQUENCY, IDF)
+            VALUES (C.TERM, C.FREQUENCY_CHANGE, LN((:document_count + 1) / C.FREQUENCY_CHANGE))
+            WHERE C.FREQUENCY_CHANGE > 0
         """
-        appearances = [
-            (document_id, term, freq)
-            for term, documents in self.__inverted_index.items()
-            for document_id, freq in documents.items()
+        self.__execute_bulk_statement(
+            statement,
+            [
+                {"term": term, "frequency_change": change, "document_count": document_count}
+                for term, change in document_frequency_changes.items()
+                if change != 0
+            ],
+            commit=commit,
+        )
+
+    def __get_appearances(
+        self,
+        document_count: int,
+        average_document_length: float,
+        database_term_ids: list[int | None],
+        document_frequencies: list[int],
+    ):
+        idfs = [
+            get_bm25_idf(document_count, document_frequency) if document_frequency > 0 else 0
+            for document_frequency in document_frequencies
         ]
-        self.__execute_bulk_statement(statement, appearances)
+        for term_id, document_id, freq, positions in self.__iterate_postings():
+            # Terms the database rejected have no ID and lose their postings
+            database_term_id = database_term_ids[term_id]
+            if database_term_id is None:
+                continue
+
+            impact = get_bm25_impact(
+                freq,
+                self.__get_document_length(document_id),
+                average_document_length,
+                idfs[term_id],
+                DatabaseModel.impact_k1,
+                DatabaseModel.impact_b,
+                DatabaseModel.impact_scale,
+            )
+            # Positions are stored as delta-encoded varints
+            encoded_positions = (
+                encode_varints(encode_deltas(np.sort(positions))) if len(positions) else None
+            )
+            yield (document_id, database_term_id, freq, impact, encoded_positions)
+
+    def __bulk_register_appearances(
+        self,
+        document_count: int,
+        average_document_length: float,
+        database_term_ids: list[int | None],
+        document_frequencies: list[int],
+        commit: bool = True,
+    ):
+        statement = """
+        INSERT INTO APPEARS (DOCUMENT_ID, TERM_ID, TERM_FREQUENCY, IMPACT, POSITIONS)
+        VALUES (:document_id, :term_id, :term_frequency, :impact, :positions)
+        """
+
+        # Rows are generated batch by batch instead of being held in one list
+        appearances = self.__get_appearances(
+            document_count, average_document_length, database_term_ids, document_frequencies
+        )
+        if commit:
+            self.__bulk_load("appearances", statement, appearances)
+            return
+
+        while batch := list(islice(appearances, self.__bulk_batch_size)):
+            self.__execute_bulk_statement(statement, batch, commit=False)
 
-    def __register_document_statistics(self):
+    def __write_document_statistics(
+        self,
+        document_count: int,
+        average_document_length: float,
+        scored_statistics: tuple[int, float],
+        commit: bool = True,
+    ):
+        self.__execute_statement("DELETE FROM DOCUMENT_STATISTICS", commit=commit)
+        # Every commit gets a new index version, even when the statistics stay the same
         statement = """
-        INSERT INTO DOCUMENT_STATISTICS (DOCUMENT_COUNT, AVERAGE_DOCUMENT_LENGTH)
-        VALUES (:document_count, :average_document_length)
+        INSERT INTO DOCUMENT_STATISTICS (DOCUMENT_COUNT, AVERAGE_DOCUMENT_LENGTH, SCORED_DOCUMENT_COUNT, SCORED_AVERAGE_DOCUMENT_LENGTH, INDEX_VERSION)
+        VALUES (:document_count, :average_document_length, :scored_document_count, :scored_average_document_length, INDEX_VERSION_SEQUENCE.NEXTVAL)
         """
-        document_count = len(self.__documents_to_insert)
-        average_document_length = (
-            sum(self.__document_lengths.values()) / document_count
-            if document_count > 0
-            else 0
+        self.__execute_statement(
+            statement,
+            (document_count, average_document_length, *scored_statistics),
+            commit=commit,
+        )
+
+    def __get_scored_statistics(self) -> tuple[int, float] | None:
+        query = """
+        SELECT SCORED_DOCUMENT_COUNT, SCORED_AVERAGE_DOCUMENT_LENGTH
+        FROM DOCUMENT_STATISTICS
+        """
+        result = self.__execute__query(query, raise_errors=True)
+        if len(result) < 1 or result[0][0] is None:
+            return None
+
+        return result[0][0], result[0][1]
+
+    def __register_document_statistics(self, document_count: int, average_document_length: float):
+        previous_statistics = self.get_document_statistics()
+
+        self.__write_document_statistics(
+            document_count,
+            average_document_length,
+            (document_count, average_document_length),
+        )
+
+        # IDF and impacts depend on the statistics, so any change makes them stale
+        if previous_statistics and (
+            previous_statistics.get_document_count() != document_count
+            or previous_statistics.get_average_document_length() != average_document_length
+        ):
+            self.refresh_impact_scores()
+
+    def refresh_impact_scores(self):
+        print("Recomputing IDF and impact scores from document statistics")
+        self.__execute_statement("""
+            UPDATE TERM
+            SET IDF = LN(((SELECT DOCUMENT_COUNT FROM DOCUMENT_STATISTICS) + 1) / DOCUMENT_FREQUENCY)
+            """)
+        self.__execute_statement("""
+            UPDATE DOCUMENT_STATISTICS
+            SET SCORED_DOCUMENT_COUNT = DOCUMENT_COUNT, SCORED_AVERAGE_DOCUMENT_LENGTH = AVERAGE_DOCUMENT_LENGTH
+            """)
+        self.__execute_statement(
+            """
+            MERGE INTO APPEARS AP
+            USING (
+                SELECT A.DOCUMENT_ID, A.TERM_ID, ROUND(T.IDF * (A.TERM_FREQUENCY * (:k1 + 1)) / (A.TERM_FREQUENCY + :k1 * (1 - :b + :b * D.DOCUMENT_LENGTH / S.AVERAGE_DOCUMENT_LENGTH)) * :scale) AS IMPACT
+                FROM APPEARS A
+                JOIN DOCUMENT D ON D.ID = A.DOCUMENT_ID
+                JOIN TERM T ON T.ID = A.TERM_ID
+                CROSS JOIN DOCUMENT_STATISTICS S
+            ) SCORES
+            ON (AP.DOCUMENT_ID = SCORES.DOCUMENT_ID AND AP.TERM_ID = SCORES.TERM_ID)
+            WHEN MATCHED THEN UPDATE SET AP.IMPACT = SCORES.IMPACT
+            """,
+            {
+                "k1": DatabaseModel.impact_k1,
+                "b": DatabaseModel.impact_b,
+                "scale": DatabaseModel.impact_scale,
+            },
+        )
+        # Rankings change with the impacts, so caches keyed on the version must be dropped
+        self.__execute_statement(
+            "UPDATE DOCUMENT_STATISTICS SET INDEX_VERSION = INDEX_VERSION_SEQUENCE.NEXTVAL"
         )
-        self.__execute_statement(statement, (document_count, average_document_length))
 
     def get_sources(self):
         statement = """
@@ -196,53 +898,97 @@ class DatabaseModel:
             dictionary = {}
             for i, key in enumerate(document_keys):
                 if key == "ICON":
-                    dictionary[key] = base64.b64encode(row[i].read()).decode('utf-8') if row[i] else None
+                    dictionary[key] = (
+                        base64.b64encode(row[i].read()).decode("utf-8") if row[i] else None
+                    )
                 else:
                     dictionary[key] = row[i]
 
             sources_dictionaries.append(dictionary)
 
         return sources_dictionaries
-    
-    def __serialize_data(self, filename: str, data):
-        try:
-            with open(filename, "w") as file:
-                json.dump(data, file, default=str, indent=4)
-        except Exception as e:
-            print(f"Error serializing data:", e)
-            raise e
-
-    def __deserialize_data(self, filename: str):
-        try:
-            with open(filename, "r") as file:
-                data = json.load(file)
-            return data
-        except Exception:
-            return None
-
-    # Locally store insertions to prevent data loss
-    def __locally_save_insertions(self):
-        insertions_data = {
-            "sources_to_insert": self.__sources_to_insert,
-            "documents_to_insert": self.__documents_to_insert,
-            "document_lengths": self.__document_lengths,
-            "inverted_index": self.__inverted_index,
-        }
-        self.__serialize_data(self.__insertions_file_path, insertions_data)
 
     def is_insertions_record_available(self):
-        return os.path.exists(self.__insertions_file_path)
+        return self.__insertions_log.exists()
+
+    def is_insertions_record_complete(self) -> bool:
+        return self.__is_insertions_record_complete
 
     def delete_insertions_record(self):
-        return os.remove(self.__insertions_file_path)
+        return self.__insertions_log.delete()
 
     def load_insertions_record(self):
-        data = self.__deserialize_data(self.__insertions_file_path)
-        if data:
-            self.__sources_to_insert = data["sources_to_insert"]
-            self.__documents_to_insert = data["documents_to_insert"]
-            self.__document_lengths = data["document_lengths"]
-            self.__inverted_index = data["inverted_index"]
+        flushing_document_ids = set()
+        for chunk_type, payload in self.__insertions_log.read():
+            if chunk_type == SOURCE_CHUNK:
+                self.__sources_to_insert.append(payload)
+            elif chunk_type == DOCUMENT_CHUNK:
+                self.__set_document(*payload)
+            elif chunk_type == POSTINGS_CHUNK:
+                self.__apply_partial_index(*payload)
+            elif chunk_type == TERM_FREQUENCY_CHUNK:
+                self.__apply_term_frequency(*payload)
+            elif chunk_type == INCREMENTAL_CHUNK:
+                self.__incremental = True
+            elif chunk_type == REMOVED_DOCUMENT_CHUNK:
+                self.__removed_document_urls.append(payload)
+            elif chunk_type == INDEXED_CHUNK:
+                self.__is_insertions_record_complete = True
+            elif chunk_type == PHASE_CHUNK:
+                phase, result = payload
+                self.__completed_phases[phase] = result
+            elif chunk_type == BATCH_CHUNK:
+                phase, batch_number, ids = payload
+                self.__committed_batches.setdefault(phase, {})[batch_number] = ids
+            elif chunk_type == BATCH_STARTED_CHUNK:
+                phase, batch_number = payload
+                self.__started_batches.setdefault(phase, set()).add(batch_number)
+            elif chunk_type == FLUSHING_DOCUMENTS_CHUNK:
+                flushing_document_ids.update(payload)
+            elif chunk_type == FLUSHED_DOCUMENTS_CHUNK:
+                # Flushed documents are finished, only their URLs are kept to skip them
+                self.__recorded_document_urls.update(
+                    self.__documents_to_insert[document_id - 1][4] for document_id in payload[0]
+                )
+                self.__apply_flushed_documents(*payload)
+                flushing_document_ids.difference_update(payload[0])
+
+        self.__recover_flushed_documents(
+            sorted(
+                document_id
+                for document_id in flushing_document_ids
+                if self.__documents_to_insert[document_id - 1] is not None
+            )
+        )
+        self.__recorded_source_ids = {
+            (source["source_name"], source["base_url"]): i + 1
+            for i, source in enumerate(self.__sources_to_insert)
+        }
+        for i, document_tuple in enumerate(self.__documents_to_insert):
+            if document_tuple is None:
+                continue
+
+            if i + 1 in self.__documents_with_postings:
+                self.__recorded_document_urls.add(document_tuple[4])
+                # Finished documents not flushed yet go out with the next batch
+                if self.__stream_documents and not self.__incremental:
+                    self.__finished_document_ids.append(i + 1)
+            else:
+                self.__unfinished_document_ids[document_tuple[4]] = i + 1
+        if self.__incremental:
+            self.__document_urls_to_insert = set(self.__recorded_document_urls)
+
+        print(
+            f"Loaded insertions record of {self.__insertions_log.get_size()} bytes:",
+            len(self.__sources_to_insert),
+            "sources,",
+            len(self.__recorded_document_urls),
+            "finished and",
+            len(self.__unfinished_document_ids),
+            "unfinished documents,",
+            len(self.__completed_phases),
+            "completed database phases",
+        )
 
     def get_document_statistics(self) -> DocumentStatistics:
         query = f"""
@@ -255,6 +1001,116 @@ class DatabaseModel:
 
         return DocumentStatistics(result[0][0], result[0][1])
 
+    def get_index_version(self) -> int | None:
+        query = "SELECT INDEX_VERSION FROM DOCUMENT_STATISTICS"
+        result = self.__execute__query(query)
+        if len(result) < 1:
+            return None
+
+        return result[0][0]
+
+    def get_term_postings(self) -> list[tuple]:
+        query = """
+        SELECT T.TERM, AP.DOCUMENT_ID, AP.TERM_FREQUENCY, AP.IMPACT, T.IDF, AP.POSITIONS
+        FROM APPEARS AP
+        JOIN TERM T ON T.ID = AP.TERM_ID
+        ORDER BY T.TERM, AP.DOCUMENT_ID
+        """
+        return self.__execute__query(query, fetch_lobs_as_bytes=True)
+
+    def get_indexed_documents(self, max_summary_len: int = 4000) -> list[dict]:
+        query = """
+        SELECT ID, DOCUMENT_LENGTH, TITLE, DBMS_LOB.SUBSTR(SUMMARY, :max_summary_len, 1) AS SUMMARY, DOCUMENT_TYPE, PUBLISH_DATE, DOCUMENT_URL, DOCUMENT_LANGUAGE, SOURCE_ID
+        FROM DOCUMENT
+        ORDER BY ID
+        """
+        result = self.__execute__query(query, {"max_summary_len": max_summary_len})
+
+        document_keys = [
+            "ID",
+            "DOCUMENT_LENGTH",
+            "TITLE",
+            "SUMMARY",
+            "DOCUMENT_TYPE",
+            "PUBLISH_DATE",
+            "DOCUMENT_URL",
+            "DOCUMENT_LANGUAGE",
+            "SOURCE_ID",
+        ]
+
+        documents_dictionaries = []
+        for row in result:
+            dictionary = {}
+            for i, key in enumerate(document_keys):
+                dictionary[key] = row[i]
+
+            documents_dictionaries.append(dictionary)
+
+        return documents_dictionaries
+
+    def get_documents_dictionaries_by_ids(
+        self, document_ids: list[int], max_summary_len: int = 1000
+    ) -> list[dict]:
+        if not document_ids:
+            return []
+
+        ids_binds = ",".join(f":id{i}" for i in range(len(document_ids)))
+        query = f"""
+        SELECT ID, TITLE, DBMS_LOB.SUBSTR(SUMMARY, :max_summary_len, 1) AS SUMMARY, DOCUMENT_TYPE, PUBLISH_DATE, DOCUMENT_URL, DOCUMENT_LANGUAGE, SOURCE_ID
+        FROM DOCUMENT
+        WHERE ID IN ({ids_binds})
+        """
+        params = {f"id{i}": int(document_id) for i, document_id in enumerate(document_ids)}
+        params["max_summary_len"] = max_summary_len
+        rows = {row[0]: row[1:] for row in self.__execute__query(query, params)}
+
+        # Rows come back unordered, the ranking order is restored from the given IDs
+        return self.__ranked_rows_to_dictionaries(
+            [rows[int(document_id)] for document_id in document_ids if int(document_id) in rows]
+        )
+
+    def get_appearances_count(self) -> int:
+        result = self.__execute__query("SELECT COUNT(*) FROM APPEARS")
+        return result[0][0]
+
+    def get_appearances_size(self) -> int:
+        # Bytes allocated to the APPEARS table and its indexes
+        query = """
+        SELECT COALESCE(SUM(S.BYTES), 0)
+        FROM USER_SEGMENTS S
+        LEFT JOIN USER_INDEXES I ON I.INDEX_NAME = S.SEGMENT_NAME
+        WHERE S.SEGMENT_NAME = 'APPEARS' OR I.TABLE_NAME = 'APPEARS'
+        """
+        result = self.__execute__query(query)
+        return result[0][0]
+
+    def get_committed_document_ids(self) -> list[int]:
+        return self.__document_ids
+
+    def get_removed_document_ids(self) -> list[int]:
+        return self.__removed_document_ids
+
+    def write_posting_file(self, path: str) -> int:
+        document_lengths = {
+            document_id: self.__get_document_length(document_id)
+            for document_id in self.__document_ids
+        }
+        # Only this write holds every posting in memory, it sorts them by term
+        postings = PostingsBuffer()
+        for term_id, document_id, frequency, positions in self.__iterate_postings():
+            postings.add(term_id, document_id, frequency, positions)
+        terms = postings.iterate_terms(self.__vocabulary.get_sorted_term_ranks())
+        return PostingFileWriter(path).write_terms(
+            (
+                (self.__vocabulary.get_term(term_id), documents, frequencies)
+                for term_id, documents, frequencies in terms
+            ),
+            document_lengths,
+            DatabaseModel.impact_k1,
+            DatabaseModel.impact_b,
+            DatabaseModel.impact_scale,
+        )
+
     def get_ranked_documents_dictionaries(
         self,
         statistics: DocumentStatistics,
@@ -267,12 +1123,29 @@ class DatabaseModel:
         max_summary_len: str = 1000,
     ) -> list[dict]:
         terms = termProcessor.get_terms(query)
-
-        query_placeholder = " OR ".join(
-            [f"AP.TERM = :term_{i}" for i in range(len(terms))]
+        return self.get_ranked_documents_dictionaries_by_terms(
+            statistics,
+            terms,
+            k1=k1,
+            b=b,
+            page=page,
+            limit=limit,
+            max_summary_len=max_summary_len,
         )
 
-        offset = (page - 1) * limit
+    def __get_ranked_documents_rows(
+        self,
+        statistics: DocumentStatistics,
+        terms: set[str],
+        k1: float,
+        b: float,
+        limit: int,
+        max_summary_len: int,
+        offset: int = 0,
+        after: tuple[float, int] | None = None,
+    ) -> list[tuple]:
+        query_placeholder = " OR ".join([f"T.TERM = :term_{i}" for i in range(len(terms))])
+
         params = {
             "offset": offset,
             "limit": limit,
@@ -286,24 +1159,54 @@ class DatabaseModel:
         for i, term in enumerate(terms):
             params[f"term_{i}"] = term
 
-        sql = f"""
-        WITH BM25_SCORES AS (
-            SELECT D.ID, SUM( (AP.TERM_FREQUENCY * (:k1 + 1)) / (AP.TERM_FREQUENCY + :k1 * (1 - :b + :b * D.DOCUMENT_LENGTH / :avdl))) AS BM25_SCORE
+        # Keyset condition: only documents ranked after the last (score, id) pair
+        after_placeholder = "1=1"
+        if after is not None:
+            after_placeholder = "SCORE < :after_score OR (SCORE = :after_score AND ID > :after_id)"
+            params["after_score"], params["after_id"] = after
+
+        # Precomputed impacts turn scoring into a sum for the default parameters
+        if k1 == DatabaseModel.impact_k1 and b == DatabaseModel.impact_b:
+            scores_sql = f"""
+            SELECT AP.DOCUMENT_ID AS ID, SUM(AP.IMPACT) AS BM25_SCORE
+            FROM APPEARS AP
+            JOIN TERM T ON T.ID = AP.TERM_ID
+            WHERE {query_placeholder if query_placeholder else "1=1"}
+            GROUP BY AP.DOCUMENT_ID
+            """
+            for key in ["k1", "b", "avdl"]:
+                del params[key]
+        else:
+            scores_sql = f"""
+            SELECT D.ID, SUM(T.IDF * (AP.TERM_FREQUENCY * (:k1 + 1)) / (AP.TERM_FREQUENCY + :k1 * (1 - :b + :b * D.DOCUMENT_LENGTH / :avdl))) AS BM25_SCORE
             FROM DOCUMENT D
             JOIN APPEARS AP ON D.ID = AP.DOCUMENT_ID
+            JOIN TERM T ON T.ID = AP.TERM_ID
             WHERE {query_placeholder if query_placeholder else "1=1"}
             GROUP BY ID
+            """
+
+        # Scores are rounded so that they compare equal once they are sent back in a cursor
+        sql = f"""
+        WITH BM25_SCORES AS (
+            {scores_sql}
+        ),
+        RANKED_DOCUMENTS AS (
+            SELECT DOCUMENT.*, ROUND(COALESCE(BM25_SCORE, 0), 10) AS SCORE
+            FROM DOCUMENT
+            LEFT JOIN BM25_SCORES ON BM25_SCORES.ID = DOCUMENT.ID
         )
-        SELECT TITLE, DBMS_LOB.SUBSTR(SUMMARY, :max_summary_len, 1) AS SUMMARY, DOCUMENT_TYPE, PUBLISH_DATE, DOCUMENT_URL, DOCUMENT_LANGUAGE, SOURCE_ID
-        FROM DOCUMENT 
-        LEFT JOIN BM25_SCORES ON BM25_SCORES.ID = DOCUMENT.ID
-        ORDER BY COALESCE(BM25_SCORE, 0) DESC
+        SELECT TITLE, DBMS_LOB.SUBSTR(SUMMARY, :max_summary_len, 1) AS SUMMARY, DOCUMENT_TYPE, PUBLISH_DATE, DOCUMENT_URL, DOCUMENT_LANGUAGE, SOURCE_ID, SCORE, ID
+        FROM RANKED_DOCUMENTS
+        WHERE {after_placeholder}
+        ORDER BY SCORE DESC, ID ASC
         OFFSET :offset ROWS
         FETCH NEXT :limit ROWS ONLY
         """
 
-        result = self.__execute__query(sql, params)
+        return self.__execute__query(sql, params)
 
+    def __ranked_rows_to_dictionaries(self, rows: list[tuple]) -> list[dict]:
         document_keys = [
             "TITLE",
             "SUMMARY",
@@ -315,7 +1218,7 @@ class DatabaseModel:
         ]
 
         documents_dictionaries = []
-        for row in result:
+        for row in rows:
             dictionary = {}
             for i, key in enumerate(document_keys):
                 dictionary[key] = row[i]
@@ -324,6 +1227,43 @@ class DatabaseModel:
 
         return documents_dictionaries
 
+    def get_ranked_documents_dictionaries_by_terms(
+        self,
+        statistics: DocumentStatistics,
+        terms: set[str],
+        k1: float = 1.5,
+        b: float = 0.75,
+        page: int = 1,
+        limit: int = 10,
+        max_summary_len: str = 1000,
+    ) -> list[dict]:
+        rows = self.__get_ranked_documents_rows(
+            statistics,
+            terms,
+            k1,
+            b,
+            limit,
+            max_summary_len,
+            offset=(page - 1) * limit,
+        )
+        return self.__ranked_rows_to_dictionaries(rows)
+
+    def get_ranked_documents_dictionaries_after(
+        self,
+        statistics: DocumentStatistics,
+        terms: set[str],
+        after: tuple[float, int] | None = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+        limit: int = 10,
+        max_summary_len: str = 1000,
+    ) -> tuple[list[dict], tuple[float, int] | None]:
+        rows = self.__get_ranked_documents_rows(
+            statistics, terms, k1, b, limit, max_summary_len, after=after
+        )
+        last_key = (float(rows[-1][-2]), int(rows[-1][-1])) if len(rows) == limit else None
+        return self.__ranked_rows_to_dictionaries(rows), last_key
+
     def keep_connection_alive(self):
         while True:
             self.__execute__query("SELECT 1 FROM DUAL")
@@ -337,24 +1277,199 @@ class DatabaseModel:
             "sources,",
             len(self.__documents_to_insert),
             "documents,",
-            len(set(self.__inverted_index.keys())),
-            "terms",
+            self.__vocabulary.get_size(),
+            "terms,",
+            self.__posting_count,
+            "postings",
         )
 
-        print(
-            f"Auto saving insertions record into {self.__insertions_file_path} in case of failure..."
-        )
-        self.__locally_save_insertions()
-        print(
-            f"Insertions record auto-saved to {self.__insertions_file_path}. Proceeding to database operations"
-        )
+        if not self.__is_insertions_record_complete:
+            self.__insertions_log.append(INDEXED_CHUNK, None, sync=True)
+            self.__is_insertions_record_complete = True
 
-        self.__bulk_insert_sources()
-        self.__bulk_insert_documents()
-        self.__bulk_insert_terms()
-        self.__bulk_register_appearances()
-        self.__register_document_statistics()
+        if self.__incremental:
+            document_ids, self.__removed_document_ids, is_scoring_stale = self.__run_phase(
+                "incremental", self.__commit_incremental_insertions
+            )
+            if not self.__document_ids:
+                self.__resolve_document_ids(document_ids)
+            if is_scoring_stale:
+                self.__run_phase("impact_scores", self.refresh_impact_scores)
+        else:
+            source_ids = self.__run_phase("sources", self.__bulk_insert_sources)
+            document_ids = self.__run_phase(
+                "documents", lambda: self.__bulk_insert_documents(source_ids)
+            )
+            self.__resolve_document_ids(document_ids)
+            document_count = len(self.__document_ids)
+            average_document_length = self.__get_average_document_length()
+            database_term_ids = self.__run_phase(
+                "terms", lambda: self.__bulk_insert_terms(document_count)
+            )
+            document_frequencies = self.__get_document_frequencies().tolist()
+            self.__run_phase(
+                "appearances",
+                lambda: self.__bulk_register_appearances(
+                    document_count,
+                    average_document_length,
+                    database_term_ids,
+                    document_frequencies,
+                ),
+            )
+            self.__run_phase(
+                "statistics",
+                lambda: self.__register_document_statistics(
+                    document_count, average_document_length
+                ),
+            )
 
+        # The log is deleted by the indexer, posting files are still written from it
         print("Database operations completed")
-        self.delete_insertions_record()
-        print("Insertions record automatically delete")
+
+    def __run_phase(self, phase: str, run):
+        # Phases a previous attempt completed are skipped, their results come from the log
+        if phase in self.__completed_phases:
+            print(f"Skipping database phase {phase}, already completed")
+            return self.__completed_phases[phase]
+
+        result = run()
+        self.__insertions_log.append(PHASE_CHUNK, (phase, result), sync=True)
+        self.__completed_phases[phase] = result
+        return result
+
+    def __commit_incremental_insertions(self) -> tuple[list[int], list[int], bool]:
+        # A single transaction, so a failed run can be replayed from the insertions record
+        try:
+            source_ids = self.__bulk_insert_sources(commit=False)
+
+            indexed_documents = {
+                document_url: (document_id, document_length)
+                for document_id, document_url, _, document_length in (
+                    self.__get_indexed_documents_fingerprints()
+                )
+            }
+            document_urls = [
+                None if self.__is_document_unfinished(i + 1) else document_tuple[4]
+                for i, document_tuple in enumerate(self.__documents_to_insert)
+            ]
+            replaced_documents = {
+                i: indexed_documents[document_url]
+                for i, document_url in enumerate(document_urls)
+                if document_url in indexed_documents
+            }
+            removed_documents = [
+                indexed_documents[document_url]
+                for document_url in set(self.__removed_document_urls) - set(document_urls)
+                if document_url in indexed_documents
+            ]
+            new_document_count = sum(
+                document_url is not None for document_url in document_urls
+            ) - len(replaced_documents)
+            stale_documents = list(replaced_documents.values()) + removed_documents
+            stale_document_ids = [document_id for document_id, _ in stale_documents]
+            print(
+                "Incremental changes:",
+                new_document_count,
+                "new,",
+                len(replaced_documents),
+                "changed,",
+                len(removed_documents),
+                "removed documents",
+            )
+
+            # Stale postings are deleted, each one takes a document from its term
+            document_frequency_changes = {}
+            query = """
+            SELECT T.TERM, COUNT(*)
+            FROM APPEARS AP
+            JOIN TERM T ON T.ID = AP.TERM_ID
+            WHERE AP.DOCUMENT_ID IN ({binds})
+            GROUP BY T.TERM
+            """
+            for term, count in self.__execute_chunked_query(query, stale_document_ids):
+                document_frequency_changes[term] = document_frequency_changes.get(term, 0) - count
+
+            self.__execute_bulk_statement(
+                "DELETE FROM APPEARS WHERE DOCUMENT_ID = :document_id",
+                [(document_id,) for document_id in stale_document_ids],
+                commit=False,
+            )
+            self.__execute_bulk_statement(
+                "DELETE FROM DOCUMENT WHERE ID = :id",
+                [(document_id,) for document_id, _ in removed_documents],
+                commit=False,
+            )
+            document_ids = self.__bulk_insert_documents(
+                source_ids,
+                {i: document_id for i, (document_id, _) in replaced_documents.items()},
+                commit=False,
+            )
+            self.__resolve_document_ids(document_ids)
+
+            # Statistics are updated from the lengths of the changed documents only
+            statistics = self.get_document_statistics()
+            previous_count = statistics.get_document_count() if statistics else 0
+            # Lengths are integers, rounding keeps an unchanged corpus at the exact same
+            # average so that its impacts are not recomputed
+            total_length = (
+                round(previous_count * statistics.get_average_document_length())
+                if statistics
+                else 0
+            )
+            total_length += sum(self.__document_lengths.values())
+            total_length -= sum(document_length for _, document_length in stale_documents)
+            document_count = previous_count + new_document_count - len(removed_documents)
+            average_document_length = total_length / document_count if document_count > 0 else 0
+
+            indexed_terms = []
+            for term_id, term_document_count in enumerate(
+                self.__get_document_frequencies().tolist()
+            ):
+                if term_document_count > 0:
+                    term = self.__vocabulary.get_term(term_id)
+                    indexed_terms.append(term)
+                    document_frequency_changes[term] = (
+                        document_frequency_changes.get(term, 0) + term_document_count
+                    )
+            self.__merge_document_frequencies(
+                document_frequency_changes, document_count, commit=False
+            )
+
+            # New postings are scored with the document frequency of the whole table
+            database_term_ids = [None] * self.__vocabulary.get_size()
+            document_frequencies = [0] * self.__vocabulary.get_size()
+            query = "SELECT TERM, ID, DOCUMENT_FREQUENCY FROM TERM WHERE TERM IN ({binds})"
+            for term, database_term_id, document_frequency in self.__execute_chunked_query(
+                query, indexed_terms
+            ):
+                term_id = self.__vocabulary.get_term_id(term)
+                database_term_ids[term_id] = database_term_id
+                document_frequencies[term_id] = document_frequency
+            self.__bulk_register_appearances(
+                document_count,
+                average_document_length,
+                database_term_ids,
+                document_frequencies,
+                commit=False,
+            )
+
+            # Impacts already stored keep the statistics they were computed with until
+            # commit_insertions recomputes them after this transaction
+            scored_statistics = self.__get_scored_statistics() or (
+                document_count,
+                average_document_length,
+            )
+            self.__write_document_statistics(
+                document_count, average_document_length, scored_statistics, commit=False
+            )
+            self.__connection.commit()
+        except Exception as e:
+            self.__connection.rollback()
+            raise e
+
+        return (
+            document_ids,
+            [document_id for document_id, _ in removed_documents],
+            # Any change of the statistics makes every stored impact and IDF stale
+            (document_count, average_document_length) != tuple(scored_statistics),
+        )
@@ -0,0 +1,120 @@
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+
+from typing import Iterator
+
+INSERTIONS_LOG_MAGIC = b"IDXLOG01"
+# Chunk type, payload length and CRC32 of the payload
+CHUNK_HEADER_FORMAT = "<BII"
+
+SOURCE_CHUNK = 1
+DOCUMENT_CHUNK = 2
+POSTINGS_CHUNK = 3
+TERM_FREQUENCY_CHUNK = 4
+INCREMENTAL_CHUNK = 5
+REMOVED_DOCUMENT_CHUNK = 6
+INDEXED_CHUNK = 7
+PHASE_CHUNK = 8
+BATCH_CHUNK = 9
+FLUSHED_DOCUMENTS_CHUNK = 10
+BATCH_STARTED_CHUNK = 11
+FLUSHING_DOCUMENTS_CHUNK = 12
+
+
+class InsertionsLog:
+    def __init__(self, path: str, sync_interval: float = 5):
+        self.__path = path
+        self.__sync_interval = sync_interval
+        self.__file = None
+        self.__last_sync_time = 0.0
+        # Chunks are appended from the event loop and from loading threads
+        self.__lock = threading.RLock()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.__path)
+
+    def __read_chunks(self, file) -> Iterator[tuple[int, int, bytes]]:
+        header_size = struct.calcsize(CHUNK_HEADER_FORMAT)
+        if file.read(len(INSERTIONS_LOG_MAGIC)) != INSERTIONS_LOG_MAGIC:
+            return
+
+        while True:
+            header = file.read(header_size)
+            if len(header) < header_size:
+                return
+
+            chunk_type, length, checksum = struct.unpack(CHUNK_HEADER_FORMAT, header)
+            payload = file.read(length)
+            # A chunk cut short or corrupted by a crash ends the log
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                return
+
+            yield chunk_type, file.tell(), payload
+
+    def __get_valid_length(self) -> int:
+        with open(self.__path, "rb") as file:
+            valid_length = 0
+            for _, end, _ in self.__read_chunks(file):
+                valid_length = end
+            return valid_length
+
+    def read(self) -> Iterator[tuple[int, object]]:
+        if not self.exists():
+            return
+
+        with open(self.__path, "rb") as file:
+            for chunk_type, _, payload in self.__read_chunks(file):
+                yield chunk_type, pickle.loads(payload)
+
+    def __open(self):
+        # Appending continues after the last good chunk, a torn tail is dropped
+        valid_length = self.__get_valid_length() if self.exists() else 0
+        if valid_length == 0:
+            self.__file = open(self.__path, "wb")
+            self.__file.write(INSERTIONS_LOG_MAGIC)
+        else:
+            self.__file = open(self.__path, "r+b")
+            self.__file.truncate(valid_length)
+            self.__file.seek(valid_length)
+        self.__last_sync_time = time.monotonic()
+
+    def append(self, chunk_type: int, payload, sync: bool = False):
+        data = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+        with self.__lock:
+            if self.__file is None:
+                self.__open()
+
+            self.__file.write(
+                struct.pack(CHUNK_HEADER_FORMAT, chunk_type, len(data), zlib.crc32(data))
+            )
+            self.__file.write(data)
+
+            if sync or time.monotonic() - self.__last_sync_time >= self.__sync_interval:
+                self.sync()
+
+    def sync(self):
+        with self.__lock:
+            if self.__file is None:
+                return
+
+            self.__file.flush()
+            os.fsync(self.__file.fileno())
+            self.__last_sync_time = time.monotonic()
+
+    def close(self):
+        with self.__lock:
+            if self.__file is not None:
+                self.sync()
+                self.__file.close()
+                self.__file = None
+
+    def delete(self):
+        self.close()
+        os.remove(self.__path)
+
+    def get_size(self) -> int:
+        return os.path.getsize(self.__path) if self.exists() else 0
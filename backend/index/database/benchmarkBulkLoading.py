@@ -0,0 +1,130 @@
+import sys
+
+sys.path.append("/root/cancer_patient_search_engine")
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from backend.index.database.BulkLoader import BulkLoader
+
+# SQLite stand-in for APPEARS, bad rows violate its NOT NULL constraint
+create_statement = """
+CREATE TABLE APPEARS (
+    DOCUMENT_ID INTEGER NOT NULL,
+    TERM_ID INTEGER NOT NULL,
+    TERM_FREQUENCY INTEGER NOT NULL,
+    IMPACT INTEGER NOT NULL,
+    POSITIONS BLOB,
+    PRIMARY KEY (DOCUMENT_ID, TERM_ID)
+)
+"""
+insert_statement = """
+INSERT INTO APPEARS (DOCUMENT_ID, TERM_ID, TERM_FREQUENCY, IMPACT, POSITIONS)
+VALUES (?, ?, ?, ?, ?)
+"""
+
+
+def generate_rows(row_count: int, bad_row_rate: float):
+    random_generator = random.Random(0)
+    for i in range(row_count):
+        term_id = None if random_generator.random() < bad_row_rate else i % 5000 + 1
+        yield (
+            i // 5000,
+            term_id,
+            random_generator.randint(1, 20),
+            random_generator.randint(0, 9000),
+            b"\x01\x02\x03",
+        )
+
+
+def create_database(path: str) -> sqlite3.Connection:
+    if os.path.exists(path):
+        os.remove(path)
+
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(create_statement)
+    connection.commit()
+    return connection
+
+
+def connect(path: str):
+    return lambda: sqlite3.connect(path, timeout=60, check_same_thread=False)
+
+
+def load_single_statement(path: str, rows) -> int:
+    # Previous behaviour: one list, one executemany and one commit
+    connection = connect(path)()
+    appearances = list(rows)
+    try:
+        connection.executemany(insert_statement, appearances)
+        connection.commit()
+        return len(appearances)
+    except sqlite3.IntegrityError:
+        connection.rollback()
+        return 0
+    finally:
+        connection.close()
+
+
+def measure(name: str, path: str, load):
+    create_database(path).close()
+    tracemalloc.start()
+    start = time.perf_counter()
+    loaded_rows = load()
+    elapsed_time = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"  {name:<26} {loaded_rows:>9} rows {loaded_rows / elapsed_time:>10.0f} rows/s "
+        f"{peak / 1024 / 1024:>8.1f} MB peak"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Throughput of APPEARS bulk loading into a local SQLite database"
+    )
+    parser.add_argument("--rows", type=int, default=1000000, help="Rows to load")
+    parser.add_argument("--bad-row-rate", type=float, default=0.0, help="Share of bad rows")
+    parser.add_argument("--batch-sizes", default="1000,10000,50000", help="Batch sizes")
+    parser.add_argument("--sessions", default="1,4", help="Session counts")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), "benchmark_bulk_loading.sqlite")
+    print(f"{args.rows} rows, {args.bad_row_rate:.2%} bad rows, SQLite database {path}")
+
+    measure(
+        "single executemany",
+        path,
+        lambda: load_single_statement(path, generate_rows(args.rows, args.bad_row_rate)),
+    )
+    for session_count in [int(count) for count in args.sessions.split(",")]:
+        for batch_size in [int(size) for size in args.batch_sizes.split(",")]:
+            loader = BulkLoader(
+                connect(path),
+                "appearances",
+                insert_statement,
+                batch_size=batch_size,
+                session_count=session_count,
+                report_interval=float("inf"),
+                max_reported_errors=0,
+            )
+
+            def load():
+                loader.load(generate_rows(args.rows, args.bad_row_rate))
+                return loader.get_statistics()["ROWS"]
+
+            measure(f"batches of {batch_size}, {session_count} sessions", path, load)
+
+    # SQLite serializes writers, so extra sessions only show their overhead here
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,22 @@
+import hashlib
+
 from datetime import datetime
 from backend.documentTypes import DocumentType
 from backend.utils import get_text_language
 
 
 class Document:
+    # Collections hold many documents, slots drop the per-instance __dict__
+    __slots__ = (
+        "__title",
+        "__summary",
+        "__document_type",
+        "__publish_date",
+        "__document_url",
+        "__document_language",
+        "__source_id",
+    )
+
     def __init__(
         self,
         title: str,
@@ -32,6 +45,20 @@ class Document:
             self.__source_id,
         )
 
+    def get_content_hash(self, text: str) -> str:
+        # Covers the stored fields as well, so a new title or date is indexed again
+        content = "\0".join(
+            [
+                self.__title,
+                self.__summary,
+                self.__document_type.value,
+                str(self.__publish_date),
+                self.__document_url,
+                text,
+            ]
+        )
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
     def get_title(self) -> str:
         return self.__title
 
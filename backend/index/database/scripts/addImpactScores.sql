@@ -0,0 +1,20 @@
+-- Add precomputed BM25 impacts to APPEARS
+ALTER TABLE APPEARS ADD IMPACT NUMBER DEFAULT 0 NOT NULL;
+
+-- Replace N/df with the BM25 IDF documented in the README
+UPDATE TERM
+SET IDF = LN(((SELECT DOCUMENT_COUNT FROM DOCUMENT_STATISTICS) + 1) / DOCUMENT_FREQUENCY);
+
+-- Quantized impacts for k1 = 1.5, b = 0.75 and a scale of 1000 (see DatabaseModel)
+MERGE INTO APPEARS AP
+USING (
+    SELECT A.DOCUMENT_ID, A.TERM, ROUND(T.IDF * (A.TERM_FREQUENCY * (1.5 + 1)) / (A.TERM_FREQUENCY + 1.5 * (1 - 0.75 + 0.75 * D.DOCUMENT_LENGTH / S.AVERAGE_DOCUMENT_LENGTH)) * 1000) AS IMPACT
+    FROM APPEARS A
+    JOIN DOCUMENT D ON D.ID = A.DOCUMENT_ID
+    JOIN TERM T ON T.TERM = A.TERM
+    CROSS JOIN DOCUMENT_STATISTICS S
+) SCORES
+ON (AP.DOCUMENT_ID = SCORES.DOCUMENT_ID AND AP.TERM = SCORES.TERM)
+WHEN MATCHED THEN UPDATE SET AP.IMPACT = SCORES.IMPACT;
+
+COMMIT;
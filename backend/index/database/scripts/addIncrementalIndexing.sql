@@ -0,0 +1,14 @@
+-- Add content hashes to DOCUMENT. Rows indexed before this migration have none,
+-- so incremental runs re-index them once
+ALTER TABLE DOCUMENT ADD CONTENT_HASH VARCHAR2(64);
+
+-- Add the statistics APPEARS.IMPACT was last computed with
+ALTER TABLE DOCUMENT_STATISTICS ADD (
+    SCORED_DOCUMENT_COUNT NUMBER,
+    SCORED_AVERAGE_DOCUMENT_LENGTH NUMBER
+);
+
+UPDATE DOCUMENT_STATISTICS
+SET SCORED_DOCUMENT_COUNT = DOCUMENT_COUNT, SCORED_AVERAGE_DOCUMENT_LENGTH = AVERAGE_DOCUMENT_LENGTH;
+
+COMMIT;
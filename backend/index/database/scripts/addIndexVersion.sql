@@ -0,0 +1,10 @@
+-- Add a version that every index commit bumps, so query caches notice updates
+-- that keep the document count and average length unchanged
+ALTER TABLE DOCUMENT_STATISTICS ADD INDEX_VERSION NUMBER;
+
+CREATE SEQUENCE INDEX_VERSION_SEQUENCE;
+
+UPDATE DOCUMENT_STATISTICS
+SET INDEX_VERSION = INDEX_VERSION_SEQUENCE.NEXTVAL;
+
+COMMIT;
@@ -0,0 +1,25 @@
+-- Reference terms from APPEARS by a numeric ID instead of repeating the term
+-- string on every row and in the primary key
+ALTER TABLE TERM ADD ID NUMBER GENERATED BY DEFAULT AS IDENTITY;
+
+ALTER TABLE APPEARS ADD TERM_ID NUMBER;
+
+UPDATE APPEARS A
+SET TERM_ID = (SELECT T.ID FROM TERM T WHERE T.TERM = A.TERM);
+
+-- The old keys reference TERM.TERM, so they go before the column
+ALTER TABLE APPEARS DROP CONSTRAINT FK_TERM;
+ALTER TABLE APPEARS DROP PRIMARY KEY DROP INDEX;
+ALTER TABLE APPEARS DROP COLUMN TERM;
+ALTER TABLE TERM DROP PRIMARY KEY DROP INDEX;
+
+ALTER TABLE TERM ADD PRIMARY KEY (ID);
+ALTER TABLE TERM ADD UNIQUE (TERM);
+ALTER TABLE APPEARS MODIFY TERM_ID NOT NULL;
+ALTER TABLE APPEARS ADD PRIMARY KEY (DOCUMENT_ID, TERM_ID);
+ALTER TABLE APPEARS ADD CONSTRAINT FK_TERM FOREIGN KEY (TERM_ID) REFERENCES TERM (ID);
+
+-- Rewrites the rows without the dropped column so its space is released
+ALTER TABLE APPEARS MOVE ONLINE;
+
+COMMIT;
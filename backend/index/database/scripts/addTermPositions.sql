@@ -0,0 +1,5 @@
+-- Add delta-encoded token positions to APPEARS. Rows indexed before this
+-- migration have no positions and never match phrase queries until re-indexed
+ALTER TABLE APPEARS ADD POSITIONS BLOB;
+
+COMMIT;
@@ -16,13 +16,15 @@ CREATE TABLE DOCUMENT (
     DOCUMENT_URL VARCHAR2(2048) NOT NULL,
     DOCUMENT_LENGTH NUMBER NOT NULL,
     DOCUMENT_LANGUAGE VARCHAR2(50) CHECK (DOCUMENT_LANGUAGE IN ('spanish', 'english')),
+    CONTENT_HASH VARCHAR2(64),
     SOURCE_ID NUMBER NOT NULL,
     CONSTRAINT FK_SOURCE FOREIGN KEY (SOURCE_ID) REFERENCES SOURCE (ID)
 );
 
 -- Create table TERM
 CREATE TABLE TERM (
-    TERM VARCHAR2(255) PRIMARY KEY,
+    ID NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    TERM VARCHAR2(255) NOT NULL UNIQUE,
     DOCUMENT_FREQUENCY NUMBER NOT NULL,
     IDF NUMBER NOT NULL
 );
@@ -30,15 +32,23 @@ CREATE TABLE TERM (
 -- Create table APPEARS
 CREATE TABLE APPEARS (
     DOCUMENT_ID NUMBER NOT NULL,
-    TERM VARCHAR2(255) NOT NULL,
+    TERM_ID NUMBER NOT NULL,
     TERM_FREQUENCY NUMBER NOT NULL,
-    PRIMARY KEY (DOCUMENT_ID, TERM),
+    IMPACT NUMBER DEFAULT 0 NOT NULL,
+    POSITIONS BLOB,
+    PRIMARY KEY (DOCUMENT_ID, TERM_ID),
     CONSTRAINT FK_DOCUMENT FOREIGN KEY (DOCUMENT_ID) REFERENCES DOCUMENT (ID),
-    CONSTRAINT FK_TERM FOREIGN KEY (TERM) REFERENCES TERM (TERM)
+    CONSTRAINT FK_TERM FOREIGN KEY (TERM_ID) REFERENCES TERM (ID)
 );
 
 -- Create table DOCUMENT_STATISTICS
 CREATE TABLE DOCUMENT_STATISTICS (
     DOCUMENT_COUNT NUMBER NOT NULL,
-    AVERAGE_DOCUMENT_LENGTH NUMBER NOT NULL
-);
\ No newline at end of file
+    AVERAGE_DOCUMENT_LENGTH NUMBER NOT NULL,
+    SCORED_DOCUMENT_COUNT NUMBER,
+    SCORED_AVERAGE_DOCUMENT_LENGTH NUMBER,
+    INDEX_VERSION NUMBER
+);
+
+-- Create sequence INDEX_VERSION_SEQUENCE
+CREATE SEQUENCE INDEX_VERSION_SEQUENCE;
\ No newline at end of file
@@ -11,4 +11,7 @@ DROP TABLE TERM CASCADE CONSTRAINTS;
 DROP TABLE SOURCE CASCADE CONSTRAINTS;
 
 -- Drop table DOCUMENT_STATS
-DROP TABLE DOCUMENT_STATISTICS CASCADE CONSTRAINTS;
\ No newline at end of file
+DROP TABLE DOCUMENT_STATISTICS CASCADE CONSTRAINTS;
+
+-- Drop sequence INDEX_VERSION_SEQUENCE
+DROP SEQUENCE INDEX_VERSION_SEQUENCE;
\ No newline at end of file
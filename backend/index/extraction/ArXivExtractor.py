@@ -1,69 +1,89 @@
-import aiohttp
-from xml.etree import ElementTree
+from typing import AsyncIterator
+from xml.etree.ElementTree import Element, ParseError
 from backend.documentTypes import DocumentType
 from backend.index.DataSource import DataSource
+from backend.index.HttpClient import HttpClient
 from backend.index.database.entities.Document import Document
 from backend.index.database.entities.Source import Source
-from backend.index.extraction.Extractor import Extractor
+from backend.index.extraction.ArXivFeedParser import ArXivFeedParser
+from backend.index.extraction.Extractor import Extractor, OffsetPage
+from backend.index.extraction.PdfTextExtractor import PdfTextExtractor
 from backend.index.extraction.queryTerms import extractor_query_terms
-from backend.index.extraction.utils import (
-    find_all_elements_by_atom_xpath,
-    find_elements_by_atom_xpath,
-)
+from backend.index.scrapping.FaviconResolver import FaviconResolver
+from backend.index.extraction.utils import find_elements_by_atom_xpath
 
 
 class ArXivExtractor(Extractor):
-    def __init__(self, use_full_text=True, debug_mode=False):
+    def __init__(
+        self,
+        use_full_text=True,
+        debug_mode=False,
+        pdf_text_extractor: PdfTextExtractor | None = None,
+        http_client: HttpClient | None = None,
+        favicon_resolver: FaviconResolver | None = None,
+        max_results: int | None = None,
+    ):
+        # The arXiv API asks for one request every three seconds
         super().__init__(
             "ArXiv",
             "https://arxiv.org/",
             use_full_text=use_full_text,
             debug_mode=debug_mode,
+            pdf_text_extractor=pdf_text_extractor,
+            http_client=http_client,
+            favicon_resolver=favicon_resolver,
+            max_results=max_results,
+            page_size=500,
+            max_concurrent_pages=1,
+            requests_per_second=1 / 3,
         )
 
-    def _get_documents_data(self, source_id: int, xml_response: str) -> list[Document]:
-        tree = ElementTree.fromstring(xml_response)
-        entries = find_all_elements_by_atom_xpath(tree, "entry")
-        documents_data = []
+    def _get_document_data(self, source_id: int, entry: Element) -> Document | None:
+        elements_dict = find_elements_by_atom_xpath(entry, ["id", "title", "summary"])
+        if any(element is None for element in elements_dict.values()):
+            return None
 
-        for entry in entries:
-            elements_dict = find_elements_by_atom_xpath(
-                entry, ["id", "title", "summary"]
-            )
+        summary = elements_dict["summary"].text
+        title = elements_dict["title"].text
+
+        if not title or not summary:
+            return None
 
-            summary = elements_dict["summary"].text
-            title = elements_dict["title"].text
+        return Document(
+            title=self._sanitize_text(title),
+            summary=self._sanitize_text(summary),
+            document_type=DocumentType.PAPER,
+            document_url=elements_dict["id"].text.replace("/abs/", "/pdf/"),
+            source_id=source_id,
+        )
 
-            if not title or not summary:
-                continue
+    async def __fetch_page(self, source_id: int, offset: int, limit: int) -> OffsetPage:
+        params = {
+            "search_query": " ".join(extractor_query_terms),
+            "start": offset,
+            "max_results": limit,
+        }
 
-            document = Document(
-                title=self._sanitize_text(title),
-                summary=self._sanitize_text(summary),
-                document_type=DocumentType.PAPER,
-                document_url=elements_dict["id"].text.replace("/abs/", "/pdf/"),
-                source_id=source_id,
+        # Entries become documents while the feed downloads
+        parser = ArXivFeedParser(lambda entry: self._get_document_data(source_id, entry))
+        documents = []
+        try:
+            completed = await self._fetch(
+                "http://export.arxiv.org/api/query",
+                params=params,
+                chunk_handler=lambda chunk: documents.extend(parser.feed(chunk)),
             )
-            documents_data.append(document)
+            if completed is None:
+                return documents, None
 
-        return documents_data
+            documents.extend(parser.close())
+        except ParseError as e:
+            self._log_extraction_error(f"invalid response {e}")
+            return documents, None
 
-    async def get_document_collection_data(self, source_id: int) -> list[Document]:
-        arxiv_url = f"http://export.arxiv.org/api/query?search_query={" ".join(extractor_query_terms)}&max_results={Extractor.max_results}"
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(arxiv_url) as response:
-                    if response.status == 200:
-                        xml_response = await response.text()
-                        documents_data = self._get_documents_data(
-                            source_id, xml_response
-                        )
-                        return documents_data
-                    else:
-                        self._log_extraction_error(
-                            f"received status code {response.status} {response.reason}"
-                        )
-                        return []
-            except aiohttp.ClientError as e:
-                self._log_extraction_error(f"http request error {e}")
-                return []
+        return documents, parser.get_total_results()
+
+    def _iterate_document_pages(self, source_id: int) -> AsyncIterator[list[Document]]:
+        return self._iterate_offset_pages(
+            lambda offset, limit: self.__fetch_page(source_id, offset, limit)
+        )
@@ -0,0 +1,45 @@
+from typing import Callable
+from xml.etree.ElementTree import Element, XMLPullParser
+from backend.index.database.entities.Document import Document
+
+atom_namespace = "{http://www.w3.org/2005/Atom}"
+opensearch_namespace = "{http://a9.com/-/spec/opensearch/1.1/}"
+
+
+class ArXivFeedParser:
+    def __init__(self, get_entry_document: Callable[[Element], Document | None]):
+        self.__get_entry_document = get_entry_document
+        self.__parser = XMLPullParser(events=("start", "end"))
+        self.__root: Element | None = None
+        self.__total_results: int | None = None
+
+    def __read_events(self) -> list[Document]:
+        documents = []
+        for event, element in self.__parser.read_events():
+            if event == "start":
+                if self.__root is None:
+                    self.__root = element
+                continue
+
+            if element.tag == f"{opensearch_namespace}totalResults":
+                self.__total_results = int(element.text)
+            elif element.tag == f"{atom_namespace}entry":
+                document = self.__get_entry_document(element)
+                if document is not None:
+                    documents.append(document)
+
+                # Finished entries are dropped, the tree never holds more than one
+                self.__root.clear()
+
+        return documents
+
+    def feed(self, data: bytes) -> list[Document]:
+        self.__parser.feed(data)
+        return self.__read_events()
+
+    def close(self) -> list[Document]:
+        self.__parser.close()
+        return self.__read_events()
+
+    def get_total_results(self) -> int | None:
+        return self.__total_results
@@ -1,17 +1,28 @@
 import os
-import aiohttp
 
 from dotenv import load_dotenv
 from datetime import datetime
+from typing import AsyncIterator
 from backend.documentTypes import DocumentType
 from backend.index.DataSource import DataSource
+from backend.index.HttpClient import HttpClient
 from backend.index.database.entities.Document import Document
-from backend.index.extraction.Extractor import Extractor
+from backend.index.extraction.Extractor import CursorPage, Extractor
+from backend.index.extraction.PdfTextExtractor import PdfTextExtractor
 from backend.index.extraction.queryTerms import extractor_query_terms
+from backend.index.scrapping.FaviconResolver import FaviconResolver
 
 
 class COREExtractor(Extractor):
-    def __init__(self, use_full_text=True, debug_mode=False):
+    def __init__(
+        self,
+        use_full_text=True,
+        debug_mode=False,
+        pdf_text_extractor: PdfTextExtractor | None = None,
+        http_client: HttpClient | None = None,
+        favicon_resolver: FaviconResolver | None = None,
+        max_results: int | None = None,
+    ):
 
         # Retrieve params
         load_dotenv()
@@ -27,42 +38,48 @@ class COREExtractor(Extractor):
             "https://core.ac.uk/",
             use_full_text=use_full_text,
             debug_mode=debug_mode,
+            pdf_text_extractor=pdf_text_extractor,
+            http_client=http_client,
+            favicon_resolver=favicon_resolver,
+            max_results=max_results,
+            page_size=100,
+            requests_per_second=1,
         )
 
-    async def get_document_collection_data(self, source_id: int) -> list[Document]:
-        async with aiohttp.ClientSession() as session:
-            params = {
-                "q": " OR ".join(extractor_query_terms),
-                "limit": Extractor.max_results,
-            }
-            try:
-                async with session.get(
-                    "https://api.core.ac.uk/v3/search/works",
-                    headers=self.__headers,
-                    params=params,
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return [
-                            Document(
-                                self._sanitize_text(result["title"]),
-                                self._sanitize_text(result["abstract"]),
-                                DocumentType.PAPER,
-                                result["downloadUrl"],
-                                source_id,
-                                datetime.fromisoformat(result["publishedDate"]),
-                            )
-                            for result in data["results"]
-                            if result["title"]
-                            and result["abstract"]
-                            and result["publishedDate"]
-                            and result["downloadUrl"]
-                        ]
-                    else:
-                        self._log_extraction_error(
-                            f"received status code {response.status} {response.reason}"
-                        )
-                        return []
-            except aiohttp.ClientError as e:
-                self._log_extraction_error(f"http request error {e}")
-                return []
+    async def __fetch_page(self, source_id: int, scroll_id: str | None) -> CursorPage:
+        # Scrolling is the only way past the first ten thousand results
+        params = {
+            "q": " OR ".join(extractor_query_terms),
+            "limit": self._page_size,
+            "scroll": "true",
+        }
+        if scroll_id:
+            params["scrollId"] = scroll_id
+
+        data = await self._fetch(
+            "https://api.core.ac.uk/v3/search/works",
+            params=params,
+            headers=self.__headers,
+        )
+        if data is None or not data.get("results"):
+            return [], None
+
+        documents = [
+            Document(
+                self._sanitize_text(result["title"]),
+                self._sanitize_text(result["abstract"]),
+                DocumentType.PAPER,
+                result["downloadUrl"],
+                source_id,
+                datetime.fromisoformat(result["publishedDate"]),
+            )
+            for result in data["results"]
+            if result["title"]
+            and result["abstract"]
+            and result["publishedDate"]
+            and result["downloadUrl"]
+        ]
+        return documents, data.get("scrollId")
+
+    def _iterate_document_pages(self, source_id: int) -> AsyncIterator[list[Document]]:
+        return self._iterate_cursor_pages(lambda scroll_id: self.__fetch_page(source_id, scroll_id))
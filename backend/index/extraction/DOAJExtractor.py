@@ -1,15 +1,26 @@
-import aiohttp
 import urllib
 from datetime import datetime
+from typing import AsyncIterator
 from backend.documentTypes import DocumentType
 from backend.index.DataSource import DataSource
+from backend.index.HttpClient import HttpClient
 from backend.index.database.entities.Document import Document
-from backend.index.extraction.Extractor import Extractor
+from backend.index.extraction.Extractor import Extractor, OffsetPage
+from backend.index.extraction.PdfTextExtractor import PdfTextExtractor
 from backend.index.extraction.queryTerms import extractor_query_terms
+from backend.index.scrapping.FaviconResolver import FaviconResolver
 
 
 class DOAJExtractor(Extractor):
-    def __init__(self, use_full_text=True, debug_mode=False):
+    def __init__(
+        self,
+        use_full_text=True,
+        debug_mode=False,
+        pdf_text_extractor: PdfTextExtractor | None = None,
+        http_client: HttpClient | None = None,
+        favicon_resolver: FaviconResolver | None = None,
+        max_results: int | None = None,
+    ):
         self.__headers = {
             "User-Agent": DataSource.agent,
         }
@@ -18,57 +29,53 @@ class DOAJExtractor(Extractor):
             "https://doaj.org",
             use_full_text=use_full_text,
             debug_mode=debug_mode,
+            pdf_text_extractor=pdf_text_extractor,
+            http_client=http_client,
+            favicon_resolver=favicon_resolver,
+            max_results=max_results,
+            page_size=100,
+            requests_per_second=2,
         )
 
-    async def get_document_collection_data(self, source_id: int) -> list[Document]:
-        async with aiohttp.ClientSession() as session:
-            params = {
-                "page": 1,
-                "pageSize": Extractor.max_results,
-            }
-            try:
-                query = " OR ".join(extractor_query_terms)
-                encoded_query = urllib.parse.quote(query)
-                async with session.get(
-                    f"https://doaj.org/api/search/articles/{encoded_query}",
-                    headers=self.__headers,
-                    params=params,
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        results = data["results"]
+    async def __fetch_page(self, source_id: int, offset: int, limit: int) -> OffsetPage:
+        # Pages are numbered from one and always have the same size
+        params = {
+            "page": offset // self._page_size + 1,
+            "pageSize": self._page_size,
+        }
+        query = " OR ".join(extractor_query_terms)
+        encoded_query = urllib.parse.quote(query)
+        data = await self._fetch(
+            f"https://doaj.org/api/search/articles/{encoded_query}",
+            params=params,
+            headers=self.__headers,
+        )
+        if data is None:
+            return [], None
 
-                        documents = []
-                        for result in results:
-                            bibjson = result["bibjson"]
-                            title = bibjson.get("title")
-                            summary = bibjson.get("abstract")
-                            link = (
-                                bibjson.get("link", [None])[0].get("url", None)
-                                if bibjson.get("link")
-                                else None
-                            )
+        documents = []
+        for result in data.get("results", []):
+            bibjson = result["bibjson"]
+            title = bibjson.get("title")
+            summary = bibjson.get("abstract")
+            link = bibjson.get("link", [None])[0].get("url", None) if bibjson.get("link") else None
 
-                            if not link or not title or not summary:
-                                continue
+            if not link or not title or not summary:
+                continue
 
-                            documents.append(
-                                Document(
-                                    self._sanitize_text(title),
-                                    self._sanitize_text(summary),
-                                    DocumentType.PAPER,
-                                    link,
-                                    source_id,
-                                )
-                            )
+            documents.append(
+                Document(
+                    self._sanitize_text(title),
+                    self._sanitize_text(summary),
+                    DocumentType.PAPER,
+                    link,
+                    source_id,
+                )
+            )
 
-                        return documents
+        return documents, data.get("total", 0)
 
-                    else:
-                        self._log_extraction_error(
-                            f"received status code {response.status} {response.reason}"
-                        )
-                        return []
-            except aiohttp.ClientError as e:
-                self._log_extraction_error(f"http request error {e}")
-                return []
+    def _iterate_document_pages(self, source_id: int) -> AsyncIterator[list[Document]]:
+        return self._iterate_offset_pages(
+            lambda offset, limit: self.__fetch_page(source_id, offset, limit)
+        )
@@ -1,40 +1,76 @@
 from abc import abstractmethod
 import re
-from pdfminer.high_level import extract_text
-from io import BytesIO
-from typing import Callable, Coroutine
+from typing import Any, AsyncIterator, Callable, Coroutine
 from backend.index.DataSource import DataSource
+from backend.index.HttpClient import HttpClient
 from backend.index.database.entities.Document import Document
 from backend.index.database.entities.Source import Source
-from backend.index.scrapping.utils import get_favicon
+from backend.index.extraction.PdfTextExtractor import PdfTextExtractor
+from backend.index.extraction.RateLimiter import RateLimiter
+from backend.index.scrapping.FaviconResolver import FaviconResolver
 
+import asyncio
 import inspect
 import aiohttp
 
+# A page of documents and the total number of results, or the cursor of the next page
+OffsetPage = tuple[list[Document], int | None]
+CursorPage = tuple[list[Document], Any]
+
 
 class Extractor(DataSource):
     max_results = 1000
+    max_attempts = 3
 
     def __init__(
-        self, extractor_name: str, base_url: str, use_full_text=True, debug_mode=False
+        self,
+        extractor_name: str,
+        base_url: str,
+        use_full_text=True,
+        debug_mode=False,
+        pdf_text_extractor: PdfTextExtractor | None = None,
+        http_client: HttpClient | None = None,
+        favicon_resolver: FaviconResolver | None = None,
+        max_results: int | None = None,
+        page_size: int = 100,
+        max_concurrent_pages: int = 4,
+        requests_per_second: float = 1,
     ):
         self._debug_mode = debug_mode
         self._extractorName = extractor_name
         self._base_url = base_url
         self._use_full_text = use_full_text
-        super().__init__()
+        self._max_results = max_results if max_results else Extractor.max_results
+        self._page_size = min(page_size, self._max_results)
+        self._max_concurrent_pages = max_concurrent_pages
+        self._rate_limiter = RateLimiter(requests_per_second)
+        self._pdf_text_extractor = pdf_text_extractor if pdf_text_extractor else PdfTextExtractor()
+        self._extraction_failures = {
+            "download": 0,
+            "too_large": 0,
+            "timeout": 0,
+            "memory": 0,
+            "parse": 0,
+        }
+        super().__init__(http_client=http_client)
+        self._favicon_resolver = (
+            favicon_resolver if favicon_resolver else FaviconResolver(self._http_client)
+        )
 
     async def get_source_data(self) -> Source:
         source = Source(
             source_name=self._extractorName,
             base_url=self._base_url,
-            icon=get_favicon(self._base_url),
+            icon=await self._favicon_resolver.resolve(self._base_url),
         )
         return source
 
     def get_source_name(self) -> str:
         return self._extractorName
 
+    def get_extraction_failures(self) -> dict[str, int]:
+        return self._extraction_failures
+
     def _log_extraction_error(self, message: str) -> str:
         if not self._debug_mode:
             return
@@ -48,41 +84,179 @@ class Extractor(DataSource):
             message,
         )
 
-    async def get_document_text(self, document_data: Document) -> str:
-        if not self._use_full_text:
-            return document_data.get_summary()
+    async def _fetch(
+        self,
+        url: str,
+        params: dict | None = None,
+        headers: dict | None = None,
+        as_json=True,
+        chunk_handler: Callable[[bytes], None] | None = None,
+    ) -> Any:
+        for attempt in range(Extractor.max_attempts):
+            await self._rate_limiter.acquire()
+            try:
+                async with self._http_client.get(url, params=params, headers=headers) as response:
+                    if response.status == 200:
+                        # Large bodies can be consumed while they download
+                        if chunk_handler:
+                            async for chunk in response.content.iter_chunked(64 * 1024):
+                                chunk_handler(chunk)
+                            return True
+                        if as_json:
+                            return await response.json(content_type=None)
+                        return await response.text()
 
-        pdf_url = document_data.get_document_url()
-        pdf_data = await self._download_pdf(
-            pdf_url, headers={"User-Agent": DataSource.agent}
-        )
-        text = await self._get_pdf_text(pdf_data)
-        return text or document_data.get_summary()
+                    # Rate limited or overloaded, the request is retried after a pause
+                    if response.status in (429, 503) and attempt + 1 < Extractor.max_attempts:
+                        retry_after = response.headers.get("Retry-After", "")
+                        self._rate_limiter.delay(
+                            float(retry_after) if retry_after.isdigit() else 2**attempt
+                        )
+                        continue
+
+                    self._log_extraction_error(
+                        f"received status code {response.status} {response.reason}"
+                    )
+                    return None
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                self._log_extraction_error(f"http request error {e}")
+                return None
+
+        return None
+
+    async def _iterate_offset_pages(
+        self, fetch_page: Callable[[int, int], Coroutine[Any, Any, OffsetPage]]
+    ) -> AsyncIterator[list[Document]]:
+        # The first page tells how many results there are, the other pages are then
+        # fetched concurrently and yielded in offset order, so documents keep the order
+        # the indexer numbers them by
+        documents, total = await fetch_page(0, self._page_size)
+        yield documents
+
+        total = min(total or 0, self._max_results)
+        semaphore = asyncio.Semaphore(self._max_concurrent_pages)
+
+        async def fetch_bounded_page(offset: int) -> list[Document]:
+            async with semaphore:
+                documents, _ = await fetch_page(offset, min(self._page_size, total - offset))
+                return documents
+
+        tasks = [
+            asyncio.ensure_future(fetch_bounded_page(offset))
+            for offset in range(self._page_size, total, self._page_size)
+        ]
+        try:
+            for task in tasks:
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _iterate_cursor_pages(
+        self, fetch_page: Callable[[Any], Coroutine[Any, Any, CursorPage]]
+    ) -> AsyncIterator[list[Document]]:
+        # Scroll tokens only lead to the next page, so pages are fetched in order
+        cursor = None
+        result_count = 0
+        while result_count < self._max_results:
+            documents, cursor = await fetch_page(cursor)
+            result_count += len(documents)
+            yield documents
+
+            if cursor is None:
+                break
+
+    @abstractmethod
+    def _iterate_document_pages(self, source_id: int) -> AsyncIterator[list[Document]]:
+        pass
+
+    async def iterate_document_collection_data(
+        self, source_id: int
+    ) -> AsyncIterator[list[Document]]:
+        # Results can move between pages while harvesting, each URL is kept once
+        document_urls = set()
+        pages = self._iterate_document_pages(source_id)
+        try:
+            async for documents in pages:
+                new_documents = []
+                for document in documents:
+                    if len(document_urls) == self._max_results:
+                        break
+                    if document.get_document_url() not in document_urls:
+                        document_urls.add(document.get_document_url())
+                        new_documents.append(document)
+
+                if new_documents:
+                    yield new_documents
+                if len(document_urls) == self._max_results:
+                    break
+        finally:
+            # Pages still being fetched are cancelled
+            await pages.aclose()
+
+    async def get_document_collection_data(self, source_id: int) -> list[Document]:
+        documents = []
+        async for page_documents in self.iterate_document_collection_data(source_id):
+            documents.extend(page_documents)
+
+        return documents
 
     async def _download_pdf(self, url: str, headers) -> bytes:
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        return await response.read()
-                    else:
+        max_bytes = self._pdf_text_extractor.get_max_bytes()
+        session = self._http_client.get_session()
+        try:
+            async with session.get(url, headers=headers) as response:
+                if response.status == 200:
+                    if response.content_length and response.content_length > max_bytes:
+                        self._extraction_failures["too_large"] += 1
                         self._log_extraction_error(
-                            f"error downloading PDF from url '{url}': {response.status}"
+                            f"PDF from url '{url}' has {response.content_length} bytes"
                         )
                         return b""
-            except aiohttp.ClientError as e:
-                self._log_extraction_error(
-                    f"error with download PDF HTTP request for url '{url}': {e}"
-                )
-                return b""
+
+                    # Servers may omit the length, the body is read up to the limit
+                    pdf_data = bytearray()
+                    async for chunk in response.content.iter_chunked(64 * 1024):
+                        pdf_data.extend(chunk)
+                        if len(pdf_data) > max_bytes:
+                            self._extraction_failures["too_large"] += 1
+                            self._log_extraction_error(
+                                f"PDF from url '{url}' exceeds {max_bytes} bytes"
+                            )
+                            return b""
+
+                    return bytes(pdf_data)
+                else:
+                    self._extraction_failures["download"] += 1
+                    self._log_extraction_error(
+                        f"error downloading PDF from url '{url}': {response.status}"
+                    )
+                    return b""
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self._extraction_failures["download"] += 1
+            self._log_extraction_error(f"error with download PDF HTTP request for url '{url}': {e}")
+            return b""
 
     async def _get_pdf_text(self, pdf_data: bytes) -> str:
+        if not pdf_data:
+            return ""
+
         try:
-            with BytesIO(pdf_data) as pdf_file:
-                return extract_text(pdf_file)
+            return await self._pdf_text_extractor.extract_text(pdf_data)
+        except ValueError as e:
+            self._extraction_failures["too_large"] += 1
+            self._log_extraction_error(f"Error getting PDF text: {e}")
+        except TimeoutError:
+            self._extraction_failures["timeout"] += 1
+            self._log_extraction_error("Error getting PDF text: extraction timed out")
+        except MemoryError as e:
+            self._extraction_failures["memory"] += 1
+            self._log_extraction_error(f"Error getting PDF text: {e}")
         except Exception as e:
+            self._extraction_failures["parse"] += 1
             self._log_extraction_error(f"Error getting PDF text: {e}")
-            return ""
+
+        return ""
 
     def _sanitize_text(self, text: str) -> str:
         return re.sub(r"\s+", " ", text.replace("\n", "").replace("\t", "")).strip()
@@ -96,8 +270,6 @@ class Extractor(DataSource):
             return document_summary
 
         pdf_url = document_data.get_document_url()
-        pdf_data = await self._download_pdf(
-            pdf_url, headers={"User-Agent": DataSource.agent}
-        )
+        pdf_data = await self._download_pdf(pdf_url, headers={"User-Agent": DataSource.agent})
         text = await self._get_pdf_text(pdf_data)
         return text or document_summary
@@ -0,0 +1,131 @@
+import asyncio
+import multiprocessing
+import resource
+
+from io import BytesIO
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+from pdfminer.high_level import extract_text
+
+PdfWorker = tuple[BaseProcess, Connection]
+
+
+def _run_worker(connection: Connection, max_pages: int, memory_limit: int):
+    # The address space limit turns a runaway PDF into a MemoryError in the worker
+    # instead of swapping or an OOM kill of the indexer
+    if memory_limit:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+    while True:
+        try:
+            pdf_data = connection.recv_bytes()
+        except EOFError:
+            return
+
+        try:
+            with BytesIO(pdf_data) as pdf_file:
+                connection.send(("text", extract_text(pdf_file, maxpages=max_pages)))
+        except MemoryError:
+            connection.send(("memory", "memory limit exceeded"))
+        except Exception as e:
+            connection.send(("error", repr(e)))
+
+
+class PdfTextExtractor:
+    def __init__(
+        self,
+        max_workers: int = max(multiprocessing.cpu_count() - 1, 1),
+        timeout: float = 30,
+        max_pages: int = 50,
+        max_bytes: int = 20 * 1024 * 1024,
+        memory_limit: int = 1024 * 1024 * 1024,
+    ):
+        self.__max_workers = max_workers
+        self.__timeout = timeout
+        self.__max_pages = max_pages
+        self.__max_bytes = max_bytes
+        self.__memory_limit = memory_limit
+        self.__context = multiprocessing.get_context("spawn")
+        self.__idle_workers: list[PdfWorker] = []
+        self.__busy_workers: set[PdfWorker] = set()
+        self.__semaphore: asyncio.Semaphore | None = None
+
+    def get_max_bytes(self) -> int:
+        return self.__max_bytes
+
+    def __start_worker(self) -> PdfWorker:
+        connection, worker_connection = self.__context.Pipe()
+        process = self.__context.Process(
+            target=_run_worker,
+            args=(worker_connection, self.__max_pages, self.__memory_limit),
+            daemon=True,
+        )
+        process.start()
+        worker_connection.close()
+        return process, connection
+
+    def __stop_worker(self, worker: PdfWorker):
+        process, connection = worker
+        connection.close()
+        process.kill()
+        process.join()
+
+    async def __receive(self, connection: Connection):
+        loop = asyncio.get_running_loop()
+        readable = loop.create_future()
+        file_descriptor = connection.fileno()
+
+        # Waiting on the pipe keeps the event loop free while the worker parses
+        loop.add_reader(file_descriptor, lambda: readable.done() or readable.set_result(None))
+        try:
+            await asyncio.wait_for(readable, self.__timeout)
+        finally:
+            loop.remove_reader(file_descriptor)
+
+        return connection.recv()
+
+    async def __extract_with_worker(self, worker: PdfWorker, pdf_data: bytes) -> tuple[str, str]:
+        _, connection = worker
+        await asyncio.get_running_loop().run_in_executor(None, connection.send_bytes, pdf_data)
+        return await self.__receive(connection)
+
+    async def extract_text(self, pdf_data: bytes) -> str:
+        if len(pdf_data) > self.__max_bytes:
+            raise ValueError(f"PDF of {len(pdf_data)} bytes exceeds {self.__max_bytes} bytes")
+
+        # The semaphore is created on first use so it belongs to the running loop
+        if self.__semaphore is None:
+            self.__semaphore = asyncio.Semaphore(self.__max_workers)
+
+        async with self.__semaphore:
+            worker = self.__idle_workers.pop() if self.__idle_workers else self.__start_worker()
+            self.__busy_workers.add(worker)
+            try:
+                status, result = await self.__extract_with_worker(worker, pdf_data)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                # A stuck worker cannot be interrupted, it is killed and replaced
+                self.__busy_workers.discard(worker)
+                self.__stop_worker(worker)
+                raise
+            except (EOFError, OSError) as e:
+                self.__busy_workers.discard(worker)
+                self.__stop_worker(worker)
+                raise RuntimeError(f"PDF worker exited unexpectedly: {e!r}")
+
+            self.__busy_workers.discard(worker)
+            if status == "memory":
+                self.__stop_worker(worker)
+                raise MemoryError(result)
+
+            self.__idle_workers.append(worker)
+
+        if status == "error":
+            raise RuntimeError(result)
+        return result
+
+    def close(self):
+        for worker in self.__idle_workers + list(self.__busy_workers):
+            self.__stop_worker(worker)
+
+        self.__idle_workers = []
+        self.__busy_workers = set()
@@ -1,107 +1,154 @@
+import os
+
 from datetime import datetime
-import aiohttp
+from dotenv import load_dotenv
+from typing import AsyncIterator
 
 from backend.documentTypes import DocumentType
 from backend.index.DataSource import DataSource
+from backend.index.HttpClient import HttpClient
 from backend.index.database.entities.Document import Document
-from backend.index.extraction.Extractor import Extractor
+from backend.index.extraction.Extractor import Extractor, OffsetPage
+from backend.index.extraction.PdfTextExtractor import PdfTextExtractor
 from backend.index.extraction.queryTerms import extractor_query_terms
+from backend.index.scrapping.FaviconResolver import FaviconResolver
 
 
 class PubMedExtractor(Extractor):
-
-    def __init__(self, use_full_text=True, debug_mode=False):
+    def __init__(
+        self,
+        use_full_text=True,
+        debug_mode=False,
+        pdf_text_extractor: PdfTextExtractor | None = None,
+        http_client: HttpClient | None = None,
+        favicon_resolver: FaviconResolver | None = None,
+        max_results: int | None = None,
+    ):
         self.__headers = {
             "User-Agent": DataSource.agent,
             "Accept": "application/json",
             "Referer": "https://www.ncbi.nlm.nih.gov/",
         }
+
+        # E-utilities allow 3 requests per second, or 10 with an API key
+        load_dotenv()
+        api_key = os.getenv("NCBI_API_KEY")
+        self.__api_params = {"api_key": api_key} if api_key else {}
+
         super().__init__(
             "PubMed",
             "https://pubmed.ncbi.nlm.nih.gov/",
             use_full_text=use_full_text,
             debug_mode=debug_mode,
+            pdf_text_extractor=pdf_text_extractor,
+            http_client=http_client,
+            favicon_resolver=favicon_resolver,
+            max_results=max_results,
+            page_size=500,
+            max_concurrent_pages=2,
+            requests_per_second=10 if api_key else 3,
         )
 
+    def __parse_publish_date(self, publish_date: str | None) -> datetime | None:
+        if not publish_date:
+            return None
+
+        # Some articles only have a year and month
+        for date_format in ("%Y %b %d", "%Y %b", "%Y"):
+            try:
+                return datetime.strptime(publish_date, date_format)
+            except ValueError:
+                continue
+
+        return None
+
     async def _fetch_documents_details(
-        self, session, document_ids: set[str], source_id: int
+        self, history_params: dict, offset: int, limit: int, source_id: int
     ) -> list[Document]:
-        entrez_url_summary = (
-            "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi"
-        )
+        entrez_url_summary = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi"
         entrez_params_summary = {
             "db": "pmc",
-            "id": ",".join(document_ids),
+            **history_params,
+            "retstart": offset,
+            "retmax": limit,
             "retmode": "json",
+            **self.__api_params,
         }
-        async with session.get(
+        summary_response = await self._fetch(
             entrez_url_summary, params=entrez_params_summary, headers=self.__headers
-        ) as response:
-            if response.status == 200:
-                summary_response = await response.json()
-                result = summary_response.get("result", {})
-                documents_data = [(key, result[key]) for key in result if key != "uids"]
-
-                documents = []
-                for document_id, document_data in documents_data:
-                    title = document_data.get("title", None)
-                    summary = document_data.get("summary", None)
-
-                    publish_date = document_data.get("pubdate", None)
-                    publish_date = (
-                        datetime.strptime(publish_date, "%Y %b %d")
-                        if publish_date
-                        else None
-                    )
-
-                    if not title or not summary:
-                        continue
-
-                    document = Document(
-                        title=self._sanitize_text(title),
-                        summary=self._sanitize_text(summary),
-                        document_type=DocumentType.PAPER,
-                        document_url=f"https://www.ncbi.nlm.nih.gov/pmc/articles/{document_id}/pdf/",
-                        source_id=source_id,
-                        publish_date=publish_date,
-                    )
-                    documents.append(document)
-
-                return documents
-            else:
-                self._log_extraction_error(
-                    f"error in eSummary request: {response.status}"
-                )
-                return []
-
-    async def get_document_collection_data(self, source_id: int) -> list[Document]:
+        )
+        if summary_response is None:
+            return []
+
+        result = summary_response.get("result", {})
+        documents_data = [(key, result[key]) for key in result if key != "uids"]
+
+        documents = []
+        for document_id, document_data in documents_data:
+            title = document_data.get("title", None)
+            summary = document_data.get("summary", None)
+            publish_date = self.__parse_publish_date(document_data.get("pubdate", None))
+
+            if not title or not summary:
+                continue
+
+            document = Document(
+                title=self._sanitize_text(title),
+                summary=self._sanitize_text(summary),
+                document_type=DocumentType.PAPER,
+                document_url=f"https://www.ncbi.nlm.nih.gov/pmc/articles/{document_id}/pdf/",
+                source_id=source_id,
+                publish_date=publish_date,
+            )
+            documents.append(document)
+
+        return documents
+
+    async def __search(self) -> tuple[int, dict] | None:
+        # esearch cannot page past 10,000 records. The result set is kept on the
+        # history server instead and summaries are paged from it
         entrez_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
         entrez_params = {
             "db": "pmc",
             "term": " OR ".join(extractor_query_terms),
-            "retmax": Extractor.max_results,
+            "usehistory": "y",
+            "retmax": 0,
             "retmode": "json",
+            **self.__api_params,
         }
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(
-                    entrez_url,
-                    params=entrez_params,
-                    headers=self.__headers,
-                ) as response:
-                    if response.status == 200:
-                        search_response = await response.json()
-                        esearch_result = search_response.get("esearchresult", {})
-                        document_ids = set(esearch_result.get("idlist", []))
-                        return await self._fetch_documents_details(
-                            session, document_ids, source_id
-                        )
-                        return []
-                    else:
-                        self._log_extraction_error(
-                            f"received status code {response.status} {response.reason}"
-                        )
-                        return []
-            except aiohttp.ClientError as e:
-                self._log_extraction_error(f"http request error {e}")
-                return []
+        search_response = await self._fetch(
+            entrez_url, params=entrez_params, headers=self.__headers
+        )
+        if search_response is None:
+            return None
+
+        esearch_result = search_response.get("esearchresult", {})
+        if "webenv" not in esearch_result or "querykey" not in esearch_result:
+            self._log_extraction_error("esearch did not return a history server result set")
+            return None
+
+        history_params = {
+            "WebEnv": esearch_result["webenv"],
+            "query_key": esearch_result["querykey"],
+        }
+        return int(esearch_result.get("count", 0)), history_params
+
+    async def _iterate_document_pages(self, source_id: int) -> AsyncIterator[list[Document]]:
+        search_result = await self.__search()
+        if search_result is None:
+            return
+
+        count, history_params = search_result
+
+        async def fetch_summary_page(offset: int, limit: int) -> OffsetPage:
+            documents = await self._fetch_documents_details(
+                history_params, offset, limit, source_id
+            )
+            return documents, count
+
+        pages = self._iterate_offset_pages(fetch_summary_page)
+        try:
+            async for documents in pages:
+                yield documents
+        finally:
+            await pages.aclose()
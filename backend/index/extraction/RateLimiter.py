@@ -0,0 +1,20 @@
+import asyncio
+
+
+class RateLimiter:
+    def __init__(self, requests_per_second: float):
+        self.__interval = 1 / requests_per_second if requests_per_second > 0 else 0
+        self.__next_request_time = 0.0
+
+    async def acquire(self):
+        # Each caller reserves the next free slot, so concurrent requests are spaced
+        # evenly instead of bursting together
+        now = asyncio.get_running_loop().time()
+        request_time = max(now, self.__next_request_time)
+        self.__next_request_time = request_time + self.__interval
+        await asyncio.sleep(request_time - now)
+
+    def delay(self, seconds: float):
+        # Servers asking to slow down push back every pending slot
+        now = asyncio.get_running_loop().time()
+        self.__next_request_time = max(self.__next_request_time, now + seconds)
@@ -0,0 +1,99 @@
+import sys
+
+sys.path.append("/root/cancer_patient_search_engine")
+
+import argparse
+import os
+import time
+import tracemalloc
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+from backend.index.extraction.ArXivExtractor import ArXivExtractor
+from backend.index.extraction.ArXivFeedParser import ArXivFeedParser
+from backend.index.extraction.utils import find_all_elements_by_atom_xpath
+
+summary_words = (
+    "We study the response of metastatic tumors to combined chemotherapy and "
+    "immunotherapy in a cohort of patients with advanced carcinoma, and report "
+    "survival, toxicity and biomarker outcomes over a five year follow up."
+)
+
+
+def write_fixture(path: str, entry_count: int):
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<feed xmlns="http://www.w3.org/2005/Atom" '
+            'xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">\n'
+            f"<opensearch:totalResults>{entry_count}</opensearch:totalResults>\n"
+        )
+        for number in range(entry_count):
+            file.write(
+                "<entry>"
+                f"<id>http://arxiv.org/abs/{2400 + number // 100000}.{number:05d}v1</id>"
+                f"<title>Tumor response study number {number}</title>"
+                f"<summary>{escape(summary_words)} Entry {number}.</summary>"
+                "<author><name>A. Researcher</name></author>"
+                "</entry>\n"
+            )
+        file.write("</feed>\n")
+
+
+def parse_whole_feed(extractor: ArXivExtractor, path: str, chunk_size: int) -> int:
+    with open(path, "rb") as file:
+        xml_response = file.read().decode("utf-8")
+
+    tree = ElementTree.fromstring(xml_response)
+    documents = [
+        extractor._get_document_data(0, entry)
+        for entry in find_all_elements_by_atom_xpath(tree, "entry")
+    ]
+    return len(documents)
+
+
+def parse_streamed_feed(extractor: ArXivExtractor, path: str, chunk_size: int) -> int:
+    parser = ArXivFeedParser(lambda entry: extractor._get_document_data(0, entry))
+    documents = []
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            documents.extend(parser.feed(chunk))
+    documents.extend(parser.close())
+    return len(documents)
+
+
+def measure(name: str, parse, extractor: ArXivExtractor, path: str, chunk_size: int):
+    tracemalloc.start()
+    start = time.perf_counter()
+    document_count = parse(extractor, path, chunk_size)
+    elapsed_time = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"  {name:<10} {document_count:>7} documents {elapsed_time:>8.2f} s "
+        f"{peak / 1024 / 1024:>9.1f} MB peak"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Peak memory of whole-feed and streamed parsing of an arXiv Atom feed"
+    )
+    parser.add_argument("--fixture", default="arxiv_feed_fixture.xml", help="Feed file")
+    parser.add_argument("--entries", type=int, default=10000, help="Entries of a new fixture")
+    parser.add_argument("--chunk-size", type=int, default=64 * 1024, help="Streamed bytes")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.fixture):
+        write_fixture(args.fixture, args.entries)
+    print(f"{args.fixture} ({os.path.getsize(args.fixture) / 1024 / 1024:.1f} MB)")
+
+    # Documents are built the same way in both runs, only parsing differs
+    extractor = ArXivExtractor(use_full_text=False)
+    extractor._get_document_data(0, ElementTree.fromstring("<entry/>"))
+    measure("whole", parse_whole_feed, extractor, args.fixture, args.chunk_size)
+    measure("streamed", parse_streamed_feed, extractor, args.fixture, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+from backend.documentTypes import DocumentLanguage
+from backend.engine.TermProcessor import TermProcessor
+
+# Partial inverted index of a batch of documents, numbered by their position in the
+# batch: document lengths and term -> {document number: positions}
+PartialIndex = tuple[list[int], dict[str, dict[int, list[int]]]]
+
+_term_processor: TermProcessor = None
+
+
+def initialize_worker(use_regex_tokenizer: bool = False, stem_cache_path: str | None = None):
+    global _term_processor
+    # New stems are sent back to the indexer, which saves the cache
+    _term_processor = TermProcessor(
+        use_regex_tokenizer=use_regex_tokenizer,
+        stem_cache_path=stem_cache_path,
+        record_new_stems=stem_cache_path is not None,
+    )
+
+
+def build_partial_index(
+    documents: list[tuple[str, DocumentLanguage]],
+    term_processor: TermProcessor | None = None,
+) -> PartialIndex:
+    # Workers use the term processor created by initialize_worker
+    term_processor = term_processor if term_processor else _term_processor
+
+    document_lengths = []
+    inverted_index = {}
+    for document_number, (text, language) in enumerate(documents):
+        term_positions = term_processor.get_term_positions(text, language)
+        document_lengths.append(sum(len(positions) for positions in term_positions.values()))
+
+        for term, positions in term_positions.items():
+            if term in inverted_index:
+                inverted_index[term][document_number] = positions
+            else:
+                inverted_index[term] = {document_number: positions}
+
+    return document_lengths, inverted_index
+
+
+def build_worker_partial_index(
+    documents: list[tuple[str, DocumentLanguage]],
+) -> tuple[PartialIndex, dict[tuple[DocumentLanguage, str], str]]:
+    partial_index = build_partial_index(documents)
+    return partial_index, _term_processor.get_stem_cache().pop_new_stems()
@@ -0,0 +1,84 @@
+import numpy as np
+
+from backend.index.postings.PostingFileReader import PostingFileReader
+
+
+class MappedTermPostings:
+    def __init__(
+        self,
+        query_position: int,
+        reader: PostingFileReader,
+        term: str,
+        k1: float,
+        b: float,
+        average_document_length: float,
+        idf: float | None = None,
+        deleted_documents: np.ndarray | None = None,
+    ):
+        self.__query_position = query_position
+        self.__reader = reader
+        _, self.__idf, self.__first_block, block_count = reader.get_term_entry(term)
+        self.__block_table = reader.get_block_table(self.__first_block, block_count)
+        self.__k1 = k1
+        self.__b = b
+        self.__average_document_length = average_document_length
+        self.__deleted_documents = deleted_documents
+
+        # Impacts embed the statistics of this file only, an IDF computed over
+        # several segments forces scoring from term frequencies
+        impact_k1, impact_b, _ = reader.get_impact_parameters()
+        self.__use_impacts = idf is None and k1 == impact_k1 and b == impact_b
+        if idf is not None:
+            self.__idf = idf
+
+    def get_query_position(self) -> int:
+        return self.__query_position
+
+    def get_block_first_documents(self) -> np.ndarray:
+        return self.__block_table["first_document"]
+
+    def get_block_maxima(self) -> np.ndarray:
+        if self.__use_impacts:
+            return self.__block_table["max_impact"].astype(np.float64)
+
+        # Without matching impacts, idf * (k1 + 1) bounds every BM25 term score
+        return np.full(len(self.__block_table), self.__idf * (self.__k1 + 1))
+
+    def __score(
+        self, documents: np.ndarray, frequencies: np.ndarray, impacts: np.ndarray
+    ) -> np.ndarray:
+        if self.__use_impacts:
+            return impacts.astype(np.float64)
+
+        document_ids = self.__reader.get_document_ids()
+        document_lengths = self.__reader.get_document_lengths()[
+            np.searchsorted(document_ids, documents)
+        ]
+        length_norms = self.__k1 * (
+            1 - self.__b + self.__b * document_lengths / self.__average_document_length
+        )
+        return self.__idf * (frequencies * (self.__k1 + 1)) / (frequencies + length_norms)
+
+    def get_block_postings(self, blocks: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # Only the requested blocks are decoded from the mapped file
+        decoded_blocks = [
+            self.__reader.decode_block(self.__first_block + int(block)) for block in blocks
+        ]
+        if not decoded_blocks:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        documents, frequencies, impacts = (
+            np.concatenate(values) for values in zip(*decoded_blocks)
+        )
+        if self.__deleted_documents is not None and len(self.__deleted_documents):
+            is_live = ~np.isin(documents, self.__deleted_documents)
+            documents, frequencies, impacts = (
+                documents[is_live],
+                frequencies[is_live],
+                impacts[is_live],
+            )
+        return documents, self.__score(documents, frequencies, impacts)
+
+    def get_documents(self) -> np.ndarray:
+        documents, _ = self.get_block_postings(np.arange(len(self.__block_table)))
+        return documents
@@ -0,0 +1,132 @@
+import mmap
+import struct
+import numpy as np
+
+from backend.index.postings.utils import (
+    BLOCK_TABLE_DTYPE,
+    HEADER_FORMAT,
+    POSTING_FILE_MAGIC,
+    POSTING_FILE_VERSION,
+    TERM_ENTRY_FORMAT,
+    decode_deltas,
+    decode_varints,
+)
+
+
+class PostingFileReader:
+    def __init__(self, path: str):
+        self.__file = open(path, "rb")
+        self.__mmap = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic,
+            version,
+            self.__block_size,
+            self.__document_count,
+            term_count,
+            self.__average_document_length,
+            self.__impact_k1,
+            self.__impact_b,
+            self.__impact_scale,
+            self.__documents_offset,
+            self.__documents_length,
+            block_table_offset,
+            block_count,
+            dictionary_offset,
+            dictionary_length,
+        ) = struct.unpack_from(HEADER_FORMAT, self.__mmap, 0)
+
+        if magic != POSTING_FILE_MAGIC or version != POSTING_FILE_VERSION:
+            raise ValueError(f"'{path}' is not a version {POSTING_FILE_VERSION} posting file")
+
+        # The block table is a zero-copy view over the mapped file
+        self.__block_table = np.frombuffer(
+            self.__mmap, dtype=BLOCK_TABLE_DTYPE, count=block_count, offset=block_table_offset
+        )
+        self.__dictionary = self.__read_dictionary(dictionary_offset, term_count)
+        self.__document_ids = None
+        self.__document_lengths = None
+
+    def __read_dictionary(self, offset: int, term_count: int) -> dict[str, tuple]:
+        dictionary = {}
+        entry_size = struct.calcsize(TERM_ENTRY_FORMAT)
+        for _ in range(term_count):
+            (term_length,) = struct.unpack_from("<H", self.__mmap, offset)
+            offset += 2
+            term = self.__mmap[offset : offset + term_length].decode("utf-8")
+            offset += term_length
+            dictionary[term] = struct.unpack_from(TERM_ENTRY_FORMAT, self.__mmap, offset)
+            offset += entry_size
+
+        return dictionary
+
+    def __load_documents(self):
+        offset = self.__documents_offset
+        (ids_length,) = struct.unpack_from("<Q", self.__mmap, offset)
+        offset += 8
+        section_end = self.__documents_offset + self.__documents_length
+
+        self.__document_ids = decode_deltas(
+            decode_varints(self.__mmap[offset : offset + ids_length])
+        )
+        self.__document_lengths = decode_varints(self.__mmap[offset + ids_length : section_end])
+
+    def close(self):
+        # The mapping can only be closed once no array views over it remain
+        self.__block_table = None
+        self.__mmap.close()
+        self.__file.close()
+
+    def get_block_size(self) -> int:
+        return self.__block_size
+
+    def get_document_count(self) -> int:
+        return self.__document_count
+
+    def get_average_document_length(self) -> float:
+        return self.__average_document_length
+
+    def get_impact_parameters(self) -> tuple[float, float, int]:
+        return (self.__impact_k1, self.__impact_b, self.__impact_scale)
+
+    def get_term_count(self) -> int:
+        return len(self.__dictionary)
+
+    def get_posting_count(self) -> int:
+        return int(self.__block_table["posting_count"].sum())
+
+    def get_file_size(self) -> int:
+        return len(self.__mmap)
+
+    def get_document_ids(self) -> np.ndarray:
+        if self.__document_ids is None:
+            self.__load_documents()
+
+        return self.__document_ids
+
+    def get_document_lengths(self) -> np.ndarray:
+        if self.__document_lengths is None:
+            self.__load_documents()
+
+        return self.__document_lengths
+
+    def get_term_entry(self, term: str) -> tuple[int, float, int, int] | None:
+        # (document frequency, idf, first block, block count)
+        return self.__dictionary.get(term)
+
+    def get_terms(self) -> list[str]:
+        return list(self.__dictionary)
+
+    def get_block_table(self, first_block: int, block_count: int) -> np.ndarray:
+        return self.__block_table[first_block : first_block + block_count]
+
+    def decode_block(self, block: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        entry = self.__block_table[block]
+        data_offset = int(entry["data_offset"])
+        posting_count = int(entry["posting_count"])
+
+        values = decode_varints(self.__mmap[data_offset : data_offset + int(entry["data_length"])])
+        documents = decode_deltas(values[:posting_count], int(entry["first_document"]))
+        frequencies = values[posting_count : 2 * posting_count]
+        impacts = values[2 * posting_count : 3 * posting_count]
+        return documents, frequencies, impacts
@@ -0,0 +1,166 @@
+import os
+import struct
+import numpy as np
+
+from typing import Iterable, Iterator
+
+from backend.engine.utils import get_bm25_idf, get_bm25_impact
+from backend.index.postings.utils import (
+    BLOCK_TABLE_DTYPE,
+    HEADER_FORMAT,
+    POSTING_FILE_MAGIC,
+    POSTING_FILE_VERSION,
+    TERM_ENTRY_FORMAT,
+    encode_deltas,
+    encode_varints,
+)
+
+
+class PostingFileWriter:
+    def __init__(self, path: str, block_size: int = 128):
+        self.__path = path
+        self.__block_size = block_size
+
+    def __encode_documents(self, document_lengths: dict[int, int]) -> bytes:
+        document_ids = np.array(sorted(document_lengths), dtype=np.int64)
+        lengths = np.array([document_lengths[i] for i in document_ids], dtype=np.int64)
+        encoded_ids = encode_varints(encode_deltas(document_ids))
+        return struct.pack("<Q", len(encoded_ids)) + encoded_ids + encode_varints(lengths)
+
+    def write(
+        self,
+        inverted_index: dict[str, dict[int, int]],
+        document_lengths: dict[int, int],
+        impact_k1: float,
+        impact_b: float,
+        impact_scale: int,
+    ) -> int:
+        return self.write_terms(
+            self.__iterate_dictionary_terms(inverted_index),
+            document_lengths,
+            impact_k1,
+            impact_b,
+            impact_scale,
+        )
+
+    def __iterate_dictionary_terms(
+        self, inverted_index: dict[str, dict[int, int]]
+    ) -> Iterator[tuple[str, np.ndarray, np.ndarray]]:
+        for term in sorted(inverted_index):
+            postings = inverted_index[term]
+            documents = np.array(sorted(int(i) for i in postings), dtype=np.int64)
+            frequencies = np.array(
+                [postings[i] if i in postings else postings[str(i)] for i in documents],
+                dtype=np.int64,
+            )
+            yield term, documents, frequencies
+
+    def write_terms(
+        self,
+        term_postings: Iterable[tuple[str, np.ndarray, np.ndarray]],
+        document_lengths: dict[int, int],
+        impact_k1: float,
+        impact_b: float,
+        impact_scale: int,
+    ) -> int:
+        # Terms come sorted, each with its documents in ascending order and their frequencies
+        document_count = len(document_lengths)
+        average_document_length = (
+            sum(document_lengths.values()) / document_count if document_count > 0 else 0
+        )
+
+        header_size = struct.calcsize(HEADER_FORMAT)
+        documents_section = self.__encode_documents(document_lengths)
+        data_offset = header_size + len(documents_section)
+
+        # Written to a temporary file first so readers never map a partial index
+        temporary_path = f"{self.__path}.tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(b"\0" * header_size)
+            file.write(documents_section)
+
+            blocks = []
+            dictionary = bytearray()
+            term_count = 0
+            for term, documents, frequencies in term_postings:
+                term_count += 1
+                idf = get_bm25_idf(document_count, len(documents))
+                impacts = np.array(
+                    [
+                        get_bm25_impact(
+                            frequency,
+                            document_lengths[document],
+                            average_document_length,
+                            idf,
+                            impact_k1,
+                            impact_b,
+                            impact_scale,
+                        )
+                        for document, frequency in zip(documents.tolist(), frequencies.tolist())
+                    ],
+                    dtype=np.int64,
+                )
+
+                first_block = len(blocks)
+                for start in range(0, len(documents), self.__block_size):
+                    end = start + self.__block_size
+                    block_documents = documents[start:end]
+
+                    # Each block is delta encoded from its own first document, so it can
+                    # be decoded without touching any other block
+                    block_data = (
+                        encode_varints(encode_deltas(block_documents, block_documents[0]))
+                        + encode_varints(frequencies[start:end])
+                        + encode_varints(impacts[start:end])
+                    )
+                    blocks.append(
+                        (
+                            block_documents[0],
+                            block_documents[-1],
+                            data_offset,
+                            len(block_data),
+                            len(block_documents),
+                            impacts[start:end].max(),
+                        )
+                    )
+                    file.write(block_data)
+                    data_offset += len(block_data)
+
+                encoded_term = term.encode("utf-8")
+                dictionary += struct.pack("<H", len(encoded_term)) + encoded_term
+                dictionary += struct.pack(
+                    TERM_ENTRY_FORMAT, len(documents), idf, first_block, len(blocks) - first_block
+                )
+
+            block_table = np.array(blocks, dtype=BLOCK_TABLE_DTYPE).tobytes()
+            block_table_offset = data_offset
+            dictionary_offset = block_table_offset + len(block_table)
+            file.write(block_table)
+            file.write(dictionary)
+
+            file.seek(0)
+            file.write(
+                struct.pack(
+                    HEADER_FORMAT,
+                    POSTING_FILE_MAGIC,
+                    POSTING_FILE_VERSION,
+                    self.__block_size,
+                    document_count,
+                    term_count,
+                    average_document_length,
+                    impact_k1,
+                    impact_b,
+                    impact_scale,
+                    header_size,
+                    len(documents_section),
+                    block_table_offset,
+                    len(blocks),
+                    dictionary_offset,
+                    len(dictionary),
+                )
+            )
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(temporary_path, self.__path)
+        return dictionary_offset + len(dictionary)
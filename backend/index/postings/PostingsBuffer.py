@@ -0,0 +1,70 @@
+import numpy as np
+
+from array import array
+from typing import Iterator
+
+
+class PostingsBuffer:
+    def __init__(self):
+        # One slot per (term, document) pair in parallel arrays: a few bytes each
+        # instead of the dict entries and int objects of a dict of dicts
+        self.__term_ids = array("I")
+        self.__document_ids = array("I")
+        self.__frequencies = array("I")
+        # Positions of posting i end at position_ends[i] and start where i - 1 ended
+        self.__position_ends = array("Q")
+        self.__positions = array("I")
+
+    def add(
+        self,
+        term_id: int,
+        document_id: int,
+        frequency: int,
+        positions: list[int] | None = None,
+    ):
+        # Each (term, document) pair is expected once, postings are never overwritten
+        self.__term_ids.append(term_id)
+        self.__document_ids.append(document_id)
+        self.__frequencies.append(frequency)
+        if positions:
+            self.__positions.extend(positions)
+        self.__position_ends.append(len(self.__positions))
+
+    def get_posting_count(self) -> int:
+        return len(self.__term_ids)
+
+    def __get_columns(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return (
+            np.frombuffer(self.__term_ids, dtype=np.uint32),
+            np.frombuffer(self.__document_ids, dtype=np.uint32),
+            np.frombuffer(self.__frequencies, dtype=np.uint32),
+        )
+
+    def get_document_frequencies(self, term_count: int) -> np.ndarray:
+        term_ids, _, _ = self.__get_columns()
+        return np.bincount(term_ids, minlength=term_count)
+
+    def iterate_postings(self) -> Iterator[tuple[int, int, int, np.ndarray]]:
+        # Postings in the order they were added, with a view of their positions
+        positions = np.frombuffer(self.__positions, dtype=np.uint32)
+        position_start = 0
+        for term_id, document_id, frequency, position_end in zip(
+            self.__term_ids, self.__document_ids, self.__frequencies, self.__position_ends
+        ):
+            yield term_id, document_id, frequency, positions[position_start:position_end]
+            position_start = position_end
+
+    def iterate_terms(self, term_ranks: np.ndarray) -> Iterator[tuple[int, np.ndarray, np.ndarray]]:
+        # Postings grouped by term in rank order, each group sorted by document
+        term_ids, document_ids, frequencies = self.__get_columns()
+        if len(term_ids) == 0:
+            return
+
+        order = np.lexsort((document_ids, term_ranks[term_ids]))
+        sorted_term_ids = term_ids[order]
+        ends = np.append(np.flatnonzero(np.diff(sorted_term_ids)) + 1, len(order))
+        start = 0
+        for end in ends:
+            postings = order[start:end]
+            yield int(sorted_term_ids[start]), document_ids[postings], frequencies[postings]
+            start = end
@@ -0,0 +1,33 @@
+import numpy as np
+
+
+class Vocabulary:
+    def __init__(self):
+        # Terms are interned once, postings refer to them by dense IDs from 0
+        self.__term_ids: dict[str, int] = {}
+        self.__terms: list[str] = []
+
+    def get_term_id(self, term: str) -> int:
+        term_id = self.__term_ids.get(term)
+        if term_id is None:
+            term_id = len(self.__terms)
+            self.__term_ids[term] = term_id
+            self.__terms.append(term)
+        return term_id
+
+    def get_term(self, term_id: int) -> str:
+        return self.__terms[term_id]
+
+    def get_terms(self) -> list[str]:
+        return self.__terms
+
+    def get_size(self) -> int:
+        return len(self.__terms)
+
+    def get_sorted_term_ranks(self) -> np.ndarray:
+        # Rank of each term ID in lexicographic term order
+        ranks = np.empty(len(self.__terms), dtype=np.int64)
+        ranks[sorted(range(len(self.__terms)), key=self.__terms.__getitem__)] = np.arange(
+            len(self.__terms)
+        )
+        return ranks
@@ -0,0 +1,116 @@
+import sys
+
+sys.path.append("/root/cancer_patient_search_engine")
+
+import argparse
+import math
+import random
+import time
+import tracemalloc
+from itertools import accumulate
+from backend.index.postings.PostingsBuffer import PostingsBuffer
+from backend.index.postings.Vocabulary import Vocabulary
+
+
+def generate_vocabulary(term_count: int) -> list[str]:
+    random_generator = random.Random(0)
+    return [
+        "".join(random_generator.choice("abcdefghilmnoprstu") for _ in range(length)) + str(term_id)
+        for term_id, length in enumerate(random_generator.randint(3, 11) for _ in range(term_count))
+    ]
+
+
+def generate_documents(document_count: int, document_length: int, terms: list[str]):
+    # Zipf-like term distribution, each document as term -> positions
+    random_generator = random.Random(1)
+    cumulative_weights = list(accumulate(1 / rank for rank in range(1, len(terms) + 1)))
+    for document_id in range(1, document_count + 1):
+        term_positions = {}
+        tokens = random_generator.choices(terms, cum_weights=cumulative_weights, k=document_length)
+        for position, term in enumerate(tokens):
+            term_positions.setdefault(term, []).append(position)
+        yield document_id, term_positions
+
+
+def build_dictionaries(documents) -> tuple[dict, dict]:
+    # Previous DatabaseModel structures: term -> {document: frequency} and positions
+    inverted_index = {}
+    term_positions = {}
+    for document_id, document_terms in documents:
+        for term, positions in document_terms.items():
+            inverted_index.setdefault(term, {})[document_id] = len(positions)
+            term_positions.setdefault(term, {})[document_id] = positions
+    return inverted_index, term_positions
+
+
+def build_buffer(documents) -> tuple[Vocabulary, PostingsBuffer]:
+    vocabulary = Vocabulary()
+    postings = PostingsBuffer()
+    for document_id, document_terms in documents:
+        for term, positions in document_terms.items():
+            postings.add(vocabulary.get_term_id(term), document_id, len(positions), positions)
+    return vocabulary, postings
+
+
+def measure(name: str, build, get_documents, posting_count: int):
+    tracemalloc.start()
+    start = time.perf_counter()
+    # Documents are generated one at a time, like batches arriving from the workers
+    result = build(get_documents())
+    elapsed_time = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"  {name:<12} {elapsed_time:>7.2f} s {retained / 1024 / 1024:>9.1f} MB retained "
+        f"{peak / 1024 / 1024:>9.1f} MB peak {retained / posting_count:>8.1f} bytes per posting"
+    )
+    return result
+
+
+def get_number_size(value: int) -> int:
+    # Oracle NUMBER: length byte, exponent byte and a byte per two digits
+    return 2 + math.ceil(len(str(value)) / 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Memory of dict-of-dicts and array-backed postings built during indexing"
+    )
+    parser.add_argument("--documents", type=int, default=5000, help="Documents to index")
+    parser.add_argument("--document-length", type=int, default=300, help="Tokens per document")
+    parser.add_argument("--terms", type=int, default=50000, help="Vocabulary size")
+    args = parser.parse_args()
+
+    terms = generate_vocabulary(args.terms)
+    get_documents = lambda: generate_documents(args.documents, args.document_length, terms)
+    posting_count = sum(len(document_terms) for _, document_terms in get_documents())
+    print(f"{args.documents} documents, {posting_count} postings")
+
+    inverted_index, _ = measure("dictionaries", build_dictionaries, get_documents, posting_count)
+    measure("arrays", build_buffer, get_documents, posting_count)
+
+    # APPEARS key bytes per row, DOCUMENT_ID with a term string or with TERM_ID
+    document_id_size = get_number_size(args.documents)
+    term_size = (
+        sum(
+            (1 + len(term.encode("utf-8"))) * len(postings)
+            for term, postings in inverted_index.items()
+        )
+        / posting_count
+    )
+    term_id_size = (
+        sum(
+            get_number_size(term_id + 1) * len(postings)
+            for term_id, postings in enumerate(inverted_index.values())
+        )
+        / posting_count
+    )
+    print(
+        f"  APPEARS key estimate: {document_id_size + term_size:.1f} bytes with TERM, "
+        f"{document_id_size + term_id_size:.1f} bytes with TERM_ID"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import sys
+
+sys.path.append("/root/cancer_patient_search_engine")
+
+import argparse
+from backend.index.database.DatabaseModel import DatabaseModel
+from backend.index.postings.PostingFileReader import PostingFileReader
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the compressed posting file against the APPEARS table"
+    )
+    parser.add_argument("path", help="Path of the posting file written by the indexer")
+    parser.add_argument("--skip-database", action="store_true", help="Only report the posting file")
+    args = parser.parse_args()
+
+    reader = PostingFileReader(args.path)
+    file_size = reader.get_file_size()
+    posting_count = reader.get_posting_count()
+
+    print("Documents:", reader.get_document_count())
+    print("Terms:", reader.get_term_count())
+    print("Postings:", posting_count)
+    print("Posting file size:", file_size, "bytes")
+    if posting_count > 0:
+        print(f"Bytes per posting: {file_size / posting_count:.2f}")
+
+    if args.skip_database:
+        return
+
+    model = DatabaseModel()
+    appearances_count = model.get_appearances_count()
+    appearances_size = model.get_appearances_size()
+
+    print("APPEARS rows:", appearances_count)
+    print("APPEARS size (table and indexes):", appearances_size, "bytes")
+    if appearances_count > 0:
+        print(f"APPEARS bytes per row: {appearances_size / appearances_count:.2f}")
+    if file_size > 0:
+        print(f"Compression ratio: {appearances_size / file_size:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
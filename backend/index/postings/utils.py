@@ -0,0 +1,74 @@
+import numpy as np
+
+
+def encode_varints(values: np.ndarray) -> bytes:
+    # LEB128: 7 bits per byte, high bit set on every byte except the last one
+    values = np.asarray(values, dtype=np.uint64)
+    if len(values) == 0:
+        return b""
+
+    byte_counts = np.ones(len(values), dtype=np.int64)
+    remaining = values >> np.uint64(7)
+    while np.any(remaining):
+        byte_counts += remaining > 0
+        remaining >>= np.uint64(7)
+
+    ends = np.cumsum(byte_counts)
+    starts = ends - byte_counts
+    encoded = np.empty(ends[-1], dtype=np.uint8)
+
+    remaining = values.copy()
+    for byte_index in range(int(byte_counts.max())):
+        has_byte = byte_counts > byte_index
+        is_last = byte_counts == byte_index + 1
+        low_bits = (remaining[has_byte] & np.uint64(0x7F)).astype(np.uint8)
+        encoded[starts[has_byte] + byte_index] = low_bits | np.where(
+            is_last[has_byte], 0, 0x80
+        ).astype(np.uint8)
+        remaining >>= np.uint64(7)
+
+    return encoded.tobytes()
+
+
+def decode_varints(data: bytes | memoryview) -> np.ndarray:
+    encoded = np.frombuffer(data, dtype=np.uint8)
+    if len(encoded) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    ends = np.flatnonzero(encoded < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    byte_counts = ends - starts + 1
+
+    values = np.zeros(len(ends), dtype=np.uint64)
+    for byte_index in range(int(byte_counts.max())):
+        has_byte = byte_counts > byte_index
+        low_bits = encoded[starts[has_byte] + byte_index] & 0x7F
+        values[has_byte] |= low_bits.astype(np.uint64) << np.uint64(7 * byte_index)
+
+    return values.astype(np.int64)
+
+
+def encode_deltas(values: np.ndarray, base: int = 0) -> np.ndarray:
+    values = np.asarray(values, dtype=np.int64)
+    return np.diff(values, prepend=base)
+
+
+def decode_deltas(deltas: np.ndarray, base: int = 0) -> np.ndarray:
+    return np.cumsum(deltas) + base
+
+
+# File layout: header, documents section, block data, block table, term dictionary
+POSTING_FILE_MAGIC = b"CPSPOST1"
+POSTING_FILE_VERSION = 1
+HEADER_FORMAT = "<8sIIQQdddQQQQQQQ"
+BLOCK_TABLE_DTYPE = np.dtype(
+    [
+        ("first_document", "<i8"),
+        ("last_document", "<i8"),
+        ("data_offset", "<u8"),
+        ("data_length", "<u4"),
+        ("posting_count", "<u4"),
+        ("max_impact", "<i8"),
+    ]
+)
+TERM_ENTRY_FORMAT = "<IdQI"
@@ -5,6 +5,8 @@ sys.path.append("/root/cancer_patient_search_engine")
 
 import asyncio
 from backend.index.utils import read_websites_csv
+from backend.index.scrapping.CrawlState import CrawlState
+from backend.index.scrapping.FaviconResolver import FaviconResolver
 from backend.index.scrapping.WebsiteScrapper import WebsiteScrapper
 from backend.engine.TermProcessor import TermProcessor
 from backend.index.Indexer import Indexer
@@ -12,22 +14,59 @@ from backend.index.extraction.PubMedExtractor import PubMedExtractor
 from backend.index.extraction.DOAJExtractor import DOAJExtractor
 from backend.index.extraction.ArXivExtractor import ArXivExtractor
 from backend.index.extraction.COREExtractor import COREExtractor
+from backend.index.extraction.PdfTextExtractor import PdfTextExtractor
+from backend.index.HttpClient import HttpClient
 from backend.index.database.DatabaseModel import DatabaseModel
+from backend.index.segments.SegmentedIndex import SegmentedIndex
 
 
 def main():
-    model = DatabaseModel()
-    termProcessor = TermProcessor()
+    model = DatabaseModel(
+        bulk_batch_size=int(os.getenv("BULK_BATCH_SIZE", 10000)),
+        bulk_session_count=int(os.getenv("BULK_SESSIONS", 1)),
+        stream_documents=os.getenv("STREAM_DOCUMENTS", "false").lower() == "true",
+    )
+    termProcessor = TermProcessor(
+        use_regex_tokenizer=os.getenv("REGEX_TOKENIZER", "false").lower() == "true",
+        stem_cache_path=os.getenv("STEM_CACHE_PATH"),
+    )
     debug_mode = False
     use_full_text = False
 
+    # Extractors share one pool, so PDF parsing is bounded across all sources
+    pdf_text_extractor = PdfTextExtractor(
+        max_workers=int(os.getenv("PDF_WORKERS", max(os.cpu_count() - 1, 1))),
+        timeout=float(os.getenv("PDF_TIMEOUT", 30)),
+        max_pages=int(os.getenv("PDF_MAX_PAGES", 50)),
+        max_bytes=int(os.getenv("PDF_MAX_BYTES", 20 * 1024 * 1024)),
+    )
+    http_client = HttpClient(
+        limit_per_host=int(os.getenv("HTTP_LIMIT_PER_HOST", 8)),
+        total_timeout=float(os.getenv("HTTP_TIMEOUT", 120)),
+    )
+    favicon_resolver = FaviconResolver(
+        http_client, cache_directory=os.getenv("FAVICON_CACHE_DIRECTORY")
+    )
+    extractor_options = {
+        "use_full_text": use_full_text,
+        "debug_mode": debug_mode,
+        "pdf_text_extractor": pdf_text_extractor,
+        "http_client": http_client,
+        "favicon_resolver": favicon_resolver,
+        "max_results": int(os.getenv("EXTRACTOR_MAX_RESULTS", 1000)),
+    }
+
     sources = [
-        ArXivExtractor(use_full_text=use_full_text, debug_mode=debug_mode),
-        PubMedExtractor(use_full_text=use_full_text, debug_mode=debug_mode),
-        COREExtractor(use_full_text=use_full_text, debug_mode=debug_mode),
-        DOAJExtractor(use_full_text=use_full_text, debug_mode=debug_mode),
+        ArXivExtractor(**extractor_options),
+        PubMedExtractor(**extractor_options),
+        COREExtractor(**extractor_options),
+        DOAJExtractor(**extractor_options),
     ]
 
+    # Stored validators let re-crawls skip pages that did not change
+    crawl_state_path = os.getenv("CRAWL_STATE_PATH")
+    crawl_state = CrawlState(crawl_state_path) if crawl_state_path else None
+
     websites_data = read_websites_csv(f"{os.getcwd()}/backend/index/websites_data.csv")
     for website_data in websites_data:
         sources.append(
@@ -35,6 +74,10 @@ def main():
                 website_data.get("url"),
                 website_data.get("name"),
                 debug_mode=debug_mode,
+                http_client=http_client,
+                worker_count=int(os.getenv("CRAWLER_WORKERS", 8)),
+                crawl_state=crawl_state,
+                favicon_resolver=favicon_resolver,
             )
         )
 
@@ -46,18 +89,41 @@ def main():
             ).lower()
             if answer == "y":
                 model.load_insertions_record()
-                use_dump_data = True
-                print("Reusing insertions record from .dumpdata file....")
+                # A finished run only needs its database phases, an interrupted one
+                # resumes indexing the documents it had not recorded
+                use_dump_data = model.is_insertions_record_complete()
+                if use_dump_data:
+                    print("Committing insertions record from .log file....")
+                else:
+                    print("Resuming indexing from insertions record in .log file....")
                 break
             elif answer == "n":
                 model.delete_insertions_record()
-                print("Removed .dumpdata file and generating new index")
+                print("Removed .log file and generating new index")
                 break
             else:
                 print("Unrecognized answer. Reuse available insertions record? [y/n]: ")
 
-    indexer = Indexer(model, termProcessor, sources)
-    asyncio.run(indexer.index(use_dump_data=use_dump_data))
+    posting_file_path = os.getenv("POSTING_FILE_PATH")
+    segment_directory = os.getenv("SEGMENT_DIRECTORY")
+    segmented_index = SegmentedIndex(segment_directory) if segment_directory else None
+    indexer = Indexer(
+        model,
+        termProcessor,
+        sources,
+        posting_file_path=posting_file_path,
+        segmented_index=segmented_index,
+        worker_count=int(os.getenv("INDEXER_WORKERS", 0)),
+        text_worker_count=int(os.getenv("INDEXER_TEXT_WORKERS", 16)),
+        queue_size=int(os.getenv("INDEXER_QUEUE_SIZE", 256)),
+        incremental=os.getenv("INCREMENTAL_INDEXING", "false").lower() == "true",
+    )
+    try:
+        asyncio.run(indexer.index(use_dump_data=use_dump_data))
+    finally:
+        pdf_text_extractor.close()
+        if crawl_state:
+            crawl_state.close()
 
 
 if __name__ == "__main__":
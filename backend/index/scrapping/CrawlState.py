@@ -0,0 +1,89 @@
+import json
+import sqlite3
+import time
+
+
+class CrawlState:
+    def __init__(self, path: str):
+        self.__connection = sqlite3.connect(path)
+        self.__connection.execute("""
+            CREATE TABLE IF NOT EXISTS PAGES (
+                URL TEXT PRIMARY KEY,
+                ETAG TEXT,
+                LAST_MODIFIED TEXT,
+                CONTENT_HASH TEXT,
+                CRAWLED_AT REAL,
+                TITLE TEXT,
+                SUMMARY TEXT,
+                OUTLINKS TEXT
+            )
+            """)
+        self.__connection.commit()
+
+    def get_page(self, url: str) -> dict | None:
+        row = self.__connection.execute(
+            "SELECT ETAG, LAST_MODIFIED, CONTENT_HASH, CRAWLED_AT, TITLE, SUMMARY, OUTLINKS "
+            "FROM PAGES WHERE URL = ?",
+            (url,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        etag, last_modified, content_hash, crawled_at, title, summary, outlinks = row
+        return {
+            "URL": url,
+            "ETAG": etag,
+            "LAST_MODIFIED": last_modified,
+            "CONTENT_HASH": content_hash,
+            "CRAWLED_AT": crawled_at,
+            "TITLE": title,
+            "SUMMARY": summary,
+            "OUTLINKS": json.loads(outlinks),
+        }
+
+    def save_page(
+        self,
+        url: str,
+        etag: str | None,
+        last_modified: str | None,
+        content_hash: str,
+        title: str | None,
+        summary: str | None,
+        outlinks: list[str],
+    ):
+        self.__connection.execute(
+            "INSERT OR REPLACE INTO PAGES "
+            "(URL, ETAG, LAST_MODIFIED, CONTENT_HASH, CRAWLED_AT, TITLE, SUMMARY, OUTLINKS) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                url,
+                etag,
+                last_modified,
+                content_hash,
+                time.time(),
+                title,
+                summary,
+                json.dumps(outlinks),
+            ),
+        )
+
+    def touch_page(self, url: str, etag: str | None, last_modified: str | None):
+        # Validators sent with a 304 replace the stored ones, missing ones are kept
+        self.__connection.execute(
+            "UPDATE PAGES SET ETAG = COALESCE(?, ETAG), "
+            "LAST_MODIFIED = COALESCE(?, LAST_MODIFIED), CRAWLED_AT = ? WHERE URL = ?",
+            (etag, last_modified, time.time(), url),
+        )
+
+    def delete_page(self, url: str):
+        self.__connection.execute("DELETE FROM PAGES WHERE URL = ?", (url,))
+
+    def get_page_count(self) -> int:
+        return self.__connection.execute("SELECT COUNT(*) FROM PAGES").fetchone()[0]
+
+    def commit(self):
+        self.__connection.commit()
+
+    def close(self):
+        self.__connection.commit()
+        self.__connection.close()
@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+from io import BytesIO
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+from PIL import Image, ImageOps
+from backend.index.DataSource import DataSource
+from backend.index.HttpClient import HttpClient
+
+
+class FaviconResolver:
+    def __init__(
+        self,
+        http_client: HttpClient,
+        cache_directory: str | None = None,
+        max_age: float = 7 * 24 * 3600,
+        icon_size: int = 32,
+        max_icon_bytes: int = 256 * 1024,
+    ):
+        self.__http_client = http_client
+        self.__cache_directory = cache_directory
+        self.__max_age = max_age
+        self.__icon_size = icon_size
+        self.__max_icon_bytes = max_icon_bytes
+        self.__pending: dict[str, asyncio.Task] = {}
+
+        if cache_directory:
+            os.makedirs(os.path.join(cache_directory, "sites"), exist_ok=True)
+            os.makedirs(os.path.join(cache_directory, "icons"), exist_ok=True)
+
+    def __get_entry_path(self, url: str) -> str:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.__cache_directory, "sites", f"{key}.json")
+
+    def __get_icon_path(self, icon_hash: str) -> str:
+        return os.path.join(self.__cache_directory, "icons", icon_hash)
+
+    def __read_cache(self, url: str) -> tuple[bool, bytes | None]:
+        if not self.__cache_directory:
+            return False, None
+
+        try:
+            with open(self.__get_entry_path(url), "r") as file:
+                entry = json.load(file)
+            if time.time() - entry["fetched_at"] > self.__max_age:
+                return False, None
+
+            # Sites without an icon are cached too, so they are not asked again
+            if entry["icon_hash"] is None:
+                return True, None
+
+            with open(self.__get_icon_path(entry["icon_hash"]), "rb") as file:
+                return True, file.read()
+        except (OSError, ValueError, KeyError):
+            return False, None
+
+    def __write_file(self, path: str, data: bytes):
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(data)
+        os.replace(temporary_path, path)
+
+    def __write_cache(self, url: str, icon: bytes | None):
+        if not self.__cache_directory:
+            return
+
+        # Icons are stored by content hash, sites sharing an icon share its file
+        icon_hash = hashlib.sha256(icon).hexdigest() if icon else None
+        if icon_hash and not os.path.exists(self.__get_icon_path(icon_hash)):
+            self.__write_file(self.__get_icon_path(icon_hash), icon)
+
+        entry = {"url": url, "icon_hash": icon_hash, "fetched_at": time.time()}
+        self.__write_file(self.__get_entry_path(url), json.dumps(entry).encode("utf-8"))
+
+    def __normalize_icon(self, icon: bytes) -> bytes | None:
+        # Every icon becomes a square PNG of icon_size pixels, the largest frame of an
+        # ICO file is used. Icons that are not square are centered on a transparent
+        # background
+        try:
+            with Image.open(BytesIO(icon)) as image:
+                image = ImageOps.pad(
+                    image.convert("RGBA"),
+                    (self.__icon_size, self.__icon_size),
+                    method=Image.LANCZOS,
+                    color=(0, 0, 0, 0),
+                )
+                with BytesIO() as output:
+                    image.save(output, format="PNG", optimize=True)
+                    return output.getvalue()
+        except Exception:
+            # Formats Pillow cannot read, like SVG, are kept when they are small
+            return icon if len(icon) <= self.__max_icon_bytes else None
+
+    async def __download(self, url: str) -> tuple[int, bytes]:
+        headers = {"User-Agent": DataSource.agent}
+        async with self.__http_client.get(url, headers=headers) as response:
+            if response.status != 200:
+                return response.status, b""
+            return response.status, await response.read()
+
+    async def __fetch_icon(self, url: str) -> bytes | None:
+        status, html = await self.__download(url)
+        if status != 200:
+            raise ValueError(f"site answered with status {status}")
+
+        # Search in link tags
+        soup = BeautifulSoup(html, "html.parser")
+        icon_url = None
+        for link in soup.find_all("link", rel=["icon", "shortcut icon"]):
+            icon_url = link.get("href")
+            if icon_url:
+                break
+
+        # Default icon if not found
+        icon_url = urljoin(url, icon_url) if icon_url else urljoin(url, "/favicon.ico")
+
+        status, icon = await self.__download(icon_url)
+        if status != 200 or not icon:
+            return None
+
+        # Decoding and resizing is CPU work, it is kept off the event loop
+        return await asyncio.to_thread(self.__normalize_icon, icon)
+
+    async def __resolve(self, url: str) -> bytes | None:
+        is_cached, icon = self.__read_cache(url)
+        if is_cached:
+            return icon
+
+        # Failures reaching the site are not cached, the next run tries again
+        try:
+            icon = await self.__fetch_icon(url)
+        except Exception:
+            return None
+
+        self.__write_cache(url, icon)
+        return icon
+
+    async def resolve(self, url: str) -> bytes | None:
+        # Sources on the same site wait for a single download
+        task = self.__pending.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self.__resolve(url))
+            task.add_done_callback(lambda _: self.__pending.pop(url, None))
+            self.__pending[url] = task
+
+        return await asyncio.shield(task)
@@ -1,15 +1,17 @@
 import asyncio
+import hashlib
 import inspect
 import re
-import aiohttp
 
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urldefrag, urljoin, urlparse
 from backend.documentTypes import DocumentType
 from backend.index.DataSource import DataSource
+from backend.index.HttpClient import HttpClient
 from backend.index.database.entities.Document import Document
 from backend.index.database.entities.Source import Source
-from backend.index.scrapping.utils import get_favicon
+from backend.index.scrapping.CrawlState import CrawlState
+from backend.index.scrapping.FaviconResolver import FaviconResolver
 
 
 class WebsiteScrapper(DataSource):
@@ -20,20 +22,32 @@ class WebsiteScrapper(DataSource):
         max_depth: int = 5,
         scrapping_delay=1,
         debug_mode=False,
+        http_client: HttpClient | None = None,
+        worker_count: int = 8,
+        crawl_state: CrawlState | None = None,
+        favicon_resolver: FaviconResolver | None = None,
     ):
+        super().__init__(http_client=http_client)
+        self.__favicon_resolver = (
+            favicon_resolver if favicon_resolver else FaviconResolver(self._http_client)
+        )
         self.__base_url = base_url
         self.__debug_mode = debug_mode
         self.__max_depth = max_depth
         self.__source_name = source_name
         self.__scrapping_delay = scrapping_delay
+        self.__worker_count = worker_count
+        self.__crawl_state = crawl_state
         self.__visited_links = set()
-        self.__visited_links_lock = asyncio.Lock()
+        self.__next_request_times: dict[str, float] = {}
+        self.__crawl_statistics = {}
+        self.__removed_urls: list[str] = []
 
     async def get_source_data(self) -> Source:
         source = Source(
             source_name=self.__source_name,
             base_url=self.__base_url,
-            icon=get_favicon(self.__base_url),
+            icon=await self.__favicon_resolver.resolve(self.__base_url),
         )
         return source
 
@@ -43,53 +57,138 @@ class WebsiteScrapper(DataSource):
     async def get_document_text(self, document_data: Document) -> str:
         return document_data.get_summary()
 
-    async def __get_all_subsites_data_recursive(
-        self, url: str, source_id: int, depth: int = 0
-    ) -> set[Document]:
-        if depth >= self.__max_depth:
-            return set()
-
-        async with self.__visited_links_lock:
-            if url in self.__visited_links:
-                return set()
+    def __is_in_scope(self, url: str) -> bool:
+        parsed_url = urlparse(url)
+        return parsed_url.scheme in ("http", "https") and url.startswith(self.__base_url)
+
+    def __get_outlinks(self, url: str, soup: BeautifulSoup) -> list[str]:
+        outlinks = []
+        for a_tag in soup.find_all("a", href=True):
+            # Absolute URL without fragment, so anchors of a page do not refetch it
+            full_url, _ = urldefrag(urljoin(url, a_tag["href"]))
+            if self.__is_in_scope(full_url):
+                outlinks.append(full_url)
+
+        return outlinks
+
+    async def __wait_for_host(self, url: str):
+        # Requests to the same host are spaced by the scrapping delay, while other
+        # hosts and pages already downloaded keep the workers busy
+        host = urlparse(url).netloc
+        now = asyncio.get_running_loop().time()
+        request_time = max(now, self.__next_request_times.get(host, now))
+        self.__next_request_times[host] = request_time + self.__scrapping_delay
+        await asyncio.sleep(request_time - now)
+
+    def __enqueue(self, frontier: asyncio.Queue, url: str, depth: int):
+        if depth > self.__max_depth or url in self.__visited_links:
+            return
 
-            self.__visited_links.add(url)
+        self.__visited_links.add(url)
+        frontier.put_nowait((url, depth))
 
-        soup = await self.__get_site_soup(url)
+    async def __crawl_page(
+        self,
+        frontier: asyncio.Queue,
+        documents: list[Document],
+        url: str,
+        depth: int,
+        source_id: int,
+    ):
+        page = self.__crawl_state.get_page(url) if self.__crawl_state else None
 
-        if soup is None:
-            return set()
+        await self.__wait_for_host(url)
+        site = await self.__fetch_site(url, page)
+        if site is None:
+            self.__crawl_statistics["FAILED"] += 1
+            return
 
-        try:
-            subsites_data = set[Document]()
-            for a_tag in soup.find_all("a", href=True):
-                href = a_tag["href"]
-                full_url = urljoin(url, href)  # Convert to absolute
-                subsite_data = await self.__get_site_data(full_url, source_id)
-
-                if subsite_data is not None:
-                    subsites_data.add(subsite_data)
-
-            all_subsites_data = subsites_data.copy()
-            for document in subsites_data:
-                await asyncio.sleep(self.__scrapping_delay)  # Usamos asyncio.sleep
-                all_subsites_data.update(
-                    await self.__get_all_subsites_data_recursive(
-                        document.get_document_url(), source_id, depth + 1
-                    )
+        status, html, etag, last_modified = site
+        content_hash = hashlib.sha256(html.encode("utf-8")).hexdigest() if html else None
+        if page is not None and (status == 304 or content_hash == page["CONTENT_HASH"]):
+            # Unchanged pages are not parsed again, their stored document and
+            # outlinks are reused
+            self.__crawl_statistics["UNCHANGED"] += 1
+            self.__crawl_state.touch_page(url, etag, last_modified)
+            outlinks = page["OUTLINKS"]
+            document = self.__get_stored_site_data(page, url, source_id)
+        elif status == 200:
+            self.__crawl_statistics["CHANGED" if page else "NEW"] += 1
+
+            # Outlinks and the document come from the same parse of the page
+            soup = BeautifulSoup(html, "html.parser")
+            outlinks = self.__get_outlinks(url, soup)
+            document = self.__get_site_data(soup, url, source_id)
+            if self.__crawl_state:
+                self.__crawl_state.save_page(
+                    url,
+                    etag,
+                    last_modified,
+                    content_hash,
+                    document.get_title() if document else None,
+                    document.get_summary() if document else None,
+                    outlinks,
                 )
+        else:
+            self.__crawl_statistics["FAILED"] += 1
+            if status in (404, 410):
+                self.__removed_urls.append(url)
+                if self.__crawl_state:
+                    self.__crawl_state.delete_page(url)
+            return
 
-            return all_subsites_data
+        for outlink in outlinks:
+            self.__enqueue(frontier, outlink, depth + 1)
 
-        except aiohttp.ClientError as e:
-            self.__log_scrapper_error(url, e)
-            return set()
+        if document is not None:
+            documents.append(document)
 
-    async def get_document_collection_data(self, source_id: int) -> set[Document]:
+    async def __crawl_worker(
+        self, frontier: asyncio.Queue, documents: list[Document], source_id: int
+    ):
+        while True:
+            url, depth = await frontier.get()
+            try:
+                await self.__crawl_page(frontier, documents, url, depth, source_id)
+            except Exception as e:
+                self.__log_scrapper_error(url, e)
+            finally:
+                frontier.task_done()
+
+    async def get_document_collection_data(self, source_id: int) -> list[Document]:
         self.__visited_links = set()
-        return await self.__get_all_subsites_data_recursive(
-            self.__base_url, source_id, depth=0
-        )
+        self.__next_request_times = {}
+        self.__crawl_statistics = {"NEW": 0, "CHANGED": 0, "UNCHANGED": 0, "FAILED": 0}
+        self.__removed_urls = []
+        documents: list[Document] = []
+
+        # Breadth-first crawl, every URL is queued and fetched at most once
+        frontier = asyncio.Queue()
+        self.__enqueue(frontier, self.__base_url, 0)
+        workers = [
+            asyncio.create_task(self.__crawl_worker(frontier, documents, source_id))
+            for _ in range(self.__worker_count)
+        ]
+
+        try:
+            await frontier.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+            if self.__crawl_state:
+                self.__crawl_state.commit()
+
+        print(f"Crawled source {self.__source_name}:", self.__crawl_statistics)
+        # Pages finish in any order, the indexer numbers documents in listing order
+        return sorted(documents, key=lambda document: document.get_document_url())
+
+    def get_crawl_statistics(self) -> dict[str, int]:
+        return self.__crawl_statistics
+
+    def get_removed_document_urls(self) -> list[str]:
+        return self.__removed_urls
 
     def __log_scrapper_error(self, url: str, message: str):
         if not self.__debug_mode:
@@ -104,7 +203,9 @@ class WebsiteScrapper(DataSource):
             message,
         )
 
-    async def __get_site_soup(self, url: str) -> BeautifulSoup:
+    async def __fetch_site(
+        self, url: str, page: dict | None = None
+    ) -> tuple[int, str | None, str | None, str | None] | None:
         if not url:
             self.__log_scrapper_error(url, "empty url provided")
             return None
@@ -125,18 +226,29 @@ class WebsiteScrapper(DataSource):
             "Connection": "keep-alive",
         }
 
+        # Conditional request, the server answers 304 when the page did not change
+        if page is not None:
+            if page["ETAG"]:
+                headers["If-None-Match"] = page["ETAG"]
+            if page["LAST_MODIFIED"]:
+                headers["If-Modified-Since"] = page["LAST_MODIFIED"]
+
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        html = await response.text()
-                        return BeautifulSoup(html, "html.parser")
-                    else:
-                        self.__log_scrapper_error(
-                            url,
-                            f"failed to retrieve page with status {response.status}",
-                        )
-                        return None
+            session = self._http_client.get_session()
+            async with session.get(url, headers=headers) as response:
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+                if response.status == 200:
+                    html = await response.text()
+                    return response.status, html, etag, last_modified
+                elif response.status == 304:
+                    return response.status, None, etag, last_modified
+                else:
+                    self.__log_scrapper_error(
+                        url,
+                        f"failed to retrieve page with status {response.status}",
+                    )
+                    return response.status, None, None, None
         except Exception as e:
             self.__log_scrapper_error(url, e)
             return None
@@ -172,25 +284,22 @@ class WebsiteScrapper(DataSource):
 
         return None
 
-    async def __get_site_data(self, url: str, source_id: int) -> Document | None:
-        async with self.__visited_links_lock:
-            if url in self.__visited_links:
-                return None
-
-            self.__visited_links.add(url)
-
-        soup = await self.__get_site_soup(url)
-
-        if soup == None:
+    def __get_stored_site_data(self, page: dict, url: str, source_id: int) -> Document | None:
+        if page["TITLE"] is None:
             return None
 
+        return Document(
+            title=page["TITLE"],
+            summary=page["SUMMARY"],
+            document_type=DocumentType.WEBSITE,
+            document_url=url,
+            source_id=source_id,
+        )
+
+    def __get_site_data(self, soup: BeautifulSoup, url: str, source_id: int) -> Document | None:
         site_text = self.__get_site_text(soup)
         title_tag = soup.find("title") or soup.find("h1")
-        title = (
-            None
-            if title_tag == None
-            else self.__sanitize_document_title(title_tag.get_text())
-        )
+        title = None if title_tag == None else self.__sanitize_document_title(title_tag.get_text())
 
         if title == None or site_text == "":
             return None
@@ -0,0 +1,48 @@
+import numpy as np
+
+from backend.index.postings.PostingFileReader import PostingFileReader
+
+
+class Segment:
+    def __init__(self, name: str, reader: PostingFileReader, deleted_documents: list[int]):
+        self.__name = name
+        self.__reader = reader
+        self.__deleted_documents = np.unique(np.array(deleted_documents, dtype=np.int64))
+
+        document_ids = reader.get_document_ids()
+        self.__is_live = ~np.isin(document_ids, self.__deleted_documents)
+        self.__live_document_count = int(self.__is_live.sum())
+        self.__live_document_length = int(reader.get_document_lengths()[self.__is_live].sum())
+
+    def get_name(self) -> str:
+        return self.__name
+
+    def get_reader(self) -> PostingFileReader:
+        return self.__reader
+
+    def get_deleted_documents(self) -> np.ndarray:
+        return self.__deleted_documents
+
+    def get_document_count(self) -> int:
+        # Deleted documents included, they still count in document frequencies
+        return self.__reader.get_document_count()
+
+    def get_live_document_count(self) -> int:
+        return self.__live_document_count
+
+    def get_live_document_length(self) -> int:
+        # Sum of the lengths of live documents
+        return self.__live_document_length
+
+    def get_live_document_ids(self) -> np.ndarray:
+        return self.__reader.get_document_ids()[self.__is_live]
+
+    def get_live_document_lengths(self) -> np.ndarray:
+        return self.__reader.get_document_lengths()[self.__is_live]
+
+    def get_posting_count(self) -> int:
+        return self.__reader.get_posting_count()
+
+    def get_deleted_ratio(self) -> float:
+        document_count = self.get_document_count()
+        return 1 - self.get_live_document_count() / document_count if document_count else 0
@@ -0,0 +1,31 @@
+import time
+
+from threading import Thread
+from backend.index.segments.SegmentedIndex import SegmentedIndex
+
+
+class SegmentMerger:
+    def __init__(self, index: SegmentedIndex, merge_interval: float = 60):
+        self.__index = index
+        self.__merge_interval = merge_interval
+
+    def __merge_periodically(self):
+        while True:
+            time.sleep(self.__merge_interval)
+            try:
+                merge_count = self.__index.maybe_merge()
+            except OSError as e:
+                print("Segment merge failed:", e)
+                continue
+
+            if merge_count > 0:
+                print(
+                    "Merged segments.",
+                    len(self.__index.get_segments()),
+                    "segments remaining",
+                )
+
+    def start(self):
+        merger_thread = Thread(target=self.__merge_periodically)
+        merger_thread.daemon = True
+        merger_thread.start()
@@ -0,0 +1,231 @@
+import fcntl
+import json
+import os
+import uuid
+import numpy as np
+
+from contextlib import contextmanager
+from threading import Lock
+from backend.index.postings.PostingFileReader import PostingFileReader
+from backend.index.postings.PostingFileWriter import PostingFileWriter
+from backend.index.segments.Segment import Segment
+from backend.index.segments.TieredMergePolicy import TieredMergePolicy
+
+
+class SegmentedIndex:
+    manifest_file_name = "segments.json"
+    lock_file_name = "segments.lock"
+
+    def __init__(
+        self,
+        directory: str,
+        merge_policy: TieredMergePolicy | None = None,
+        block_size: int = 128,
+    ):
+        self.__directory = directory
+        self.__merge_policy = merge_policy if merge_policy else TieredMergePolicy()
+        self.__block_size = block_size
+        self.__manifest_path = os.path.join(directory, SegmentedIndex.manifest_file_name)
+        self.__lock_path = os.path.join(directory, SegmentedIndex.lock_file_name)
+        self.__thread_lock = Lock()
+        self.__readers: dict[str, PostingFileReader] = {}
+        self.__segments: list[Segment] = []
+        self.__live_document_count = 0
+        self.__live_document_length = 0
+        self.__generation = -1
+
+        os.makedirs(directory, exist_ok=True)
+        self.refresh()
+
+    @contextmanager
+    def __manifest_lock(self):
+        # Indexer and server processes both update the manifest
+        with self.__thread_lock, open(self.__lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def __read_manifest(self) -> dict:
+        if not os.path.exists(self.__manifest_path):
+            return {"generation": 0, "segments": []}
+
+        with open(self.__manifest_path, "r") as file:
+            return json.load(file)
+
+    def __write_manifest(self, manifest: dict):
+        manifest["generation"] += 1
+        temporary_path = f"{self.__manifest_path}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(manifest, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, self.__manifest_path)
+
+    def __get_reader(self, name: str) -> PostingFileReader:
+        if name not in self.__readers:
+            self.__readers[name] = PostingFileReader(os.path.join(self.__directory, name))
+
+        return self.__readers[name]
+
+    def __load_segments(self, manifest: dict):
+        self.__segments = [
+            Segment(entry["name"], self.__get_reader(entry["name"]), entry["deleted_documents"])
+            for entry in manifest["segments"]
+        ]
+        # Totals are kept per manifest generation, queries do not sum every document
+        self.__live_document_count = sum(
+            segment.get_live_document_count() for segment in self.__segments
+        )
+        self.__live_document_length = sum(
+            segment.get_live_document_length() for segment in self.__segments
+        )
+
+        # Readers of merged segments are released, queries still holding them keep
+        # their mapping valid until they finish
+        names = {entry["name"] for entry in manifest["segments"]}
+        self.__readers = {name: reader for name, reader in self.__readers.items() if name in names}
+        self.__generation = manifest["generation"]
+
+    def refresh(self) -> bool:
+        with self.__thread_lock:
+            manifest = self.__read_manifest()
+            if manifest["generation"] == self.__generation:
+                return False
+
+            self.__load_segments(manifest)
+            return True
+
+    def get_generation(self) -> int:
+        return self.__generation
+
+    def get_segments(self) -> list[Segment]:
+        return self.__segments
+
+    def get_live_document_count(self) -> int:
+        return self.__live_document_count
+
+    def get_live_document_length(self) -> int:
+        return self.__live_document_length
+
+    def new_segment_path(self) -> str:
+        return os.path.join(self.__directory, f"segment_{uuid.uuid4().hex}.postings")
+
+    def add_segment(self, path: str, replace: bool = False):
+        # Replacing drops every older segment, for a segment that holds the whole corpus
+        name = os.path.basename(path)
+
+        with self.__manifest_lock():
+            manifest = self.__read_manifest()
+            if replace:
+                replaced_names = [entry["name"] for entry in manifest["segments"]]
+                manifest["segments"] = [{"name": name, "deleted_documents": []}]
+                self.__write_manifest(manifest)
+                self.__load_segments(manifest)
+                for replaced_name in replaced_names:
+                    os.remove(os.path.join(self.__directory, replaced_name))
+                return
+
+            document_ids = self.__get_reader(name).get_document_ids()
+
+            # A document indexed again replaces the copies held by older segments
+            for entry in manifest["segments"]:
+                older_ids = self.__get_reader(entry["name"]).get_document_ids()
+                replaced = older_ids[np.isin(older_ids, document_ids)]
+                entry["deleted_documents"] = sorted(
+                    set(entry["deleted_documents"]) | set(replaced.tolist())
+                )
+
+            manifest["segments"].append({"name": name, "deleted_documents": []})
+            self.__write_manifest(manifest)
+            self.__load_segments(manifest)
+
+    def delete_documents(self, document_ids: list[int]):
+        document_ids = np.array(document_ids, dtype=np.int64)
+
+        with self.__manifest_lock():
+            manifest = self.__read_manifest()
+            for entry in manifest["segments"]:
+                segment_ids = self.__get_reader(entry["name"]).get_document_ids()
+                deleted = segment_ids[np.isin(segment_ids, document_ids)]
+                entry["deleted_documents"] = sorted(
+                    set(entry["deleted_documents"]) | set(deleted.tolist())
+                )
+
+            self.__write_manifest(manifest)
+            self.__load_segments(manifest)
+
+    def __write_merged_segment(self, segments: list[Segment]) -> str:
+        inverted_index: dict[str, dict[int, int]] = {}
+        document_lengths: dict[int, int] = {}
+
+        for segment in segments:
+            reader = segment.get_reader()
+            deleted_documents = segment.get_deleted_documents()
+            document_lengths.update(
+                zip(
+                    segment.get_live_document_ids().tolist(),
+                    segment.get_live_document_lengths().tolist(),
+                )
+            )
+
+            for term in reader.get_terms():
+                _, _, first_block, block_count = reader.get_term_entry(term)
+                postings = inverted_index.setdefault(term, {})
+                for block in range(first_block, first_block + block_count):
+                    documents, frequencies, _ = reader.decode_block(block)
+                    is_live = ~np.isin(documents, deleted_documents)
+                    postings.update(zip(documents[is_live].tolist(), frequencies[is_live].tolist()))
+
+        # Terms only present in deleted documents disappear with them
+        inverted_index = {term: postings for term, postings in inverted_index.items() if postings}
+
+        impact_k1, impact_b, impact_scale = segments[0].get_reader().get_impact_parameters()
+        path = self.new_segment_path()
+        PostingFileWriter(path, block_size=self.__block_size).write(
+            inverted_index, document_lengths, impact_k1, impact_b, impact_scale
+        )
+        return path
+
+    def merge(self, segments: list[Segment]):
+        path = self.__write_merged_segment(segments)
+        merged = {
+            segment.get_name(): set(segment.get_deleted_documents().tolist())
+            for segment in segments
+        }
+
+        with self.__manifest_lock():
+            manifest = self.__read_manifest()
+            entries = {entry["name"]: entry for entry in manifest["segments"]}
+
+            # Another merge already replaced one of the inputs
+            if any(name not in entries for name in merged):
+                os.remove(path)
+                return
+
+            # Deletions registered while merging apply to the new segment
+            deleted_documents = set()
+            for name, merged_deletions in merged.items():
+                deleted_documents |= set(entries[name]["deleted_documents"]) - merged_deletions
+
+            position = manifest["segments"].index(entries[next(iter(merged))])
+            remaining = [entry for entry in manifest["segments"] if entry["name"] not in merged]
+            remaining.insert(
+                min(position, len(remaining)),
+                {"name": os.path.basename(path), "deleted_documents": sorted(deleted_documents)},
+            )
+            manifest["segments"] = remaining
+            self.__write_manifest(manifest)
+            self.__load_segments(manifest)
+
+        for name in merged:
+            os.remove(os.path.join(self.__directory, name))
+
+    def maybe_merge(self) -> int:
+        self.refresh()
+        merges = self.__merge_policy.find_merges(self.__segments)
+        for segments in merges:
+            self.merge(segments)
+
+        return len(merges)
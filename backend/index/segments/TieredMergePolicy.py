@@ -0,0 +1,46 @@
+import math
+
+from backend.index.segments.Segment import Segment
+
+
+class TieredMergePolicy:
+    def __init__(
+        self,
+        segments_per_tier: int = 10,
+        min_tier_postings: int = 10000,
+        max_deleted_ratio: float = 0.3,
+    ):
+        self.__segments_per_tier = segments_per_tier
+        self.__min_tier_postings = min_tier_postings
+        self.__max_deleted_ratio = max_deleted_ratio
+
+    def __get_tier(self, segment: Segment) -> int:
+        # Segments below the minimum size share the first tier, every following
+        # tier holds segments segments_per_tier times larger than the previous one
+        postings = max(segment.get_posting_count(), self.__min_tier_postings)
+        return int(math.log(postings / self.__min_tier_postings, self.__segments_per_tier))
+
+    def find_merges(self, segments: list[Segment]) -> list[list[Segment]]:
+        tiers: dict[int, list[Segment]] = {}
+        for segment in segments:
+            tiers.setdefault(self.__get_tier(segment), []).append(segment)
+
+        merges = []
+        merged_names = set()
+        for tier in sorted(tiers):
+            tier_segments = tiers[tier]
+            while len(tier_segments) >= self.__segments_per_tier:
+                merge = tier_segments[: self.__segments_per_tier]
+                tier_segments = tier_segments[self.__segments_per_tier :]
+                merges.append(merge)
+                merged_names.update(segment.get_name() for segment in merge)
+
+        # Segments with many deletions are rewritten on their own to reclaim space
+        for segment in segments:
+            if (
+                segment.get_name() not in merged_names
+                and segment.get_deleted_ratio() > self.__max_deleted_ratio
+            ):
+                merges.append([segment])
+
+        return merges
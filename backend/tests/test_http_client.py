@@ -0,0 +1,139 @@
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from backend.index.HttpClient import HttpClient
+from backend.index.extraction.Extractor import Extractor
+from backend.index.extraction.RateLimiter import RateLimiter
+
+
+class FixtureExtractor(Extractor):
+    async def _iterate_document_pages(self, source_id: int):
+        yield []
+
+    async def get_document_text(self, document_data) -> str:
+        return ""
+
+
+class FixtureServer:
+    # Answers each path with its statuses in turn, then 200, and records arrival times
+    def __init__(self, responses: dict[str, list[tuple[int, dict]]]):
+        self.__responses = responses
+        self.arrival_times: dict[str, list[float]] = {path: [] for path in responses}
+        application = web.Application()
+        application.router.add_get("/{path}", self.__handle)
+        self.server = TestServer(application)
+
+    async def __handle(self, request: web.Request) -> web.Response:
+        path = request.match_info["path"]
+        self.arrival_times[path].append(asyncio.get_running_loop().time())
+        if self.__responses[path]:
+            status, headers = self.__responses[path].pop(0)
+            return web.Response(status=status, headers=headers, text="retry")
+
+        return web.json_response({"path": path})
+
+    def get_gaps(self, path: str) -> list[float]:
+        times = self.arrival_times[path]
+        return [later - earlier for earlier, later in zip(times, times[1:])]
+
+
+async def fetch(responses: dict[str, list[tuple[int, dict]]], paths: list[str]):
+    fixture_server = FixtureServer(responses)
+    await fixture_server.server.start_server()
+    http_client = HttpClient()
+    extractor = FixtureExtractor(
+        "fixture", "http://localhost", http_client=http_client, requests_per_second=100
+    )
+    try:
+        results = [
+            await extractor._fetch(str(fixture_server.server.make_url(f"/{path}")))
+            for path in paths
+        ]
+    finally:
+        await http_client.close()
+        await fixture_server.server.close()
+
+    return results, fixture_server, http_client.get_statistics()
+
+
+def test_retries_after_429_with_retry_after():
+    results, fixture_server, statistics = asyncio.run(
+        fetch({"limited": [(429, {"Retry-After": "1"})]}, ["limited"])
+    )
+
+    assert results == [{"path": "limited"}]
+    assert len(fixture_server.arrival_times["limited"]) == 2
+    # Retry-After overrides the 0.01 second interval of the rate limiter
+    assert fixture_server.get_gaps("limited")[0] >= 0.95
+    assert statistics["REQUESTS"] == 2
+    assert statistics["FAILED_REQUESTS"] == 0
+
+
+def test_retries_after_503_with_exponential_backoff():
+    results, fixture_server, statistics = asyncio.run(
+        fetch({"overloaded": [(503, {}), (503, {})]}, ["overloaded"])
+    )
+
+    assert results == [{"path": "overloaded"}]
+    first_gap, second_gap = fixture_server.get_gaps("overloaded")
+    assert 0.95 <= first_gap < 1.9
+    assert second_gap >= 1.95
+    assert statistics["REQUESTS"] == 3
+
+
+def test_gives_up_after_max_attempts():
+    responses = [(429, {"Retry-After": "0"})] * (Extractor.max_attempts + 1)
+    results, fixture_server, statistics = asyncio.run(fetch({"limited": responses}, ["limited"]))
+
+    assert results == [None]
+    assert len(fixture_server.arrival_times["limited"]) == Extractor.max_attempts
+    assert statistics["REQUESTS"] == Extractor.max_attempts
+
+
+def test_reuses_connections_across_requests_and_retries():
+    results, _, statistics = asyncio.run(
+        fetch(
+            {"limited": [(429, {"Retry-After": "0"})], "first": [], "second": []},
+            ["limited", "first", "second"],
+        )
+    )
+
+    assert results == [{"path": "limited"}, {"path": "first"}, {"path": "second"}]
+    assert statistics["REQUESTS"] == 4
+    assert statistics["NEW_CONNECTIONS"] == 1
+    assert statistics["REUSED_CONNECTIONS"] == 3
+    assert statistics["REUSE_RATE"] == 0.75
+
+
+def test_rate_limiter_spaces_concurrent_requests():
+    async def acquire_times() -> list[float]:
+        rate_limiter = RateLimiter(requests_per_second=20)
+        loop = asyncio.get_running_loop()
+
+        async def acquire() -> float:
+            await rate_limiter.acquire()
+            return loop.time()
+
+        return sorted(await asyncio.gather(*(acquire() for _ in range(5))))
+
+    times = asyncio.run(acquire_times())
+
+    assert all(later - earlier >= 0.045 for earlier, later in zip(times, times[1:]))
+    assert times[-1] - times[0] < 0.5
+
+
+def test_rate_limiter_delay_pushes_back_pending_requests():
+    async def delayed_wait() -> float:
+        rate_limiter = RateLimiter(requests_per_second=100)
+        loop = asyncio.get_running_loop()
+        await rate_limiter.acquire()
+        rate_limiter.delay(0.3)
+        # A shorter delay never brings the next slot forward
+        rate_limiter.delay(0.1)
+        start = loop.time()
+        await rate_limiter.acquire()
+        return loop.time() - start
+
+    assert asyncio.run(delayed_wait()) >= 0.28
@@ -1,16 +1,23 @@
-from langdetect import detect
+from threading import Lock
 from backend.documentTypes import DocumentLanguage
+from backend.engine.LanguageDetector import LanguageDetector
+
+_language_detector: LanguageDetector = None
+_language_detector_lock = Lock()
+
+
+# Shared by documents, the indexer and the term processor so they use one cache
+def get_language_detector() -> LanguageDetector:
+    global _language_detector
+    with _language_detector_lock:
+        if _language_detector is None:
+            _language_detector = LanguageDetector()
+
+    return _language_detector
 
 
 def get_text_language(text: str, language: DocumentLanguage = None) -> DocumentLanguage:
     if language != None:
         return language
 
-    try:
-        detected_language = detect(text)
-        if detected_language == "es":
-            return DocumentLanguage.SPANISH.value
-    except:
-        pass
-
-    return DocumentLanguage.ENGLISH.value
+    return get_language_detector().detect(text)